@@ -4,7 +4,11 @@ from alpha_vantage.timeseries import TimeSeries
 from s3connector import connect_to_storage_account, azure_connection_string, download_blob
 import credentials
 import io
+import logging
 import pandas as pd
+from trading_core.logs import get_logger, sampled
+
+log = get_logger('backtest')
 
 # Azure storage account
 blob_service_client = connect_to_storage_account(azure_connection_string)
@@ -38,16 +42,18 @@ class LSTMStrategy(Strategy):
         self.account_balance = api.get_account().cash
 
     def next(self):
-        print(f"Current Close Price: {self.data.Close[-1]}, Predicted Close Price: {self.prediction[-1]}")
+        # per-bar detail is debug-only and sampled; a backtest runs this thousands of times
+        if log.isEnabledFor(logging.DEBUG) and sampled('backtest.bar', 50):
+            log.debug("Current Close Price: %s, Predicted Close Price: %s", self.data.Close[-1], self.prediction[-1])
         if self.data.Close[-1] < self.prediction[-1] and self.data.Close[-1] * 1.01 <= self.prediction[-1]:
             if self.account_balance >= self.data.Close[-1]:
                 # Go long
-                print(f"Going long. Buying at price: {self.data.Close[-1]}")
+                log.debug("Going long. Buying at price: %s", self.data.Close[-1])
                 self.buy()
                 self.account_balance -= self.data.Close[-1]
         elif self.data.Close[-1] > self.prediction[-1] and self.position:
             # Go short, sell what we bought earlier
-            print(f"Going short. Selling at price: {self.data.Close[-1]}")
+            log.debug("Going short. Selling at price: %s", self.data.Close[-1])
             self.sell()
             self.account_balance += self.data.Close[-1]
 
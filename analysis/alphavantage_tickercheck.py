@@ -1,8 +1,16 @@
+import os
+import sys
 import requests
 import time
 from concurrent.futures import ThreadPoolExecutor
 import credentials
 
+_here = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(_here) not in sys.path:
+    sys.path.insert(0, os.path.dirname(_here))
+
+from trading_core.concurrency import AdaptiveConcurrency
+
 def check_api_limit(api_key):
     url = "https://www.alphavantage.co/query"
     params = {
@@ -11,8 +19,10 @@ def check_api_limit(api_key):
         "apikey": api_key
     }
 
-    with ThreadPoolExecutor(max_workers=50) as executor:
-        futures = {executor.submit(requests.get, url, params=params) for _ in range(150)}
+    # up to 50 requests in flight, backing off when Alpha Vantage starts throttling
+    pool = AdaptiveConcurrency('tickercheck', 'alpha_vantage', max_workers=50)
+    with ThreadPoolExecutor(max_workers=pool.max_workers) as executor:
+        futures = {executor.submit(pool.wrap(requests.get), url, params=params) for _ in range(150)}
         error_count = 0
 
         for future in futures:
@@ -20,6 +30,8 @@ def check_api_limit(api_key):
             if "Error Message" in response.text:
                 error_count += 1
 
+    pool.close()
+    print(f"Worker limit settled at {pool.limit} ({dict(pool.decisions)})")
     return error_count
 
 api_key = credentials.ALPHA_VANTAGE_API
@@ -1,25 +1,8 @@
 import pandas as pd
-import requests
-import json
-from requests.exceptions import RequestException
 from s3connector import download_blob, connect_to_storage_account, azure_connection_string
+from trading_core.notifier import send_teams_message, flush
 
 
-def send_teams_message(webhook_url, message):
-    """
-    Sends a message to a Microsoft Teams channel.
-    """
-    headers = {
-        "Content-Type": "application/json"
-    }
-    data = {
-        "text": message
-    }
-    response = requests.post(webhook_url, headers=headers, data=json.dumps(data))
-
-    if response.status_code != 200:
-        raise Exception(f"Message to Teams could not be sent. Status code: {response.status_code}\nText: {response.text}")
-
 def main():
     try:
         # Connect to Azure storage
@@ -69,11 +52,11 @@ def main():
         message_string = f"{symbols_str}"
 
         send_teams_message(teams_url, message_string)
+        if not flush():
+            print("Timed out sending the Teams messages.")
 
     except FileNotFoundError:
         print(f"File {csv_file} not found.")
-    except RequestException as e:
-        print(f"An error occurred when trying to send a Teams message: {str(e)}")
 
 if __name__ == "__main__":
     main()
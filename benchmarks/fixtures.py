@@ -0,0 +1,241 @@
+"""
+Synthetic, deterministic market data for the offline benchmarks.
+
+Every symbol gets its own seeded random walk, so Alpha Vantage payloads, broker bars and the
+company overview rows for a universe of any size agree with each other and are identical between runs.
+"""
+import json
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from trading_core.av_cassette import Cassette
+
+ANCHOR = pd.Timestamp('2024-03-28 20:00', tz='UTC')  # a Thursday close
+SECTORS = ['TECHNOLOGY', 'ENERGY', 'FINANCE', 'LIFE SCIENCES', 'MANUFACTURING', 'TRADE & SERVICES']
+
+
+def equity_symbols(count):
+    return [f"S{i:04d}" for i in range(count)]
+
+
+def crypto_pairs(count):
+    return [f"C{i:04d}/USD" for i in range(count)]
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.replace('/', '').upper().encode())
+
+
+def base_price(symbol):
+    rng = np.random.default_rng(_seed(symbol))
+    if symbol.upper().endswith('USD'):
+        return float(np.exp(rng.uniform(np.log(0.5), np.log(50000))))
+    return float(rng.uniform(10, 500))
+
+
+def price_walk(symbol, length, volatility=0.01):
+    """
+    Closing prices, oldest first, ending close to base_price(symbol).
+    """
+    rng = np.random.default_rng(_seed(symbol) + length)
+    steps = rng.normal(0, volatility, length)
+    if _seed(symbol) % 2 == 0 and length >= 40:
+        # every other symbol dips below its moving averages and starts to recover, which is what the
+        # equity buy rule looks for; the rest drift around so both branches get exercised
+        steps[-30:-4] -= volatility / 2
+        steps[-4:] += volatility
+    closes = base_price(symbol) * np.exp(np.cumsum(steps) - steps.sum())
+    return closes
+
+
+def ohlcv(symbol, index, volatility=0.01):
+    closes = price_walk(symbol, len(index), volatility)
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    spread = np.abs(closes - opens) + closes * volatility / 4
+    volume = np.random.default_rng(_seed(symbol)).integers(1_000, 1_000_000, len(index))
+    return pd.DataFrame({'open': opens, 'high': np.maximum(opens, closes) + spread / 2,
+                         'low': np.minimum(opens, closes) - spread / 2, 'close': closes, 'volume': volume},
+                        index=index)
+
+
+def session_index(days=1):
+    """
+    5-minute bar timestamps for the last `days` NYSE sessions up to ANCHOR.
+    """
+    dates = pd.bdate_range(end=ANCHOR.tz_convert('America/New_York').normalize().tz_localize(None), periods=days)
+    stamps = [pd.date_range(f"{d.date()} 09:30", f"{d.date()} 15:55", freq='5min', tz='America/New_York')
+              for d in dates]
+    return stamps[0].append(stamps[1:]).tz_convert('UTC') if len(stamps) > 1 else stamps[0].tz_convert('UTC')
+
+
+def crypto_index(bars=288):
+    return pd.date_range(end=ANCHOR, periods=bars, freq='5min')
+
+
+def company_overviews(count):
+    """
+    company_overviews.csv rows for `count` symbols that pass every selected_pairs_history filter.
+
+    One extra row per sector carries an outsized P/E so the "below sector average" filter keeps the rest.
+    """
+    rows = []
+    for i, symbol in enumerate(equity_symbols(count)):
+        rng = np.random.default_rng(_seed(symbol))
+        rows.append({
+            'Symbol': symbol, 'Sector': SECTORS[i % len(SECTORS)], 'Industry': f"INDUSTRY {i % 17}",
+            'MarketCapitalization': int(rng.uniform(2e9, 9e11)), 'PERatio': round(rng.uniform(5, 30), 2),
+            'DividendYield': round(rng.uniform(0, 0.05), 4), 'RevenuePerShareTTM': round(rng.uniform(1, 200), 2),
+            'ProfitMargin': round(rng.uniform(0.01, 0.4), 4), 'OperatingMarginTTM': round(rng.uniform(0.01, 0.4), 4),
+            'ReturnOnAssetsTTM': round(rng.uniform(0.01, 0.2), 4), 'ReturnOnEquityTTM': round(rng.uniform(3, 40), 2),
+            'QuarterlyEarningsGrowthYOY': round(rng.uniform(0, 0.5), 4),
+            'QuarterlyRevenueGrowthYOY': round(rng.uniform(0, 0.5), 4),
+            'AnalystTargetPrice': round(base_price(symbol) * 1.1, 2), 'TrailingPE': round(rng.uniform(5, 30), 2),
+            'ForwardPE': round(rng.uniform(5, 30), 2), 'PriceToSalesRatioTTM': round(rng.uniform(0.5, 10), 2),
+            'PriceToBookRatio': round(rng.uniform(0.5, 10), 2), 'EVToRevenue': round(rng.uniform(0.5, 10), 2),
+            'EVToEBITDA': round(rng.uniform(2, 30), 2), 'Beta': round(rng.uniform(0.5, 2), 2),
+        })
+    for j, sector in enumerate(SECTORS):
+        outlier = dict(rows[0]) if rows else {}
+        outlier.update({'Symbol': f"PE{j:02d}", 'Sector': sector, 'PERatio': 1_000_000.0})
+        rows.append(outlier)
+    return pd.DataFrame(rows)
+
+
+# ----- Alpha Vantage payloads -----
+
+def _daily_dates(count):
+    return [d.strftime('%Y-%m-%d') for d in pd.bdate_range(end=ANCHOR.tz_localize(None).normalize(), periods=count)]
+
+
+def _series(dates, values):
+    # Alpha Vantage lists the newest point first
+    return {date: value for date, value in zip(reversed(dates), reversed(values))}
+
+
+def _meta(function, symbol):
+    return {'1: Symbol': symbol, '2: Indicator': function, '3: Last Refreshed': str(ANCHOR.date())}
+
+
+def _daily(symbol, params):
+    count = 1000 if params.get('outputsize') == 'full' else 100
+    dates = _daily_dates(count)
+    frame = ohlcv(symbol, dates, volatility=0.02)
+    points = [{'1. open': f"{o:.4f}", '2. high': f"{h:.4f}", '3. low': f"{lo:.4f}", '4. close': f"{c:.4f}",
+               '5. volume': str(int(v))}
+              for o, h, lo, c, v in frame[['open', 'high', 'low', 'close', 'volume']].itertuples(index=False)]
+    return {'Meta Data': {'1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+                          '2. Symbol': symbol, '3. Last Refreshed': dates[-1], '4. Output Size': 'Compact',
+                          '5. Time Zone': 'US/Eastern'},
+            'Time Series (Daily)': _series(dates, points)}
+
+
+def _indicator(function, symbol, params):
+    dates = _daily_dates(100)
+    closes = pd.Series(price_walk(symbol, len(dates), 0.02))
+    period = int(params.get('time_period', 14))
+    if function == 'SMA':
+        values = [{'SMA': f"{v:.4f}"} for v in closes.rolling(period, min_periods=1).mean()]
+    elif function == 'RSI':
+        delta = closes.diff().fillna(0)
+        gain = delta.clip(lower=0).rolling(period, min_periods=1).mean()
+        loss = (-delta.clip(upper=0)).rolling(period, min_periods=1).mean()
+        rsi = (100 - 100 / (1 + gain / loss.replace(0, np.nan))).fillna(50)
+        values = [{'RSI': f"{v:.4f}"} for v in rsi]
+    else:
+        macd = closes.ewm(span=12, adjust=False).mean() - closes.ewm(span=26, adjust=False).mean()
+        signal = macd.ewm(span=9, adjust=False).mean()
+        values = [{'MACD_Signal': f"{s:.4f}", 'MACD': f"{m:.4f}", 'MACD_Hist': f"{m - s:.4f}"}
+                  for m, s in zip(macd, signal)]
+    return {'Meta Data': _meta(function, symbol), f"Technical Analysis: {function}": _series(dates, values)}
+
+
+def _crypto_intraday(symbol, params):
+    index = crypto_index(350 if params.get('outputsize') == 'full' else 100)
+    frame = ohlcv(f"{symbol}USD", index, volatility=0.003)
+    stamps = [t.strftime('%Y-%m-%d %H:%M:%S') for t in index]
+    points = [{'1. open': f"{o:.6f}", '2. high': f"{h:.6f}", '3. low': f"{lo:.6f}", '4. close': f"{c:.6f}",
+               '5. volume': str(int(v))}
+              for o, h, lo, c, v in frame[['open', 'high', 'low', 'close', 'volume']].itertuples(index=False)]
+    return {'Meta Data': {'1. Information': 'Crypto Intraday (5min) Time Series', '2. Digital Currency Code': symbol,
+                          '4. Market Code': params.get('market', 'USD'), '7. Interval': '5min'},
+            'Time Series Crypto (5min)': _series(stamps, points)}
+
+
+def _exchange_rate(from_currency, to_currency):
+    rate = 1.0 if from_currency == to_currency else base_price(f"{from_currency}{to_currency}")
+    return {'Realtime Currency Exchange Rate': {
+        '1. From_Currency Code': from_currency, '3. To_Currency Code': to_currency,
+        '5. Exchange Rate': f"{rate:.8f}", '6. Last Refreshed': str(ANCHOR.tz_localize(None))}}
+
+
+@lru_cache(maxsize=None)
+def alpha_vantage_payload(function, symbol, params):
+    params = dict(params)
+    if function == 'TIME_SERIES_DAILY':
+        payload = _daily(symbol, params)
+    elif function in ('SMA', 'RSI', 'MACD'):
+        payload = _indicator(function, symbol, params)
+    elif function == 'CRYPTO_INTRADAY':
+        payload = _crypto_intraday(symbol, params)
+    elif function == 'CURRENCY_EXCHANGE_RATE':
+        payload = _exchange_rate(*symbol.split('-', 1))
+    else:
+        payload = {'Error Message': f"Invalid API call. No synthetic data for {function}."}
+    return json.dumps(payload)
+
+
+class SyntheticAlphaVantage(Cassette):
+    """
+    A replay-only cassette that generates every response instead of reading it from disk,
+    so universes of any size can be benchmarked without recording them first.
+    """
+
+    def __init__(self, **options):
+        super().__init__(None, mode='replay', **options)
+
+    def load(self, key):
+        function, symbol, params = key
+        return {'status_code': 200, 'content_type': 'application/json',
+                'body': alpha_vantage_payload(function, symbol, params)}
+
+
+# ----- frames for the microbenchmarks -----
+
+def crypto_frames(count, bars=288):
+    """
+    Per-pair frames shaped like crypto.build_dataframe output (oldest bar first).
+    """
+    index = crypto_index(bars)
+    dates = [t.strftime('%Y-%m-%d %H:%M:%S') for t in index]
+    frames = []
+    for pair in crypto_pairs(count):
+        base, quote = pair.split('/')
+        bars_frame = ohlcv(pair, index, volatility=0.003)
+        frames.append(pd.DataFrame({
+            'Date': dates, 'Crypto': base, 'Quote': quote,
+            'Open': bars_frame['open'].round(2).values, 'High': bars_frame['high'].round(2).values,
+            'Low': bars_frame['low'].round(2).values, 'Close': bars_frame['close'].round(2).values,
+            'Volume': bars_frame['volume'].values.astype(float),
+        }))
+    return frames
+
+
+def crypto_results(count, bars=288):
+    """
+    The crypto_results.csv frame crypto_order reads: every pair's bars stacked, with a Symbol column.
+    """
+    data = pd.concat(crypto_frames(count, bars), ignore_index=True)
+    data['Symbol'] = data['Crypto'] + data['Quote']
+    data['Date'] = pd.to_datetime(data['Date'])
+    return data.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def daily_closes(count, days=1260):
+    """
+    Daily closes (days x symbols) for `count` equities, about five years by default.
+    """
+    dates = pd.bdate_range(end=ANCHOR.tz_localize(None).normalize(), periods=days)
+    return pd.DataFrame({symbol: price_walk(symbol, days, 0.02) for symbol in equity_symbols(count)}, index=dates)
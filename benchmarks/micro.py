@@ -0,0 +1,341 @@
+"""
+Microbenchmarks for the compute kernels, on synthetic data at realistic scales.
+
+    python benchmarks/micro.py                       # run everything, compare with the saved baseline
+    python benchmarks/micro.py --save-baseline       # record the current timings as the baseline
+    python benchmarks/micro.py -k rsi -k macd --scale quick
+
+The baseline (benchmarks/baselines/micro.json by default) holds the best (minimum) time per kernel and
+scale, which is far less sensitive to scheduler noise than the median. A kernel whose best time exceeds
+the baseline by more than --threshold (20% by default) is reported as a regression and the script exits
+with status 1, so it can gate CI. Baselines are machine specific: record one on the machine that runs
+the comparison.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(_here)
+for path in (ROOT, _here, os.path.join(ROOT, 'crypto'), os.path.join(ROOT, 'commodities')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import fixtures
+
+DEFAULT_BASELINE = os.path.join(_here, 'baselines', 'micro.json')
+
+# kernel sizes per scale; 'full' matches production-sized inputs
+SCALES = {
+    'quick': {'crypto_pairs': 20, 'crypto_bars': 288, 'tickers': 1000, 'equities': 50, 'days': 1260, 'sizing': 20},
+    'full': {'crypto_pairs': 100, 'crypto_bars': 288, 'tickers': 10000, 'equities': 500, 'days': 1260, 'sizing': 200},
+}
+
+KERNELS = {}
+
+
+class Skip(Exception):
+    """
+    Raised by a kernel's setup when it cannot run here (e.g. an optional dependency is missing).
+    """
+
+
+def kernel(name):
+    """
+    Register a setup function. It receives the scale's sizes and returns (run, description), where
+    run() is the timed call; everything before that is untimed setup.
+    """
+    def register(setup):
+        KERNELS[name] = setup
+        return setup
+    return register
+
+
+# ----- kernels -----
+
+@kernel('crypto.apply_strategies')
+def _apply_strategies(sizes):
+    import crypto as crypto_script
+    frames = fixtures.crypto_frames(sizes['crypto_pairs'], sizes['crypto_bars'])
+
+    def run():
+        for frame in frames:
+            crypto_script.apply_strategies(frame.copy())
+    return run, f"{sizes['crypto_pairs']} pairs x {sizes['crypto_bars']} bars"
+
+
+@kernel('signals.update')
+def _signal_update(sizes):
+    from trading_core.signals import SignalEngine
+    frames = fixtures.crypto_frames(sizes['crypto_pairs'], sizes['crypto_bars'])
+    engine = SignalEngine(path=os.devnull)
+    for frame in frames:
+        engine.state(frame['Crypto'][0]).warm_up(frame['Close'])
+    latest = [(frame['Crypto'][0], float(frame['Close'].iloc[-1])) for frame in frames]
+
+    def run():
+        # one new 5-minute bar per pair
+        for pair, close in latest:
+            engine.update(pair, close)
+    return run, f"{sizes['crypto_pairs']} pairs x 1 new bar"
+
+
+@kernel('resample.crypto')
+def _resample(sizes):
+    from trading_core.resample import resample
+    index = fixtures.crypto_index(4032)  # two weeks of 5-minute bars, what the bar store keeps
+    frames = [fixtures.ohlcv(pair, index, volatility=0.003) for pair in fixtures.crypto_pairs(sizes['crypto_pairs'])]
+
+    def run():
+        for bars in frames:
+            for timeframe in ('15min', '1h', '4h', '1D'):
+                resample(bars, timeframe)
+    return run, f"{sizes['crypto_pairs']} pairs x 4032 bars x 4 timeframes"
+
+
+@kernel('crypto_order.calculate_RSI')
+def _rsi(sizes):
+    import crypto_order
+    data = fixtures.crypto_results(sizes['crypto_pairs'], sizes['crypto_bars'])
+    return (lambda: crypto_order.calculate_RSI(data)), f"{len(data)} rows"
+
+
+@kernel('crypto_order.calculate_MACD')
+def _macd(sizes):
+    import crypto_order
+    data = fixtures.crypto_results(sizes['crypto_pairs'], sizes['crypto_bars'])
+    return (lambda: crypto_order.calculate_MACD(data)), f"{len(data)} rows"
+
+
+@kernel('selected_pairs_history.screen_companies')
+def _screen(sizes):
+    import selected_pairs_history
+    overviews = fixtures.company_overviews(sizes['tickers'])
+    return (lambda: selected_pairs_history.screen_companies(overviews, verbose=False)), f"{len(overviews)} tickers"
+
+
+@kernel('RiskManagement.calculate_quantity')
+def _calculate_quantity(sizes):
+    import pandas as pd
+    from trading_core import av_cassette
+    from trading_core.broker_sim import SimulatedBroker
+    from trading_core.risk_strategy import RiskManagement, RiskParams
+
+    symbols = fixtures.equity_symbols(sizes['sizing'])
+    broker = SimulatedBroker(cash=100000.0)
+    index = fixtures.session_index()
+    for symbol in symbols:
+        broker.load_bars(symbol, fixtures.ohlcv(symbol, index, volatility=0.002))
+    broker.advance(until=pd.Timestamp(index[-1]))
+    params_path = os.path.join(os.getcwd(), 'risk_params.json')
+    shutil.copy(os.path.join(ROOT, 'commodities', 'risk_params.json'), params_path)
+    risk_params = RiskParams(params_path, watch_interval=None)
+    cassette = fixtures.SyntheticAlphaVantage()
+    rm = RiskManagement(broker, risk_params)
+
+    def run():
+        av_cassette.install(cassette)
+        try:
+            for symbol in symbols:
+                rm.calculate_quantity(symbol)
+        finally:
+            av_cassette.uninstall()
+    return run, f"{len(symbols)} symbols"
+
+
+@kernel('port_op.optimize_portfolio')
+def _optimize(sizes):
+    from trading_core.port_op import optimize_portfolio
+
+    closes = fixtures.daily_closes(sizes['equities'], sizes['days'])
+    returns = closes.pct_change().dropna()
+    expected_returns = returns.mean().values * 252
+    covariance = returns.cov().values * 252
+    prices = closes.iloc[-1].values
+    return (lambda: optimize_portfolio(expected_returns, covariance, 3.0, 100000, prices=prices)), \
+        f"{sizes['equities']} symbols x {sizes['days']} days"
+
+
+@kernel('port_op.efficient_frontier')
+def _frontier(sizes):
+    import numpy as np
+    from trading_core.port_op import efficient_frontier
+
+    returns = fixtures.daily_closes(sizes['equities'], sizes['days']).pct_change().dropna()
+    expected_returns = returns.mean().values * 252
+    covariance = returns.cov().values * 252
+    risk_aversions = np.logspace(-1, 2, 50)
+    return (lambda: efficient_frontier(expected_returns, covariance, risk_aversions)), \
+        f"{sizes['equities']} symbols x 50 points"
+
+
+@kernel('predict.preprocess_data')
+def _preprocess(sizes):
+    try:
+        from trading_core.predict import preprocess_data
+    except ImportError as e:
+        raise Skip(str(e))
+    closes = fixtures.daily_closes(sizes['equities'], sizes['days'])
+    columns = [closes[c] for c in closes.columns]
+
+    def run():
+        for series in columns:
+            preprocess_data(series, lookback=60)
+    return run, f"{sizes['equities']} symbols x {sizes['days']} days"
+
+
+# ----- runner -----
+
+def measure(run, repeat, min_time=0.2):
+    """
+    Time run() `repeat` times after one warm-up call; fast kernels are looped until each sample
+    takes at least min_time. Returns per-call seconds.
+    """
+    sink = io.StringIO()
+    with redirect_stdout(sink):
+        start = time.perf_counter()
+        run()
+        first = time.perf_counter() - start
+    loops = max(1, int(min_time / first)) if first > 0 else 1
+    samples = []
+    for _ in range(repeat):
+        with redirect_stdout(sink):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            samples.append((time.perf_counter() - start) / loops)
+        sink.seek(0)
+        sink.truncate()
+    return samples, loops
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('kernels', {})
+
+
+def save_baseline(path, results, previous):
+    kernels = dict(previous)
+    for result in results:
+        if 'median_s' in result:
+            kernels[result['key']] = {'median_s': result['median_s'], 'min_s': result['min_s'],
+                                      'description': result['description']}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'commit': _git_commit(),
+                   'machine': _machine(), 'kernels': kernels}, f, indent=2, sort_keys=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              timeout=30).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count()}
+
+
+def run_kernels(options):
+    sizes = SCALES[options.scale]
+    selected = [name for name in KERNELS if not options.kernels or any(k.lower() in name.lower() for k in options.kernels)]
+    baseline = load_baseline(options.baseline)
+    results = []
+    regressions = []
+
+    for name in selected:
+        key = f"{name}@{options.scale}"
+        try:
+            with redirect_stdout(io.StringIO()):
+                run, description = KERNELS[name](sizes)
+        except Skip as e:
+            print(f"{name:45} skipped: {e}")
+            results.append({'kernel': name, 'key': key, 'skipped': str(e)})
+            continue
+
+        samples, loops = measure(run, options.repeat)
+        result = {'kernel': name, 'key': key, 'description': description, 'loops': loops,
+                  'min_s': min(samples), 'median_s': statistics.median(samples),
+                  'stdev_s': statistics.stdev(samples) if len(samples) > 1 else 0.0}
+
+        reference = baseline.get(key)
+        line = f"{name:45} {description:30} median {result['median_s'] * 1000:10.2f} ms  min {result['min_s'] * 1000:10.2f} ms"
+        if reference:
+            ratio = result['min_s'] / reference['min_s']
+            result['baseline_min_s'] = reference['min_s']
+            result['ratio'] = round(ratio, 3)
+            line += f"  x{ratio:5.2f} vs baseline"
+            if ratio > 1 + options.threshold:
+                regressions.append(result)
+                line += "  REGRESSION"
+        print(line)
+        results.append(result)
+
+    report = {'benchmark': 'micro', 'scale': options.scale, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+              'commit': _git_commit(), 'machine': _machine(), 'threshold': options.threshold, 'results': results}
+    if options.out:
+        os.makedirs(os.path.dirname(os.path.abspath(options.out)), exist_ok=True)
+        with open(options.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if options.save_baseline:
+        save_baseline(options.baseline, results, baseline)
+        print(f"Baseline saved to {options.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} kernel(s) slower than the baseline by more than {options.threshold:.0%}: "
+              f"{', '.join(r['kernel'] for r in regressions)}")
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the kernel microbenchmarks.")
+    parser.add_argument('-k', '--kernel', dest='kernels', action='append', help="run kernels whose name contains this")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='full')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.20, help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--out', help="write the full results as JSON")
+    parser.add_argument('--list', action='store_true', help="list the kernels and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    if options.list:
+        print('\n'.join(KERNELS))
+        return 0
+    options.baseline = os.path.abspath(options.baseline)
+    if options.out:
+        options.out = os.path.abspath(options.out)
+
+    # the scripts write logs and scratch files into the working directory on import
+    workdir = tempfile.mkdtemp(prefix='micro-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from trading_core import configure
+        configure(risk_params_path=os.path.join(workdir, 'risk_params.json'))
+        return run_kernels(options)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
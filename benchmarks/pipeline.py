@@ -0,0 +1,392 @@
+"""
+End-to-end benchmark of the trading pipelines against offline stand-ins.
+
+    python benchmarks/pipeline.py --sizes 10 100 1000
+    python benchmarks/pipeline.py --pipelines crypto --sizes 100 --av-latency 0.05 --out crypto.json
+
+Pipelines:
+    equities: commodities/selected_pairs_history.py -> commodities/bracket_order.py
+    crypto:   crypto/crypto.py -> crypto_order.process_signals()
+    crypto-held: the crypto pipeline starting with small positions in every other of the first 20 pairs,
+                 so the order stage's sell paths (check_momentum, process_sell) place orders too
+
+Each stage runs in its own interpreter with the Alpaca client replaced by broker_sim.SimulatedBroker,
+Alpha Vantage by a synthetic cassette, Azure blob storage by blob_sim.LocalBlobService (shared between
+the stages of a run through the work directory) and Teams webhooks by a counting stub. Any other HTTP
+request fails, so nothing leaves the machine. Wall time, CPU time, peak RSS and per-service call counts
+are recorded per stage and written to a JSON file for comparison between runs.
+
+With --stream, prices are streamed instead of polled: a stream_sim.LocalMarketStream websocket server fed
+from the simulated broker stands in for Alpaca's market data stream, and the stage runs with streaming on.
+
+Pacing sleeps in the scripts (e.g. the Alpha Vantage delay in selected_pairs_history) are skipped and
+reported as sleep_skipped_s; use --real-sleep to keep them.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(_here)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PIPELINES = {
+    'equities': ['selected_pairs_history', 'bracket_order'],
+    'crypto': ['crypto', 'crypto_order'],
+    'crypto-held': ['crypto', 'crypto_order'],
+}
+HELD_PIPELINES = {'crypto-held'}
+# seeded positions stay inside crypto/risk_params.json's max_position_size and the crypto equity cap,
+# which validate_trade also checks for sells
+HELD_PAIRS = 10
+HELD_VALUE = 250.0
+HELD_MAX_QTY = 20.0
+STAGE_DIRS = {
+    'selected_pairs_history': 'commodities', 'bracket_order': 'commodities',
+    'crypto': 'crypto', 'crypto_order': 'crypto',
+}
+TEAMS_HOST = 'webhook.office.com'
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+# ----- child process: one stage -----
+
+class OfflineTransport:
+    """
+    requests transport for everything that is not Alpha Vantage: Teams webhooks get a 200, anything
+    else raises ConnectionError. Installed on top of the cassette hook.
+    """
+
+    def __init__(self):
+        import requests
+        from requests.adapters import BaseAdapter
+
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._previous = requests.Session.get_adapter
+        transport = self
+
+        class _Adapter(BaseAdapter):
+            def send(self, request, **kwargs):
+                return transport.send(request)
+
+            def close(self):
+                pass
+
+        self._adapter = _Adapter()
+
+        def get_adapter(session, url):
+            from trading_core.av_cassette import AV_URL_PREFIX
+            if url.lower().startswith(AV_URL_PREFIX):
+                return transport._previous(session, url)
+            return transport._adapter
+
+        requests.Session.get_adapter = get_adapter
+
+    def send(self, request):
+        import requests
+        from urllib.parse import urlsplit
+
+        host = urlsplit(request.url).hostname or ''
+        with self._lock:
+            if host.endswith(TEAMS_HOST):
+                self.counts['teams'] += 1
+            else:
+                self.counts['blocked'] += 1
+                self.counts[f"blocked:{host}"] += 1
+        if not host.endswith(TEAMS_HOST):
+            raise requests.exceptions.ConnectionError(f"offline benchmark: {request.method} {host} blocked",
+                                                      request=request)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'1'
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class SleepMeter:
+    """
+    Replaces time.sleep so pacing waits in the scripts are skipped and totalled. Daemon threads
+    (e.g. the risk_params file watcher) keep sleeping for real so they don't spin.
+    """
+
+    def __init__(self, real_sleep):
+        self.real_sleep = real_sleep
+        self.skipped = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, seconds):
+        if threading.current_thread().daemon:
+            return self.real_sleep(seconds)
+        with self._lock:
+            self.skipped += max(float(seconds), 0.0)
+            self.calls += 1
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _build_broker(stage, size, options):
+    import pandas as pd
+    from trading_core.broker_sim import SimulatedBroker
+    import fixtures
+
+    broker = SimulatedBroker(cash=options.cash, latency=options.broker_latency, rate_limit=options.broker_rate_limit,
+                             rate_limit_mode='block', seed=0)
+    if STAGE_DIRS[stage] == 'commodities':
+        index = fixtures.session_index()
+        for symbol in fixtures.equity_symbols(size):
+            broker.add_asset(symbol, asset_class='us_equity', fractionable=True)
+            broker.load_bars(symbol, fixtures.ohlcv(symbol, index, volatility=0.002))
+    else:
+        index = fixtures.crypto_index()
+        pairs = fixtures.crypto_pairs(size)
+        for pair in pairs:
+            broker.add_asset(pair, asset_class='crypto', fractionable=True)
+            frame = fixtures.ohlcv(pair, index, volatility=0.003)
+            broker.load_bars(pair, frame)
+            if options.held and pair in pairs[:2 * HELD_PAIRS:2]:
+                # bought at the window's first close, so some holdings are in profit and some at a loss
+                price = float(frame['close'].iloc[0])
+                broker.add_position(pair, round(min(HELD_VALUE / price, HELD_MAX_QTY), 5), price)
+    broker.advance(until=pd.Timestamp(index[-1]))
+    return broker
+
+
+def _run_stage(stage, size, workdir):
+    stage_dir = os.path.join(ROOT, STAGE_DIRS[stage])
+    sys.path.insert(0, stage_dir)
+
+    if stage in ('selected_pairs_history', 'bracket_order'):
+        # run a copy so the script's outputs next to __file__ land in the work directory, not the repo
+        copy_dir = os.path.join(workdir, STAGE_DIRS[stage])
+        os.makedirs(copy_dir, exist_ok=True)
+        script = shutil.copy(os.path.join(stage_dir, f"{stage}.py"), copy_dir)
+        runpy.run_path(script, run_name='__main__')
+    elif stage == 'crypto':
+        import fixtures
+        import crypto as crypto_script
+        crypto_script.main(fixtures.crypto_pairs(size))
+    elif stage == 'crypto_order':
+        import crypto_order
+        crypto_order.process_signals()
+
+
+def run_child(options):
+    real_sleep = time.sleep
+    sys.path.insert(0, _here)
+    os.chdir(options.workdir)
+
+    from trading_core import configure
+    from trading_core import av_cassette, metrics, notifier
+    from trading_core.blob_sim import LocalBlobService
+    import fixtures
+
+    stage, size = options.stage, options.size
+    broker = _build_broker(stage, size, options)
+    blob = LocalBlobService(os.path.join(options.workdir, 'blobs'))
+    configure(broker_factory=lambda: broker, blob_factory=lambda: blob,
+              risk_params_path=os.path.join(options.workdir, 'risk_params.json'))
+    stream_server = None
+    if options.stream:
+        from trading_core.stream_sim import LocalMarketStream
+        stream_server = LocalMarketStream(source=broker.peek_latest_bar).start()
+        configure(streaming=True, data_stream_url=stream_server.url)
+
+    cassette = av_cassette.install(fixtures.SyntheticAlphaVantage(
+        latency=options.av_latency, quota_per_minute=options.av_quota_per_minute, seed=0, sleep=real_sleep))
+    transport = OfflineTransport()
+    metrics.install()
+    sleep_meter = SleepMeter(real_sleep)
+    if not options.real_sleep:
+        time.sleep = sleep_meter
+
+    broker.call_counts.clear()
+    metrics.registry.reset()
+    rss_before = _peak_rss_mb()
+    status = 'ok'
+    log_path = os.path.join(options.workdir, f"{stage}.log")
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        with open(log_path, 'w') as log, redirect_stdout(log):
+            _run_stage(stage, size, options.workdir)
+    except SystemExit as e:
+        status = f"exit {e.code}"
+    except Exception as e:
+        status = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    time.sleep = real_sleep
+    # Teams messages are posted in the background; count them once the queue has drained
+    notifier.flush()
+
+    result = {
+        'stage': stage,
+        'size': size,
+        'status': status,
+        'wall_s': round(wall, 4),
+        'cpu_s': round(cpu, 4),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'setup_rss_mb': round(rss_before, 1),
+        'sleep_skipped_s': round(sleep_meter.skipped, 3),
+        'calls': {
+            'broker': sum(broker.call_counts.values()),
+            'data': cassette.stats['calls'],
+            'blob': sum(blob.call_counts.values()),
+            'teams': transport.counts['teams'],
+            'blocked': transport.counts['blocked'],
+        },
+        'broker_calls': dict(broker.call_counts),
+        'data_calls': dict(cassette.calls_by_function),
+        'data_stats': dict(cassette.stats),
+        'blob_calls': dict(blob.call_counts),
+        'blocked_hosts': {k.split(':', 1)[1]: v for k, v in transport.counts.items() if k.startswith('blocked:')},
+        'metrics': metrics.registry.snapshot(),
+        'stream': dict(stream_server.counts) if stream_server else None,
+        'orders': len(broker.list_orders(status='all', limit=None)),
+        'log': log_path,
+    }
+    with open(options.result, 'w') as f:
+        json.dump(result, f)
+
+
+# ----- parent process -----
+
+def _prepare_workdir(pipeline, size, base_dir):
+    import pandas as pd
+    sys.path.insert(0, _here)
+    import fixtures
+
+    workdir = tempfile.mkdtemp(prefix=f"{pipeline}-{size}-", dir=base_dir)
+    source = 'commodities' if pipeline == 'equities' else 'crypto'
+    shutil.copy(os.path.join(ROOT, source, 'risk_params.json'), os.path.join(workdir, 'risk_params.json'))
+    if pipeline == 'equities':
+        container = os.path.join(workdir, 'blobs', 'historic')
+        os.makedirs(container, exist_ok=True)
+        fixtures.company_overviews(size).to_csv(os.path.join(container, 'company_overviews.csv'), index=False)
+    return workdir
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              timeout=30).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _child_args(options):
+    args = ['--cash', str(options.cash), '--broker-latency', str(options.broker_latency),
+            '--av-latency', str(options.av_latency)]
+    if options.broker_rate_limit:
+        args += ['--broker-rate-limit', str(options.broker_rate_limit)]
+    if options.av_quota_per_minute:
+        args += ['--av-quota-per-minute', str(options.av_quota_per_minute)]
+    if options.real_sleep:
+        args.append('--real-sleep')
+    if options.stream:
+        args.append('--stream')
+    if options.held:
+        args.append('--held')
+    return args
+
+
+def run_benchmarks(options):
+    base_dir = tempfile.mkdtemp(prefix='pipeline-bench-', dir=options.workdir)
+    runs = []
+    for pipeline in options.pipelines:
+        for size in options.sizes:
+            workdir = _prepare_workdir(pipeline, size, base_dir)
+            options.held = pipeline in HELD_PIPELINES
+            stages = []
+            for stage in PIPELINES[pipeline]:
+                result_path = os.path.join(workdir, f"{stage}.json")
+                command = [sys.executable, os.path.abspath(__file__), '--child', '--stage', stage,
+                           '--size', str(size), '--workdir', workdir, '--result', result_path] + _child_args(options)
+                completed = subprocess.run(command, timeout=options.timeout)
+                if completed.returncode != 0 or not os.path.exists(result_path):
+                    stages.append({'stage': stage, 'size': size, 'status': f"child exited {completed.returncode}"})
+                    break
+                with open(result_path) as f:
+                    stages.append(json.load(f))
+                print(_format_stage(pipeline, stages[-1]))
+            runs.append({'pipeline': pipeline, 'size': size, 'workdir': workdir, 'stages': stages,
+                         'wall_s': round(sum(s.get('wall_s', 0) for s in stages), 4),
+                         'cpu_s': round(sum(s.get('cpu_s', 0) for s in stages), 4)})
+
+    report = {
+        'benchmark': 'pipeline',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {k: v for k, v in vars(options).items() if k not in ('child', 'stage', 'size', 'result', 'held')},
+        'runs': runs,
+    }
+    out = options.out or os.path.join(_here, 'results', f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+
+    if not options.keep_workdir:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return report
+
+
+def _format_stage(pipeline, stage):
+    calls = stage.get('calls', {})
+    return (f"{pipeline:11} {stage['size']:>5} {stage['stage']:24} {stage.get('status', ''):8.8} "
+            f"wall {stage.get('wall_s', 0):8.2f}s  cpu {stage.get('cpu_s', 0):8.2f}s  "
+            f"rss {stage.get('peak_rss_mb', 0):7.1f}MB  broker {calls.get('broker', 0):6}  "
+            f"data {calls.get('data', 0):6}  blob {calls.get('blob', 0):5}  teams {calls.get('teams', 0):4}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trading pipelines offline.")
+    parser.add_argument('--pipelines', nargs='+', choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES), help="universe sizes")
+    parser.add_argument('--out', help="JSON results file (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument('--workdir', help="directory for the per-run work directories (default: system temp)")
+    parser.add_argument('--keep-workdir', action='store_true', help="keep stage logs and outputs")
+    parser.add_argument('--timeout', type=float, default=3600, help="seconds allowed per stage")
+    parser.add_argument('--cash', type=float, default=100000.0)
+    parser.add_argument('--broker-latency', type=float, default=0.0, help="seconds added to each broker call")
+    parser.add_argument('--broker-rate-limit', type=int, default=None, help="broker calls per minute")
+    parser.add_argument('--av-latency', type=float, default=0.0, help="seconds added to each Alpha Vantage call")
+    parser.add_argument('--av-quota-per-minute', type=int, default=None)
+    parser.add_argument('--real-sleep', action='store_true', help="keep the scripts' pacing sleeps")
+    parser.add_argument('--stream', action='store_true', help="stream prices from a local websocket stand-in")
+    # used internally to run one stage in a child process
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--stage', choices=sorted(STAGE_DIRS), help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--held', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_args()
+    if options.child:
+        run_child(options)
+    else:
+        run_benchmarks(options)
@@ -1,13 +1,13 @@
 import time
 import datetime
 import threading
-from risk_strategy import RiskManagement, risk_params
+from risk_strategy import RiskManagement, get_risk_params, get_api
 from credentials import ALPACA_API_KEY, ALPACA_SECRET_KEY
 import alpaca_trade_api as tradeapi
 
-api = tradeapi.REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url='https://paper-api.alpaca.markets')
+api = get_api()
 
-risk_management = RiskManagement(api, risk_params)
+risk_management = RiskManagement(api, get_risk_params())
 
 def monitor_hourly():
     while True:
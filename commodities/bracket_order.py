@@ -1,4 +1,4 @@
-from risk_strategy import RiskManagement, risk_params
+from risk_strategy import RiskManagement, get_risk_params, get_asset_index, get_api
 from alpha_vantage.timeseries import TimeSeries
 import alpaca_trade_api as tradeapi
 import random
@@ -9,8 +9,10 @@ from alpha_vantage.techindicators import TechIndicators
 import requests
 import os
 from trade_stats import record_trade
-from azure.storage.blob import BlobServiceClient
-from s3connector import azure_connection_string, connect_to_storage_account, download_blob
+from s3connector import get_blob_service_client, download_blob
+from trading_core import tracing
+from trading_core.concurrency import AdaptiveConcurrency
+from trading_core.notifier import send_teams_message
 import logging
 import json
 import time
@@ -18,26 +20,12 @@ import math
 
 
 
-def send_teams_message(teams_url, message):
-    data = {'text': message}
-    headers = {'Content-Type': 'application/json'}
-    try:
-        response = requests.post(teams_url, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
-        logging.info(f"Message sent to Teams successfully: {message}")
-    except requests.exceptions.HTTPError as http_err:
-        logging.error(f"HTTP error occurred when sending message to Teams: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logging.error(f"Request error occurred when sending message to Teams: {req_err}")
-    except Exception as e:
-        logging.error(f"Unexpected error occurred when sending message to Teams: {e}")
-
 # Your Microsoft Teams channel webhook URL
 teams_url = 'https://data874.webhook.office.com/webhookb2/9cb96ee7-c2ce-44bc-b4fe-fe2f6f308909@4f84582a-9476-452e-a8e6-0b57779f244f/IncomingWebhook/7e8bd751e7b4457aba27a1fddc7e8d9f/6d2e1385-bdb7-4890-8bc5-f148052c9ef5'
 
 send_teams_message(teams_url, "Bracket Order Script Being Run.")
 
-blob_service_client = BlobServiceClient.from_connection_string(azure_connection_string)
+blob_service_client = get_blob_service_client()
 
 # Get the path of the script's directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -45,17 +33,21 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # Your Microsoft Teams channel webhook URL
 teams_url = 'https://data874.webhook.office.com/webhookb2/9cb96ee7-c2ce-44bc-b4fe-fe2f6f308909@4f84582a-9476-452e-a8e6-0b57779f244f/IncomingWebhook/7e8bd751e7b4457aba27a1fddc7e8d9f/6d2e1385-bdb7-4890-8bc5-f148052c9ef5'
 
-api = tradeapi.REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url='https://paper-api.alpaca.markets')
+api = get_api()
 
-rm = RiskManagement(api, risk_params)
+rm = RiskManagement(api, get_risk_params())
 
-# List to keep track of symbols that did not get purchased
+# Symbols whose conditions were not met; filled from the worker results on the main thread
 symbols_not_purchased = []
 
+# Upper bound on worker threads; the risk ledger keeps cash and class exposure consistent across them and
+# the adaptive pool runs as many at once as Alpha Vantage's latency and quota allow
+MAX_WORKERS = 24
+
 
 def get_symbols_from_csv():
-    # Setup Azure connection
-    blob_service_client = connect_to_storage_account(azure_connection_string)
+    # Reuse the process-wide Azure client
+    blob_service_client = get_blob_service_client()
 
     # Define the container and blob names
     container_name = 'historic'
@@ -74,23 +66,13 @@ def get_symbols_from_csv():
     return csv_df["Symbol"].unique().tolist()
 
 
-def get_holdings(api):
-    current_positions = api.list_positions()
-    holdings = {}
-    for position in current_positions:
-        holdings[position.symbol] = position.qty
-    return holdings
-
-
 def is_fractionable(api, symbol):
-    # Get asset information
-    asset = api.get_asset(symbol)
-
-    # Return the fractionable status
-    return asset.fractionable
+    # Read the fractionable flag from the shared asset metadata index (no per-order API call)
+    return get_asset_index(api).is_fractionable(symbol)
 
 
-def place_order(api, symbol, shares, recent_close):
+@tracing.traced()
+def place_order(api, symbol, shares, recent_close, reservation=None):
     # Ensure recent_close is a number
     try:
         recent_close = float(recent_close)
@@ -121,15 +103,39 @@ def place_order(api, symbol, shares, recent_close):
 
     try:
         # Place initial order
-        initial_order = api.submit_order(
-            symbol=symbol,
-            qty=shares,
-            side='buy',
-            type='market',
-            time_in_force='day',
-            client_order_id=client_order_id
-        )
+        with tracing.span('submit_order', side='buy') as span:
+            initial_order = api.submit_order(
+                symbol=symbol,
+                qty=shares,
+                side='buy',
+                type='market',
+                time_in_force='day',
+                client_order_id=client_order_id
+            )
+            if span is not None:
+                span.set_attribute('order.id', getattr(initial_order, 'id', ''))
+                span.set_attribute('order.status', getattr(initial_order, 'status', ''))
+    except Exception as e:
+        print(f"Order for {symbol} could not be placed: {str(e)}")
+        return False
+
+    # The entry is live from here on: its reservation is committed whatever happens to the exit legs
+    if reservation is not None:
+        reservation.commit()
 
+    # Keep the risk manager's portfolio totals current without re-listing positions
+    rm.manager.record_fill(symbol, 'buy', shares, recent_close)
+
+    # Record the trade
+    record_trade(symbol, shares, recent_close)
+
+    # Create a message to send to Teams channel
+    message = f"Order placed successfully! Symbol: {symbol}, Shares: {shares}, Price: {recent_close}"
+    # Queue the message for Teams (sent in the background, batched with other fills)
+    send_teams_message(teams_url, message)
+
+    take_profit_order = stop_loss_order = None
+    try:
         # Calculate whole and fractional shares for sell orders
         whole_shares = math.floor(shares)
         fractional_shares = shares - whole_shares
@@ -174,19 +180,11 @@ def place_order(api, symbol, shares, recent_close):
 
         print(f"{symbol}: order placed successfully!")
 
-        # Record the trade
-        record_trade(symbol, shares, recent_close)
-
-        # Create a message to send to Teams channel
-        message = f"Order placed successfully! Symbol: {symbol}, Shares: {shares}, Price: {recent_close}"
-        # Send message to Teams
-        send_teams_message(message)
-
-        return initial_order, take_profit_order, stop_loss_order
-
     except Exception as e:
-        print(f"Order for {symbol} could not be placed: {str(e)}")
-        return False
+        print(f"Exit orders for {symbol} could not be placed (entry order is live): {str(e)}")
+        send_teams_message(teams_url, f"Exit orders for {symbol} could not be placed: {str(e)}")
+
+    return initial_order, take_profit_order, stop_loss_order
 
 
 cash_balance = api.get_account().cash
@@ -200,18 +198,13 @@ ti = TechIndicators(key=ALPHA_VANTAGE_API)
 # Get a list of all symbols from the CSV file in Azure storage
 symbols = get_symbols_from_csv()
 
-def get_open_orders(api):
-    open_orders = api.list_orders(status='open')
-    open_orders_symbols = [order.symbol for order in open_orders]
-    return open_orders_symbols
-
+# symbol -> tracing.hold() handle of the candidate's handle_symbol trace, continued when its order is placed
+candidate_traces = {}
 
+@tracing.traced('bracket_order.handle_symbol', root=True)
 def handle_symbol(symbol):
+    tracing.set_attribute('symbol', symbol)
     try:
-        # Get the current holdings and open orders before checking the conditions
-        current_holdings = get_holdings(api)
-        open_orders_symbols = get_open_orders(api)
-
         # Prepare API URLs
         daily_url = f'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={ALPHA_VANTAGE_API}'
         rsi_url = f'https://www.alphavantage.co/query?function=RSI&symbol={symbol}&interval=daily&time_period=14&series_type=close&apikey={ALPHA_VANTAGE_API}'
@@ -219,23 +212,25 @@ def handle_symbol(symbol):
         sma_url = f'https://www.alphavantage.co/query?function=SMA&symbol={symbol}&interval=daily&time_period=30&series_type=close&apikey={ALPHA_VANTAGE_API}'
 
         # Make API requests
-        daily_data = requests.get(daily_url).json()
-        rsi_data = requests.get(rsi_url).json()
-        macd_data = requests.get(macd_url).json()
-        sma_data = requests.get(sma_url).json()
-
-        # Extract the first data point for each technical indicator
-        daily_point = list(daily_data['Time Series (Daily)'].values())[0]
-        rsi_point = list(rsi_data['Technical Analysis: RSI'].values())[0]
-        macd_point = list(macd_data['Technical Analysis: MACD'].values())[0]
-        sma_point = list(sma_data['Technical Analysis: SMA'].values())[0]
-
-        recent_close = float(daily_point['4. close'])
-
-        recent_rsi = float(rsi_point['RSI'])
-        recent_macd = float(macd_point['MACD'])
-        recent_signal = float(macd_point['MACD_Signal'])
-        recent_sma = float(sma_point['SMA'])
+        with tracing.span('data_fetch'):
+            daily_data = requests.get(daily_url).json()
+            rsi_data = requests.get(rsi_url).json()
+            macd_data = requests.get(macd_url).json()
+            sma_data = requests.get(sma_url).json()
+
+        with tracing.span('indicators'):
+            # Extract the first data point for each technical indicator
+            daily_point = list(daily_data['Time Series (Daily)'].values())[0]
+            rsi_point = list(rsi_data['Technical Analysis: RSI'].values())[0]
+            macd_point = list(macd_data['Technical Analysis: MACD'].values())[0]
+            sma_point = list(sma_data['Technical Analysis: SMA'].values())[0]
+
+            recent_close = float(daily_point['4. close'])
+
+            recent_rsi = float(rsi_point['RSI'])
+            recent_macd = float(macd_point['MACD'])
+            recent_signal = float(macd_point['MACD_Signal'])
+            recent_sma = float(sma_point['SMA'])
 
         if recent_rsi <= 70:
             print(f"{symbol}: RSI condition met. Current: {recent_rsi}")
@@ -254,29 +249,16 @@ def handle_symbol(symbol):
 
 
         if recent_rsi <= 70 and recent_macd >= recent_signal and recent_close <= recent_sma:
-            # Calculate shares
-            shares = rm.calculate_quantity(symbol)
-
-            # Print shares type
-            print(f"Shares type for {symbol}: {shares}")
-
-            # Calculate shares
-            shares = rm.calculate_quantity(symbol)
-
-            # Validate trade instead of manually calc the qty
-            is_valid = rm.validate_trade(symbol, shares, "buy")
-            if is_valid:
-                print(f"Trade validated for {symbol} with {shares} shares")
-            else:
-                print(f"Trade invalid for {symbol} with {shares} shares")
-                return
-
-            # Place order
-            place_order(api, symbol, shares, recent_close)
+            # Sized and validated together with the other candidates once every symbol is evaluated; the
+            # symbol's trace stays open until its order is placed or the planning rejects it
+            tracing.set_attribute('decision', 'candidate')
+            candidate_traces[symbol] = tracing.hold()
+            return recent_close
 
         else:
             print(f"{symbol}: Not all conditions met. No order placed.")
-            symbols_not_purchased.append(symbol)
+            tracing.set_attribute('decision', 'skip')
+            return 'skipped'
 
     except ValueError:
         print(f"Unable to fetch data for {symbol}. Skipping...")
@@ -284,16 +266,64 @@ def handle_symbol(symbol):
         print(f"An unexpected error occurred for {symbol}: {str(e)}")
 
 
+# Price the whole list in one batch request so the per-symbol checks read from the cache
+rm.prefetch_prices(symbols)
+
 # Use ThreadPoolExecutor to handle the symbols in parallel
-with ThreadPoolExecutor(max_workers=3) as executor:
-    futures = [executor.submit(handle_symbol, symbol) for symbol in symbols]
+pool = AdaptiveConcurrency('bracket_order', 'alpha_vantage', max_workers=MAX_WORKERS)
+with ThreadPoolExecutor(max_workers=pool.max_workers) as executor:
+    futures = {executor.submit(pool.wrap(handle_symbol), symbol): symbol for symbol in symbols}
+pool.close()
 
+# symbol -> recent close, for the symbols whose conditions were met
+candidates = {}
 for future in as_completed(futures):
     try:
         data = future.result()
+        if data == 'skipped':
+            symbols_not_purchased.append(futures[future])
+        elif data is not None:
+            candidates[futures[future]] = data
     except Exception as exc:
         print(f"An exception occurred in a thread: {str(exc)}")
 
+# Size and validate all candidates at once, so together they stay inside the class caps, cash and position
+# limits; each approved order holds a reservation until it is placed or abandoned
+# The planning span is shared by every candidate, so it links to their traces rather than joining one
+with tracing.span('bracket_order.plan_buys', root=True, links=list(candidate_traces.values()),
+                  candidates=len(candidates)) as plan_span:
+    planned = rm.plan_buys([symbol for symbol in symbols if symbol in candidates])
+for symbol in set(candidates) - {order.symbol for order, _ in planned}:
+    print(f"Trade invalid for {symbol}: no room left under the risk limits")
+    handle = candidate_traces.pop(symbol, None)
+    if handle is not None:
+        handle.set_attribute('decision', 'rejected')
+    tracing.release(handle)
+
+
+def submit_planned(order, reservation):
+    # continues the symbol's handle_symbol trace (a new one when tracing started without it)
+    handle = candidate_traces.pop(order.symbol, None)
+    try:
+        with tracing.span('bracket_order.submit_planned', root=True, parent=handle,
+                          links=[plan_span] if plan_span is not None else None,
+                          symbol=order.symbol, qty=order.qty):
+            print(f"Trade validated for {order.symbol} with {order.qty} shares")
+            with rm.symbol_lock(order.symbol):
+                # place_order commits the reservation once the entry is submitted; otherwise nothing was placed
+                if not place_order(api, order.symbol, order.qty, candidates[order.symbol], reservation):
+                    reservation.release()
+    finally:
+        tracing.release(handle)
+
+
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    for future in [executor.submit(submit_planned, order, reservation) for order, reservation in planned]:
+        try:
+            future.result()
+        except Exception as exc:
+            print(f"An exception occurred while placing an order: {str(exc)}")
+
 
 if symbols_not_purchased:
     unpurchased_tickers_message = f"Tickers that did not get purchased: {', '.join(symbols_not_purchased)}"
@@ -7,6 +7,8 @@ from azure.core.exceptions import AzureError
 from io import StringIO
 import credentials
 from s3connector import azure_connection_string
+from trading_core import profiling
+from trading_core.notifier import send_teams_message
 import timeit
 
 start_time = timeit.default_timer()
@@ -20,20 +22,6 @@ blob_service_client = BlobServiceClient.from_connection_string(azure_connection_
 container_name = 'historic'
 tickers_file = 'tickers.csv'
 
-def send_teams_message(teams_url, message):
-    data = {'text': message}
-    headers = {'Content-Type': 'application/json'}
-    try:
-        response = requests.post(teams_url, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
-        logging.info(f"Message sent to Teams successfully: {message}")
-    except requests.exceptions.HTTPError as http_err:
-        logging.error(f"HTTP error occurred when sending message to Teams: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logging.error(f"Request error occurred when sending message to Teams: {req_err}")
-    except Exception as e:
-        logging.error(f"Unexpected error occurred when sending message to Teams: {e}")
-
 teams_url = 'https://data874.webhook.office.com/webhookb2/9cb96ee7-c2ce-44bc-b4fe-fe2f6f308909@4f84582a-9476-452e-a8e6-0b57779f244f/IncomingWebhook/7e8bd751e7b4457aba27a1fddc7e8d9f/6d2e1385-bdb7-4890-8bc5-f148052c9ef5'
 
 send_teams_message(teams_url, "Script started.")
@@ -82,9 +70,10 @@ except AzureError as e:
 # Retrieve company overviews
 company_overviews = []
 
-for symbol in tickers_list:
-  overview = retrieve_company_overview(api_key, symbol)
-  company_overviews.append(overview)
+with profiling.stage('company_overviews.fetch'):
+    for symbol in tickers_list:
+        overview = retrieve_company_overview(api_key, symbol)
+        company_overviews.append(overview)
 
 # Filter out None
 company_overviews = [x for x in company_overviews if x is not None]
@@ -95,7 +84,8 @@ company_overviews_df = pd.DataFrame(company_overviews)
 # Save to CSV
 container_name = 'historic'
 
-save_dataframe_to_csv(company_overviews_df, container_name, 'company_overviews.csv')
+with profiling.stage('company_overviews.save'):
+    save_dataframe_to_csv(company_overviews_df, container_name, 'company_overviews.csv')
 
 end_time = timeit.default_timer()
 elapsed = end_time - start_time
@@ -1,26 +1,9 @@
-import numpy as np
-from scipy.optimize import minimize
+# Thin wrapper: the implementation lives in trading_core/port_op.py and is shared by every strategy directory.
+import os
+import sys
 
-def optimize_portfolio(expected_returns, covariance_matrix, risk_aversion, total_investment):
-    def objective(weights):
-        portfolio_return = np.dot(expected_returns, weights)
-        portfolio_risk = np.dot(weights.T, np.dot(covariance_matrix, weights))
-        return -(portfolio_return - risk_aversion * portfolio_risk)
+_here = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(_here) not in sys.path:
+    sys.path.insert(0, os.path.dirname(_here))
 
-    # Constraints (weights must sum to 1)
-    constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
-
-    # Bounds for weights
-    bounds = [(0, 1) for asset in range(len(expected_returns))]
-
-    # Initial guess (equal weighting)
-    initial_weights = [1./len(expected_returns) for asset in expected_returns]
-
-    # Run optimization
-    solution = minimize(objective, initial_weights, method='SLSQP', bounds=bounds, constraints=constraints)
-    optimal_weights = solution.x
-
-    # Calculate quantities to purchase for each asset
-    quantities_to_purchase = optimal_weights * total_investment / expected_returns
-
-    return quantities_to_purchase
+from trading_core.port_op import *
@@ -4,6 +4,13 @@ import os
 import logging
 import datetime
 import re
+import sys
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(_here) not in sys.path:
+    sys.path.insert(0, os.path.dirname(_here))
+
+from trading_core import profiling
 
 
 # Function to check if 'company_overviews.py' was run today
@@ -39,6 +46,12 @@ logging.basicConfig(filename=log_file_path, level=logging.INFO,
 # Get the current script's absolute directory path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
+# --profile (or TRADING_PROFILE=cpu,sample,memory) profiles each script; artifacts are written next to the logs
+os.environ.setdefault('TRADING_STAGE_HISTORY', os.path.join(script_dir, 'stage_durations.json'))
+if '--profile' in sys.argv or profiling.modes():
+    profiling.enable(os.environ.get('TRADING_PROFILE') or 'all',
+                     os.environ.get('TRADING_PROFILE_DIR') or os.path.join(script_dir, 'profiles'))
+
 # List your scripts in the desired order of execution
 scripts = [
     "selected_pairs_history.py",
@@ -56,7 +69,8 @@ def run_script_with_retries(script, max_retries=2, wait_time=20):
 
         # Run the script and capture its exit code
         try:
-            subprocess.check_call(["python3", script_path])
+            with profiling.stage(script, profile=False):
+                subprocess.check_call(profiling.command(script_path))
             break  # If the script is successful, break the loop
         except subprocess.CalledProcessError as e:
             logging.error(f"Error occurred while running {script}, exit code: {e.returncode}")
@@ -1,6 +1,5 @@
 import pandas as pd
-from azure.storage.blob import BlobServiceClient
-from s3connector import azure_connection_string
+from s3connector import get_blob_service_client
 from io import StringIO
 from alpha_vantage.timeseries import TimeSeries
 from alpha_vantage.techindicators import TechIndicators
@@ -8,6 +7,8 @@ import credentials
 import time
 import numpy as np
 import os
+import logging
+from trading_core.logs import get_logger
 
 # Additional Filters and Criteria
 
@@ -47,6 +48,8 @@ import os
 #   Example: Many tech companies like Apple and Amazon reported high quarterly earnings growth in 2020 due to the increased demand for digital services amidst the pandemic.
 
 
+log = get_logger('screen')
+
 ALPHA_VANTAGE_API_KEY = credentials.ALPHA_VANTAGE_API
 
 ts = TimeSeries(key=ALPHA_VANTAGE_API_KEY, output_format='pandas')
@@ -57,11 +60,11 @@ def get_current_price_and_sma(symbol, period=20):
     try:
         # Get daily stock price data
         daily_data, _ = ts.get_daily(symbol=symbol, outputsize='compact')
-        print(f"Daily data for {symbol}: {daily_data}")
+        log.debug("Daily data for %s: %s", symbol, daily_data)
 
         # Get the SMA data
         sma_data, _ = ti.get_sma(symbol=symbol, interval='daily', time_period=period)
-        print(f"SMA data for {symbol}: {sma_data}")
+        log.debug("SMA data for %s: %s", symbol, sma_data)
 
         # Get the current price (last row of the daily data close price)
         current_price = daily_data['4. close'].iloc[-1]
@@ -71,7 +74,7 @@ def get_current_price_and_sma(symbol, period=20):
 
         return current_price, sma_value
     except Exception as e:
-        print(f"An error occurred while fetching price and SMA for {symbol}: {e}")
+        log.warning("An error occurred while fetching price and SMA for %s: %s", symbol, e)
         return np.nan, np.nan
 
 
@@ -79,115 +82,120 @@ def get_rsi(symbol, period=14):
     try:
         # Get RSI data
         rsi_data, _ = ti.get_rsi(symbol=symbol, interval='daily', time_period=period)
-        print(f"RSI data for {symbol}: {rsi_data}")
+        log.debug("RSI data for %s: %s", symbol, rsi_data)
 
         # Get the latest RSI value (last row of the RSI data)
         rsi_value = rsi_data['RSI'].iloc[-1]
 
         return rsi_value
     except Exception as e:
-        print(f"An error occurred while fetching RSI for {symbol}: {e}")
+        log.warning("An error occurred while fetching RSI for %s: %s", symbol, e)
         return np.nan
 
 
-blob_service_client = BlobServiceClient.from_connection_string(azure_connection_string)
-container_name = "historic"
-file_name = "company_overviews.csv"
-
-container_client = blob_service_client.get_container_client(container_name)
-blob_client = container_client.get_blob_client(file_name)
-blob_data = blob_client.download_blob().readall().decode("utf-8")
-if blob_data:
-    df = pd.read_csv(StringIO(blob_data))
-else:
-    print("The blob data is empty.")
-    exit(1)
-
 numeric_cols = ["MarketCapitalization", "PERatio", "DividendYield", "RevenuePerShareTTM", "ProfitMargin",
                 "OperatingMarginTTM", "ReturnOnAssetsTTM", "ReturnOnEquityTTM", "QuarterlyEarningsGrowthYOY",
                 "QuarterlyRevenueGrowthYOY", "AnalystTargetPrice", "TrailingPE", "ForwardPE", "PriceToSalesRatioTTM",
                 "PriceToBookRatio", "EVToRevenue", "EVToEBITDA", "Beta"]
-df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
 
-# Drop rows where 'Sector' is NaN
-df = df.dropna(subset=['Sector'])
+selected_columns = ["Symbol", "Sector", "Industry", "MarketCapitalization", "PERatio",
+                    "DividendYield", "RevenuePerShareTTM", "ProfitMargin", "OperatingMarginTTM",
+                    "ReturnOnAssetsTTM", "ReturnOnEquityTTM", "QuarterlyEarningsGrowthYOY",
+                    "QuarterlyRevenueGrowthYOY", "AnalystTargetPrice", "TrailingPE", "ForwardPE",
+                    "PriceToSalesRatioTTM", "PriceToBookRatio", "EVToRevenue", "EVToEBITDA", "Beta"]
 
-average_pe_by_sector = df.groupby('Sector')['PERatio'].mean()
-df = df[df.apply(lambda row: row['PERatio'] < average_pe_by_sector[row['Sector']], axis=1)]
 min_market_cap = 1_000_000
 max_market_cap = 5_000_000_000_000
-df = df[(df["MarketCapitalization"] >= min_market_cap) & (df["MarketCapitalization"] <= max_market_cap)]
 
 
-# Print basic info about the DataFrame
-print(df.info())
+def load_company_overviews(blob_service_client, container_name="historic", file_name="company_overviews.csv"):
+    container_client = blob_service_client.get_container_client(container_name)
+    blob_client = container_client.get_blob_client(file_name)
+    blob_data = blob_client.download_blob().readall().decode("utf-8")
+    if blob_data:
+        return pd.read_csv(StringIO(blob_data))
+    print("The blob data is empty.")
+    return None
+
+
+def screen_companies(df, verbose=True):
+    """
+    Apply the valuation and quality filters to the company overviews and return the selected pairs.
+    """
+    df = df.copy()
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
 
-# Print the first 5 rows of the DataFrame
-print(df.head())
+    # Drop rows where 'Sector' is NaN
+    df = df.dropna(subset=['Sector'])
 
-# Print the last 5 rows of the DataFrame
-print(df.tail())
+    average_pe_by_sector = df.groupby('Sector')['PERatio'].mean()
+    df = df[df.apply(lambda row: row['PERatio'] < average_pe_by_sector[row['Sector']], axis=1)]
+    df = df[(df["MarketCapitalization"] >= min_market_cap) & (df["MarketCapitalization"] <= max_market_cap)]
 
-# Print descriptive statistics of the DataFrame
-print(df.describe())
+    if verbose and log.isEnabledFor(logging.DEBUG):
+        # Dump the screened DataFrame only when debug output is on; rendering it is not free
+        log.debug("Screened companies:\n%s\n%s", df.head(), df.tail())
+        log.debug("Descriptive statistics:\n%s", df.describe())
 
+    # Apply additional filters and criteria
+    df = df[df["ProfitMargin"] > -1.5]
+    log.info("Symbols left after ProfitMargin filter: %d", df.shape[0])
 
-# Apply additional filters and criteria
-df = df[df["ProfitMargin"] > -1.5]
-print(f"Symbols left after ProfitMargin filter: {df.shape[0]}")
+    df = df[df["PERatio"] >= 3.5]
+    log.info("Symbols left after PERatio filter: %d", df.shape[0])
 
-df = df[df["PERatio"] >= 3.5]
-print(f"Symbols left after PERatio filter: {df.shape[0]}")
+    df = df[df["ReturnOnEquityTTM"] >= 2.5]
+    log.info("Symbols left after ReturnOnEquityTTM filter: %d", df.shape[0])
 
-df = df[df["ReturnOnEquityTTM"] >= 2.5]
-print(f"Symbols left after ReturnOnEquityTTM filter: {df.shape[0]}")
+    df = df[df["EVToEBITDA"] >= 1.5]
+    log.info("Symbols left after EVToEBITDA filter: %d", df.shape[0])
 
-df = df[df["EVToEBITDA"] >= 1.5]
-print(f"Symbols left after EVToEBITDA filter: {df.shape[0]}")
+    df = df[df["QuarterlyEarningsGrowthYOY"] > -0.0078]
+    log.info("Symbols left after QuarterlyEarningsGrowthYOY filter: %d", df.shape[0])
 
-df = df[df["QuarterlyEarningsGrowthYOY"] > -0.0078]
-print(f"Symbols left after QuarterlyEarningsGrowthYOY filter: {df.shape[0]}")
+    df = df.sort_values("MarketCapitalization", ascending=False)
 
+    # Select all stocks by Market Capitalization within the specified range
+    selected_pairs = df[(df["MarketCapitalization"] >= min_market_cap) & (df["MarketCapitalization"] <= max_market_cap)]
 
-df = df.sort_values("MarketCapitalization", ascending=False)
+    # Output the selected pairs, now keeping multiple columns
+    return selected_pairs[selected_columns]
 
-df_grouped = df.groupby('Industry')
 
-selected_pairs = pd.DataFrame()
+def main():
+    blob_service_client = get_blob_service_client()
 
-# Select all stocks by Market Capitalization within the specified range
-selected_pairs = df[(df["MarketCapitalization"] >= min_market_cap) & (df["MarketCapitalization"] <= max_market_cap)]
+    df = load_company_overviews(blob_service_client)
+    if df is None:
+        exit(1)
 
+    selected_pairs = screen_companies(df)
 
-# Output the selected pairs, now keeping multiple columns
-selected_pairs = selected_pairs[["Symbol", "Sector", "Industry", "MarketCapitalization", "PERatio",
-                     "DividendYield", "RevenuePerShareTTM", "ProfitMargin", "OperatingMarginTTM",
-                     "ReturnOnAssetsTTM", "ReturnOnEquityTTM", "QuarterlyEarningsGrowthYOY",
-                     "QuarterlyRevenueGrowthYOY", "AnalystTargetPrice", "TrailingPE", "ForwardPE",
-                     "PriceToSalesRatioTTM", "PriceToBookRatio", "EVToRevenue", "EVToEBITDA", "Beta"]]
+    # Save to CSV
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    output_filename = "selected_pairs.csv"
+    output_filepath = os.path.join(script_dir, output_filename)
+    selected_pairs.to_csv(output_filepath, index=False)
 
-# Save to CSV
-script_dir = os.path.dirname(os.path.realpath(__file__))
-output_filename = "selected_pairs.csv"
-output_filepath = os.path.join(script_dir, output_filename)
-selected_pairs.to_csv(output_filepath, index=False)
+    print("Selected pairs saved to 'selected_pairs.csv' locally")
 
-print("Selected pairs saved to 'selected_pairs.csv' locally")
+    # Get blob client
+    blob_client = blob_service_client.get_blob_client("historic", "selected_pairs.csv")
 
+    # Upload the csv file to Azure Storage
+    with open(output_filepath, "rb") as data:
+        blob_client.upload_blob(data, overwrite=True)
+    print("Selected pairs saved to 'selected_pairs.csv' in Azure Storage")
 
-# Get blob client
-blob_client = blob_service_client.get_blob_client("historic", "selected_pairs.csv")
+    delay = 60 / 150  # Delay between requests in seconds
 
-# Upload the csv file to Azure Storage
-with open(output_filepath, "rb") as data:
-    blob_client.upload_blob(data, overwrite=True)
-print("Selected pairs saved to 'selected_pairs.csv' in Azure Storage")
+    for index, row in selected_pairs.iterrows():
+        symbol = row['Symbol']
+        current_price, sma_value = get_current_price_and_sma(symbol)
+        time.sleep(delay)
+        rsi_value = get_rsi(symbol)
+        time.sleep(delay)
 
-delay = 60 / 150  # Delay between requests in seconds
 
-for index, row in selected_pairs.iterrows():
-    symbol = row['Symbol']
-    current_price, sma_value = get_current_price_and_sma(symbol)
-    time.sleep(delay)
-    rsi_value = get_rsi(symbol)
-    time.sleep(delay)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
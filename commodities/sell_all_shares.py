@@ -1,14 +1,9 @@
-import alpaca_trade_api as tradeapi
-import credentials
+from risk_strategy import get_api
 import os
 import glob
 
-# Import API keys from credentials
-ALPACA_API_KEY = credentials.ALPACA_API_KEY
-ALPACA_SECRET_KEY = credentials.ALPACA_SECRET_KEY
-
-# Initialize the Alpaca API
-api = tradeapi.REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url='https://paper-api.alpaca.markets')
+# Initialize the Alpaca API (or the configured simulator)
+api = get_api()
 
 def close_position(position):
     symbol = position.symbol
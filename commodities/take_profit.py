@@ -1,8 +1,7 @@
-from alpaca_trade_api.rest import REST, TimeFrame
-from credentials import ALPACA_API_KEY, ALPACA_SECRET_KEY
+from risk_strategy import get_api
 
-# Initialize API
-api = REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url='https://paper-api.alpaca.markets')
+# Initialize API (or the configured simulator)
+api = get_api()
 
 # Get a list of all of our positions
 positions = api.list_positions()
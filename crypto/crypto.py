@@ -1,7 +1,22 @@
+import os
+import sys
 import requests
+import numpy as np
 import pandas as pd
 from credentials import ALPHA_VANTAGE_API
 import concurrent.futures
+import threading
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(_here) not in sys.path:
+    sys.path.insert(0, os.path.dirname(_here))
+
+from trading_core import configure_defaults
+from trading_core.bar_store import BarStore
+from trading_core.concurrency import AdaptiveConcurrency
+from trading_core.signals import SignalEngine
+
+configure_defaults(risk_params_path=os.path.join(_here, 'risk_params.json'))
 
 # Define the pairs
 usdt_usd_pairs = ['AAVE/USD', 'AVAX/USD', 'BCH/USD', 'BTC/USD', 'ETH/USD',
@@ -12,70 +27,114 @@ all_pairs = usdt_usd_pairs
 # Create a session object
 s = requests.Session()
 
+# CRYPTO_INTRADAY prices are quoted in this market; converting them to another quote needs an exchange rate
+MARKET = 'USD'
+INTRADAY_BARS = 288
+COMPACT_BARS = 100  # points in an outputsize=compact response
+
+_rates = {}
+_rates_lock = threading.Lock()
+
 
 def fetch_exchange_rate(base_currency, quote_currency):
+    if base_currency == quote_currency:
+        return 1.0
+    # one request per currency pair and run
+    with _rates_lock:
+        if (base_currency, quote_currency) in _rates:
+            return _rates[(base_currency, quote_currency)]
     url = f"https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={base_currency}&to_currency={quote_currency}&apikey={ALPHA_VANTAGE_API}"
     try:
         response = s.get(url).json()
-        exchange_rate = response["Realtime Currency Exchange Rate"]["5. Exchange Rate"]
-        return float(exchange_rate)
+        exchange_rate = float(response["Realtime Currency Exchange Rate"]["5. Exchange Rate"])
     except KeyError:
         print(f"No exchange rate found from {base_currency} to {quote_currency}")
         return None
     except Exception as e:
         print(f"Error while fetching exchange rate: {e}")
         return None
-
-
-def build_dataframe(latest_intraday_data, exchange_rate, base_crypto, quote):
-    dates, opens, highs, lows, closes, volumes = [], [], [], [], [], []
-    for date, data in latest_intraday_data:
-        dates.append(date)
-        opens.append(round(float(data['1. open']) * exchange_rate, 2))
-        highs.append(round(float(data['2. high']) * exchange_rate, 2))
-        lows.append(round(float(data['3. low']) * exchange_rate, 2))
-        closes.append(round(float(data['4. close']) * exchange_rate, 2))
-        volumes.append(round(float(data['5. volume']) * exchange_rate, 2))
+    with _rates_lock:
+        _rates[(base_currency, quote_currency)] = exchange_rate
+    return exchange_rate
+
+
+def fetch_intraday_bars(base_crypto, outputsize):
+    """
+    CRYPTO_INTRADAY 5-minute bars in the MARKET currency as a frame (oldest first), or None.
+    """
+    url = f"https://www.alphavantage.co/query?function=CRYPTO_INTRADAY&symbol={base_crypto}&market={MARKET}&interval=5min&outputsize={outputsize}&apikey={ALPHA_VANTAGE_API}"
+    response = s.get(url).json()
+    intraday_data = response.get('Time Series Crypto (5min)', {})
+    if not intraday_data:
+        return None
+    bars = pd.DataFrame.from_dict(intraday_data, orient='index', dtype=float)
+    bars.columns = [column.split('. ', 1)[-1] for column in bars.columns]
+    bars.index = pd.to_datetime(bars.index)
+    return bars.sort_index()
+
+
+def ingest_intraday(base_crypto, store=None):
+    """
+    Bring the stored 5-minute bars up to date and return them. With bars already stored, only the compact
+    response (the latest COMPACT_BARS points) is requested; the full history is fetched on the first run
+    or when the gap since the last stored bar is longer than the compact response covers.
+    """
+    if store is None:
+        return fetch_intraday_bars(base_crypto, 'full')
+
+    key = f"{base_crypto}/{MARKET}"
+    last = store.last_timestamp(key)
+    bars = fetch_intraday_bars(base_crypto, 'compact' if last is not None else 'full')
+    if last is not None and (bars is None or bars.index[0] > last):
+        bars = fetch_intraday_bars(base_crypto, 'full')
+    if bars is not None:
+        store.append(key, bars)
+    stored = store.load(key)
+    return stored if len(stored) else None
+
+
+def build_dataframe(bars, exchange_rate, base_crypto, quote):
+    converted = (bars[['open', 'high', 'low', 'close', 'volume']] * exchange_rate).round(2)
 
     df = pd.DataFrame({
-        'Date': dates,
-        'Crypto': [base_crypto] * len(latest_intraday_data),
-        'Quote': [quote] * len(latest_intraday_data),
-        'Open': opens,
-        'High': highs,
-        'Low': lows,
-        'Close': closes,
-        'Volume': volumes,
+        'Date': bars.index.strftime('%Y-%m-%d %H:%M:%S'),
+        'Crypto': base_crypto,
+        'Quote': quote,
+        'Open': converted['open'].values,
+        'High': converted['high'].values,
+        'Low': converted['low'].values,
+        'Close': converted['close'].values,
+        'Volume': converted['volume'].values,
     })
 
     return df.sort_values('Date')
 
 
-def fetch_intraday_stats(crypto):
+def fetch_intraday_stats(crypto, engine=None, store=None):
     base_crypto, quote = crypto.split('/')
-    exchange_rate = fetch_exchange_rate(base_crypto, quote)
+    exchange_rate = fetch_exchange_rate(MARKET, quote)
 
     if exchange_rate is None:
-        print(f"No exchange rate found for {base_crypto} to {quote}")
+        print(f"No exchange rate found for {MARKET} to {quote}")
         return None
 
-    url = f"https://www.alphavantage.co/query?function=CRYPTO_INTRADAY&symbol={base_crypto}&market=USD&interval=5min&outputsize=full&apikey={ALPHA_VANTAGE_API}"
     try:
-        response = s.get(url).json()
-        intraday_data = response.get('Time Series Crypto (5min)', {})
-        if not intraday_data:
+        bars = ingest_intraday(base_crypto, store)
+        if bars is None:
             print(f"No intraday data found for {crypto}")
             return None
 
-        latest_intraday_data = list(intraday_data.items())[:288]
-        df = build_dataframe(latest_intraday_data, exchange_rate, base_crypto, quote)
-        return apply_strategies(df)
+        df = build_dataframe(bars.iloc[-INTRADAY_BARS:], exchange_rate, base_crypto, quote)
+        return apply_strategies(df, engine, crypto)
     except Exception as e:
         print(f"Error while fetching intraday stats: {e}")
         return None
 
 
-def apply_strategies(df):
+def apply_strategies(df, engine=None, pair=None):
+    if engine is not None:
+        return apply_incremental_strategies(df, engine, pair)
+
     window_size = 20
     std_dev_factor = 1
     period = 14
@@ -96,17 +155,55 @@ def apply_strategies(df):
     return df
 
 
-with concurrent.futures.ThreadPoolExecutor(max_workers=15) as executor:
-    futures = [executor.submit(fetch_intraday_stats, pair) for pair in all_pairs]
-    historical_data = pd.DataFrame()
-    for f in concurrent.futures.as_completed(futures):
-        result = f.result()
-        if result is not None and not result.empty:
-            historical_data = pd.concat([historical_data, result])
-
-# Try to save to CSV
-try:
-    print(historical_data)
-    historical_data.to_csv("crypto_results.csv")
-except Exception as e:
-    print(f"Error while writing to CSV: {e}")
+def apply_incremental_strategies(df, engine, pair):
+    """
+    Same columns as apply_strategies, from the stateful signal engine: only bars newer than the previous run
+    are computed (O(1) each), the latest bar always has its signals, and older rows are left empty.
+    """
+    rows, signals = engine.apply(pair, df['Date'], df['Close'])
+    columns = {
+        'Mean': np.full(len(df), np.nan), 'Std Dev': np.full(len(df), np.nan),
+        'Buy Signal': np.full(len(df), None, dtype=object), 'Sell Signal': np.full(len(df), None, dtype=object),
+        'Mean Reversion Signal': np.full(len(df), None, dtype=object),
+        'Momentum': np.full(len(df), np.nan), 'Momentum Signal': np.full(len(df), None, dtype=object),
+    }
+    for row, signal in zip(rows, signals):
+        columns['Mean'][row], columns['Std Dev'][row] = signal.mean, signal.std
+        columns['Buy Signal'][row], columns['Sell Signal'][row] = signal.buy, signal.sell
+        columns['Mean Reversion Signal'][row] = signal.mean_reversion
+        columns['Momentum'][row], columns['Momentum Signal'][row] = signal.momentum, signal.momentum_signal
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
+
+def main(pairs=all_pairs, output_path="crypto_results.csv", incremental=True):
+    # bars and signal state persist between runs, so each run only fetches and computes the bars that are new
+    engine = SignalEngine.load() if incremental else None
+    store = BarStore('5min') if incremental else None
+    # at most 15 pairs at once; fewer while Alpha Vantage is slow, throttling or low on quota
+    pool = AdaptiveConcurrency('crypto', 'alpha_vantage', max_workers=15)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pool.max_workers) as executor:
+        futures = [executor.submit(pool.wrap(fetch_intraday_stats), pair, engine, store) for pair in pairs]
+        historical_data = pd.DataFrame()
+        for f in concurrent.futures.as_completed(futures):
+            result = f.result()
+            if result is not None and not result.empty:
+                historical_data = pd.concat([historical_data, result])
+    pool.close()
+
+    if engine is not None:
+        engine.save()
+
+    # Try to save to CSV
+    try:
+        print(historical_data)
+        historical_data.to_csv(output_path)
+    except Exception as e:
+        print(f"Error while writing to CSV: {e}")
+
+    return historical_data
+
+
+if __name__ == "__main__":
+    main()
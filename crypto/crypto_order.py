@@ -3,8 +3,12 @@ import logging
 import pandas as pd
 import alpaca_trade_api as tradeapi
 from credentials import ALPACA_API_KEY, ALPACA_SECRET_KEY
-from risk_strategy import RiskManagement, risk_params, send_teams_message, CryptoAsset, PortfolioManager
+from risk_strategy import RiskManagement, get_risk_params, get_api, send_teams_message, CryptoAsset, PortfolioManager
 from trade_stats import record_trade
+from trading_core import tracing
+from trading_core.assets import pair_symbol
+from trading_core.bar_store import BarStore
+from trading_core.resample import Resampler
 
 # Set up logging
 logging.basicConfig(filename='master_script.log', level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
@@ -54,23 +58,40 @@ def analyze_trend(short_term_SMA, long_term_SMA):
     return short_term_SMA > long_term_SMA
 
 
+# daily bars are aggregated from the 5-minute bars crypto.py stores, so they cost no API call
+daily_bars = Resampler(BarStore('5min'), calendar='crypto')
+
+
+def daily_moving_average(api, symbol, days=10):
+    pair = pair_symbol(symbol)
+    # only completed days count; until the store holds `days` of them, ask the API
+    daily = daily_bars.complete_bars(pair, '1D')
+    if len(daily) >= days:
+        return daily['close'].iloc[-days:].mean()
+    return api.get_crypto_bars(pair, '1Day', limit=days).df['close'].mean()
+
+
+@tracing.traced('crypto_order.process_buy', root=True)
 def process_buy(api, data, row, risk_management, teams_url, manager):
     symbol = get_symbol(row)
 
     if symbol is None:
         return
+    tracing.set_attribute('symbol', symbol)
 
-    # Get the last row for the symbol
-    row = data[data['Symbol'] == symbol].iloc[-1]
+    with tracing.span('data_fetch'):
+        # Get the last row for the symbol
+        row = data[data['Symbol'] == symbol].iloc[-1]
 
-    # Calculate Indicators
-    short_term_SMA = calculate_SMA(data, window=5)
-    long_term_SMA = calculate_SMA(data, window=10)
-    rsi = calculate_RSI(data)
-    macd_line, signal_line = calculate_MACD(data)
+    with tracing.span('indicators'):
+        # Calculate Indicators
+        short_term_SMA = calculate_SMA(data, window=5)
+        long_term_SMA = calculate_SMA(data, window=10)
+        rsi = calculate_RSI(data)
+        macd_line, signal_line = calculate_MACD(data)
 
-    # Analyzing trend (upward or downward)
-    upward_trend = analyze_trend(short_term_SMA.iloc[-1], long_term_SMA.iloc[-1])
+        # Analyzing trend (upward or downward)
+        upward_trend = analyze_trend(short_term_SMA.iloc[-1], long_term_SMA.iloc[-1])
 
     signal = row["Momentum Signal"]
     date = row["Date"]
@@ -84,6 +105,7 @@ def process_buy(api, data, row, risk_management, teams_url, manager):
     risk_management.check_momentum(symbol, momentum_signal)
 
     if pd.isnull(signal) or signal != "Buy":
+        tracing.set_attribute('decision', 'skip')
         return
 
     # Additional Buy Logic based on calculated indicators
@@ -102,8 +124,9 @@ def process_buy(api, data, row, risk_management, teams_url, manager):
 
     logging.info(f"Calculated quantity to buy: {quantity}")
 
-    # Validate the trade
-    if risk_management.validate_trade(symbol, quantity, "buy"):
+    # Validate the trade; an approved trade reserves its cash until the order is placed or abandoned
+    reservation = risk_management.validate_trade(symbol, quantity, "buy")
+    if reservation:
         logging.info(f"Buy order validated for {symbol}")
         print(f"Buy order validated for {symbol}")
 
@@ -119,14 +142,24 @@ def process_buy(api, data, row, risk_management, teams_url, manager):
 
             try:
                 # Place a market buy order
-                api.submit_order(**order_details)
-                logging.info(f'Buy order placed for {quantity} units of {symbol}.')
-                manager.add_asset(symbol, quantity, avg_entry_price * quantity)
-                manager.increment_operations()
+                with tracing.span('submit_order', side='buy') as span:
+                    order = api.submit_order(**order_details)
+                    if span is not None:
+                        span.set_attribute('order.id', getattr(order, 'id', ''))
+                        span.set_attribute('order.status', getattr(order, 'status', ''))
             except Exception as e:
+                reservation.release()
                 logging.error(f'Error placing buy order for {quantity} units of {symbol}: {str(e)}')
                 print(f'Error placing buy order for {quantity} units of {symbol}: {str(e)}')
                 return
+            # the order is live: commit before the bookkeeping, which must not release it
+            reservation.commit()
+            tracing.set_attribute('decision', 'buy')
+            try:
+                manager.record_fill(symbol, 'buy', quantity, entry_price or avg_entry_price)
+                manager.increment_operations()
+            except Exception as e:
+                logging.error(f'Buy order for {symbol} placed, but updating the portfolio totals failed: {str(e)}')
 
             logging.info(f'Buy order placed for {quantity} units of {symbol}')
             # Send a message to the team
@@ -135,15 +168,19 @@ def process_buy(api, data, row, risk_management, teams_url, manager):
             # Record the trade
             record_trade(symbol, 'buy', quantity, date)
         else:
+            reservation.release()
             logging.info(f"Order quantity for symbol {symbol} is not greater than 0. Can't place the order.")
     else:
         logging.info(f"Buy order not validated for {symbol}")
+        tracing.set_attribute('decision', 'rejected')
 
 
+@tracing.traced('crypto_order.process_sell', root=True)
 def process_sell(api, data, row, risk_management, teams_url, manager):
     symbol = get_symbol(row)
     if symbol is None:
         return
+    tracing.set_attribute('symbol', symbol)
 
     # Get the last row for the symbol
     row = data[data['Symbol'] == symbol].iloc[-1]
@@ -155,23 +192,22 @@ def process_sell(api, data, row, risk_management, teams_url, manager):
         return
 
     try:
-        # Get current position
-        position = api.list_positions(symbol)
-
+        # Get current position; nothing to sell if none is held
+        try:
+            position = api.get_position(symbol)
+        except tradeapi.rest.APIError as e:
+            if e.status_code != 404:
+                raise
+            logging.info(f"No position in {symbol} to sell.")
+            return
 
         # Get the quantity currently held for selling
-        if isinstance(position.qty, str):
-            quantity = float(position.qty)
-        else:
-            quantity = position.qty
-
-        # Convert quantity to float
         quantity = float(position.qty)
 
         if quantity > 0:
             # Calculate the trend by comparing the current price with a moving average
-            current_price = api.get_last_trade(symbol).price
-            moving_avg = api.get_barset(symbol, 'day', limit=10).df[symbol]['close'].mean()
+            current_price = risk_management.get_current_price(symbol)
+            moving_avg = daily_moving_average(api, symbol, days=10)
 
             if current_price > moving_avg:
                 # If the price is above the moving average, sell less than 50%
@@ -183,22 +219,30 @@ def process_sell(api, data, row, risk_management, teams_url, manager):
             logging.info(f"Order quantity for symbol {symbol} is not greater than 0. Can't place the order.")
             quantity_to_sell = 0
 
-        if quantity_to_sell > 0 and risk_management.validate_trade(symbol, quantity_to_sell, "sell"):
+        reservation = quantity_to_sell > 0 and risk_management.validate_trade(symbol, quantity_to_sell, "sell")
+        if reservation:
             try:
                 # Place a market sell order
-                api.submit_order(
-                    symbol=symbol,
-                    qty=quantity_to_sell,
-                    side='sell',
-                    type='market',
-                    time_in_force='gtc'
-                )
-                manager.update_asset_value(symbol, (
-                            quantity - quantity_to_sell) * current_price)  # Update asset value after selling
-                manager.increment_operations()  # increment the number of operations
+                with tracing.span('submit_order', side='sell'):
+                    api.submit_order(
+                        symbol=symbol,
+                        qty=quantity_to_sell,
+                        side='sell',
+                        type='market',
+                        time_in_force='gtc'
+                    )
             except Exception as e:
+                reservation.release()
                 logging.error(f'Error placing sell order for {quantity_to_sell} units of {symbol}: {str(e)}')
                 return
+            # the order is live: commit before the bookkeeping, which must not release it
+            reservation.commit()
+            tracing.set_attribute('decision', 'sell')
+            try:
+                manager.record_fill(symbol, 'sell', quantity_to_sell, current_price)  # Update asset value after selling
+                manager.increment_operations()  # increment the number of operations
+            except Exception as e:
+                logging.error(f'Sell order for {symbol} placed, but updating the portfolio totals failed: {str(e)}')
 
             logging.info(f'Sell order placed for {quantity_to_sell} units of {symbol}')
 
@@ -220,15 +264,15 @@ def process_sell(api, data, row, risk_management, teams_url, manager):
 
 def process_signals():
     # Setup Alpaca API connection
-    api = tradeapi.REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url='https://paper-api.alpaca.markets')
-
-    # Instantiate PortfolioManager
-    manager = PortfolioManager(api)
+    api = get_api()
 
     teams_url = 'https://data874.webhook.office.com/webhookb2/9cb96ee7-c2ce-44bc-b4fe-fe2f6f308909@4f84582a-9476-452e-a8e6-0b57779f244f/IncomingWebhook/7e8bd751e7b4457aba27a1fddc7e8d9f/6d2e1385-bdb7-4890-8bc5-f148052c9ef5'
 
     # Initialize RiskManagement
-    risk_management = RiskManagement(api, risk_params)
+    risk_management = RiskManagement(api, get_risk_params())
+
+    # Share the risk manager's PortfolioManager so fills keep its running totals current
+    manager = risk_management.refresh_positions(force=True)
 
     # Update asset values from 24 hours ago
     manager.update_asset_values_24h()
@@ -251,6 +295,9 @@ def process_signals():
     # Create an empty list to store the symbol details
     symbol_details = []
 
+    # One batch quote request for every signalled pair; process_buy's price lookups then hit the cache
+    risk_management.prefetch_prices(grouped['Symbol'].dropna().tolist())
+
     # Iterate over the rows of the DataFrame and process the signals
     for index, row in grouped.iterrows():
         process_buy(api, data, row, risk_management, teams_url, manager)
@@ -4,6 +4,12 @@ import time
 import os
 import logging
 
+_here = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(_here) not in sys.path:
+    sys.path.insert(0, os.path.dirname(_here))
+
+from trading_core import profiling
+
 # Create a logger
 logging.basicConfig(filename='master_script.log', level=logging.INFO,
                     format='%(asctime)s:%(levelname)s:%(message)s')
@@ -11,6 +17,12 @@ logging.basicConfig(filename='master_script.log', level=logging.INFO,
 # Get the current script's absolute directory path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
+# --profile (or TRADING_PROFILE=cpu,sample,memory) profiles each script; artifacts are written next to the logs
+os.environ.setdefault('TRADING_STAGE_HISTORY', os.path.join(script_dir, 'stage_durations.json'))
+if '--profile' in sys.argv or profiling.modes():
+    profiling.enable(os.environ.get('TRADING_PROFILE') or 'all',
+                     os.environ.get('TRADING_PROFILE_DIR') or os.path.join(script_dir, 'profiles'))
+
 # List your scripts in the desired order of execution
 scripts = [
     "crypto.py",
@@ -29,7 +41,8 @@ def run_script_with_retries(script, max_retries=2, wait_time=20):
 
         # Run the script and capture its exit code
         try:
-            result = subprocess.run(["python3", script_path], check=True)
+            with profiling.stage(script, profile=False):
+                result = subprocess.run(profiling.command(script_path), check=True)
             break  # If the script is successful, break the loop
         except subprocess.CalledProcessError as e:
             logging.error(f"Error occurred while running {script}, exit code: {e.returncode}")
@@ -0,0 +1,23 @@
+"""
+Shared trading modules used by the analysis, commodities and crypto scripts.
+
+The per-directory modules (risk_strategy.py, s3connector.py, ...) are thin wrappers around these,
+so clients and caches built here are shared when several strategies run in one process.
+"""
+import os
+
+from .config import TradingConfig, get_config, configure, configure_defaults
+
+# TRADING_METRICS_FILE / TRADING_METRICS_PORT turn on external call metrics for the run
+if os.environ.get('TRADING_METRICS_FILE') or os.environ.get('TRADING_METRICS_PORT'):
+    from . import metrics
+    metrics.enable_from_env()
+
+# TRADING_TRACE_FILE records per-symbol decision traces (see tracing.py)
+if os.environ.get('TRADING_TRACE_FILE'):
+    from . import tracing
+    tracing.enable_from_env()
+
+# TRADING_STREAM=1 reads prices from the market data websocket instead of polling (see stream.py)
+if os.environ.get('TRADING_STREAM', '').lower() in ('1', 'true', 'yes'):
+    configure(streaming=True)
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import namedtuple
+
+from .config import get_config
+from .logs import get_logger
+
+log = get_logger('assets')
+
+AssetInfo = namedtuple('AssetInfo', ['symbol', 'asset_class', 'fractionable', 'tradable',
+                                     'min_order_size', 'min_trade_increment', 'price_increment'])
+
+ASSET_CLASSES = ('us_equity', 'crypto')
+
+
+def _field(asset, name, default=None):
+    # list_assets returns entities, or plain dicts when the client runs with raw data
+    if isinstance(asset, dict):
+        return asset.get(name, default)
+    return getattr(asset, name, default)
+
+
+def _float_or_none(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_symbol(symbol):
+    """
+    Positions report crypto as BTCUSD while orders/assets use BTC/USD; index both under one key.
+    """
+    return symbol.replace('/', '').upper()
+
+
+def pair_symbol(symbol, quote_suffix='USD'):
+    """
+    BTCUSD / BTC/USD -> BTC/USD, the form orders and the crypto market-data endpoints expect.
+    """
+    if '/' in symbol or not symbol.endswith(quote_suffix) or symbol == quote_suffix:
+        return symbol
+    return f"{symbol[:-len(quote_suffix)]}/{quote_suffix}"
+
+
+def asset_info_from_api(asset):
+    return AssetInfo(
+        symbol=_field(asset, 'symbol'),
+        asset_class=_field(asset, 'class'),
+        fractionable=bool(_field(asset, 'fractionable', False)),
+        tradable=bool(_field(asset, 'tradable', False)),
+        min_order_size=_float_or_none(_field(asset, 'min_order_size')),
+        min_trade_increment=_float_or_none(_field(asset, 'min_trade_increment')),
+        price_increment=_float_or_none(_field(asset, 'price_increment')),
+    )
+
+
+class AssetIndex:
+    """
+    In-memory asset metadata (class, fractionable/tradable flags, order size and price increments).
+
+    Built from one list_assets call per asset class and refreshed once the data is older than
+    refresh_interval, so per-order lookups are dict reads instead of get_asset round trips.
+    Symbols missing from the index fall back to a single get_asset call whose result is kept; a symbol
+get_asset has no data for is remembered as missing, so it is not asked again until the next refresh.
+    """
+
+    def __init__(self, api, refresh_interval=24 * 60 * 60, asset_classes=ASSET_CLASSES, config=None):
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self.asset_classes = asset_classes
+        self.config = config or get_config()
+        self._assets = {}
+        self._missing = set()  # symbols get_asset had no data for since the last refresh
+        self._loaded_at = None
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()  # guards writes to _assets and _missing
+
+    def refresh(self):
+        """
+        Rebuild the index from list_assets. On failure the previous data is kept.
+        """
+        assets = {}
+        try:
+            for asset_class in self.asset_classes:
+                for asset in self.api.list_assets(status='active', asset_class=asset_class):
+                    info = asset_info_from_api(asset)
+                    if info.symbol:
+                        assets[normalize_symbol(info.symbol)] = info
+        except Exception as e:
+            log.warning("Could not refresh asset metadata: %s", e)
+            # try again after a short pause instead of on every lookup
+            self._loaded_at = time.monotonic() - self.refresh_interval + 60
+            return False
+
+        # swap the whole dict so readers never see a partially built index
+        with self._lock:
+            self._assets = assets
+            self._missing = set()
+        self._loaded_at = time.monotonic()
+        return True
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.refresh_interval:
+            return
+
+        # the first load blocks; later refreshes are done by one thread while others keep reading old data
+        if self._refresh_lock.acquire(blocking=loaded_at is None):
+            try:
+                if self._loaded_at == loaded_at:
+                    self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+    def get(self, symbol):
+        self._ensure_fresh()
+        key = normalize_symbol(symbol)
+        info = self._assets.get(key)
+        if info is None and key not in self._missing:
+            info = self._fetch_single(symbol)
+        return info
+
+    def _fetch_single(self, symbol):
+        key = normalize_symbol(symbol)
+        try:
+            info = asset_info_from_api(self.api.get_asset(symbol))
+        except Exception as e:
+            log.warning("No asset metadata for %s: %s", symbol, e)
+            with self._lock:
+                self._missing.add(key)
+            return None
+        with self._lock:
+            self._assets[key] = info
+        return info
+
+    def __contains__(self, symbol):
+        self._ensure_fresh()
+        return normalize_symbol(symbol) in self._assets
+
+    def is_crypto(self, symbol):
+        self._ensure_fresh()
+        info = self._assets.get(normalize_symbol(symbol))
+        if info is None or info.asset_class is None:
+            return self.config.is_crypto(symbol)
+        return info.asset_class == 'crypto'
+
+    def is_fractionable(self, symbol):
+        info = self.get(symbol)
+        return info.fractionable if info is not None else False
+
+    def is_tradable(self, symbol):
+        info = self.get(symbol)
+        return info.tradable if info is not None else False
+
+    def crypto_symbols(self, quote=None):
+        """
+        Tradable crypto pairs quoted in `quote` (defaults to the configured crypto quote currency).
+        Falls back to the configured list when the index could not be loaded.
+        """
+        self._ensure_fresh()
+        quote = quote or self.config.crypto_quote_suffix
+        symbols = sorted(info.symbol for info in self._assets.values()
+                         if info.asset_class == 'crypto' and info.tradable and info.symbol.endswith('/' + quote))
+        return symbols or list(self.config.crypto_symbols)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_asset_index(api):
+    """
+    Return the AssetIndex for an API client, shared by everything in the process that uses that client.
+    """
+    with _indexes_lock:
+        index = _indexes.get(id(api))
+        if index is None or index.api is not api:
+            index = AssetIndex(api)
+            _indexes[id(api)] = index
+        return index
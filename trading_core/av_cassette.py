@@ -0,0 +1,299 @@
+"""
+Record/replay layer for Alpha Vantage HTTP calls.
+
+install() hooks requests at the transport level (Session.get_adapter), so requests.get, shared
+sessions and the alpha_vantage library are all covered without touching the calling code.
+Responses are stored gzip-compressed, one file per request, keyed by function, symbol and the
+remaining query parameters with the apikey stripped. Replays can add latency and return the
+same "call frequency" notes the live API sends when the quota runs out.
+
+Run an existing script against a cassette directory:
+
+    python -m trading_core.av_cassette record --dir cassettes/av crypto/crypto.py
+    python -m trading_core.av_cassette replay --dir cassettes/av --latency 0.2 crypto/crypto.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlsplit, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+AV_URL_PREFIX = 'https://www.alphavantage.co/'
+
+MODES = ('record', 'replay', 'auto')
+
+# the keys Alpha Vantage uses for quota notes; these are never written to a cassette
+QUOTA_KEYS = ('Note', 'Information')
+QUOTA_NOTE = ('Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute '
+              'and 500 calls per day. Please visit https://www.alphavantage.co/premium/ if you would like '
+              'to target a higher API call frequency.')
+
+STRIPPED_PARAMS = ('apikey',)
+# the alpha_vantage library always sends these; dropping them lets raw URLs and library calls share entries
+DEFAULT_PARAMS = {'datatype': 'json', 'outputsize': 'compact'}
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """
+    Raised in replay mode for a request that has not been recorded. Subclasses ConnectionError
+    so the scripts' existing network error handling applies.
+    """
+
+
+def request_key(url):
+    """
+    (function, symbol, params) for an Alpha Vantage URL, with the apikey removed.
+    """
+    params = {k: v for k, v in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+              if k.lower() not in STRIPPED_PARAMS and DEFAULT_PARAMS.get(k.lower()) != v}
+    function = params.pop('function', 'UNKNOWN')
+    symbol = params.pop('symbol', None) or params.pop('from_currency', None) or params.pop('keywords', None) or ''
+    if 'to_currency' in params:
+        symbol = f"{symbol}-{params.pop('to_currency')}"
+    return function.upper(), symbol.upper(), tuple(sorted(params.items()))
+
+
+def _safe(part):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', part) or '_'
+
+
+def cassette_path(directory, key):
+    function, symbol, params = key
+    digest = hashlib.sha1(urlencode(params).encode()).hexdigest()[:12]
+    return os.path.join(directory, _safe(function), f"{_safe(symbol)}-{digest}.json.gz")
+
+
+def _strip_apikey(url):
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k.lower() not in STRIPPED_PARAMS])
+    return parts._replace(query=query).geturl()
+
+
+def _is_quota_note(body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and len(payload) == 1 and next(iter(payload)) in QUOTA_KEYS
+
+
+class Cassette:
+    """
+    A directory of recorded Alpha Vantage responses.
+
+    mode: 'record' always calls the API and stores the result, 'replay' never touches the network
+    and raises CassetteMissError for unknown requests, 'auto' replays what exists and records the rest.
+    latency/latency_jitter: seconds added to every replayed call.
+    quota_per_minute: return the live quota note once more calls than this are made in 60 seconds.
+    quota_error_rate: probability of returning the quota note on any replayed call.
+    """
+
+    def __init__(self, directory, mode='replay', latency=0.0, latency_jitter=0.0, quota_per_minute=None,
+                 quota_error_rate=0.0, seed=None, sleep=time.sleep):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.quota_per_minute = quota_per_minute
+        self.quota_error_rate = quota_error_rate
+        self.sleep = sleep
+        self.stats = Counter()
+        self.calls_by_function = Counter()
+        self._random = random.Random(seed)
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._live = HTTPAdapter()
+
+    def load(self, key):
+        path = cassette_path(self.directory, key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, url, status_code, headers, body):
+        path = cassette_path(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'url': _strip_apikey(url),
+            'status_code': status_code,
+            'content_type': headers.get('Content-Type', 'application/json'),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'body': body,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps(entry).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _quota_exceeded(self):
+        with self._lock:
+            if self.quota_error_rate and self._random.random() < self.quota_error_rate:
+                return True
+            if self.quota_per_minute is None:
+                return False
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= self.quota_per_minute:
+                return True
+            self._window.append(now)
+            return False
+
+    def _delay(self):
+        if not self.latency and not self.latency_jitter:
+            return
+        with self._lock:
+            jitter = self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+        self.sleep(self.latency + jitter)
+
+    def _count(self, name, function=None):
+        with self._lock:
+            self.stats[name] += 1
+            if function is not None:
+                self.calls_by_function[function] += 1
+
+    def handle(self, request, **kwargs):
+        key = request_key(request.url)
+        self._count('calls', key[0])
+
+        entry = self.load(key) if self.mode != 'record' else None
+        if entry is not None:
+            self._delay()
+            if self._quota_exceeded():
+                self._count('quota_errors')
+                return _build_response(request, 200, 'application/json', json.dumps({'Note': QUOTA_NOTE}))
+            self._count('hits')
+            return _build_response(request, entry['status_code'], entry['content_type'], entry['body'])
+
+        if self.mode == 'replay':
+            self._count('misses')
+            raise CassetteMissError(f"No recorded response for {key[0]} {key[1]} in {self.directory}",
+                                    request=request)
+
+        response = self._live.send(request, **kwargs)
+        body = response.text
+        if response.status_code == 200 and not _is_quota_note(body):
+            self.save(key, request.url, response.status_code, response.headers, body)
+            self._count('recorded')
+        else:
+            self._count('not_recorded')
+        return response
+
+    def close(self):
+        self._live.close()
+
+
+def _build_response(request, status_code, content_type, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers['Content-Type'] = content_type
+    response._content = body.encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK' if status_code == 200 else ''
+    return response
+
+
+class CassetteAdapter(BaseAdapter):
+    def __init__(self, cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        return self.cassette.handle(request, **kwargs)
+
+    def close(self):
+        pass
+
+
+_installed = None
+_original_get_adapter = requests.Session.get_adapter
+
+
+def _get_adapter(session, url):
+    cassette = _installed
+    if cassette is not None and url.lower().startswith(AV_URL_PREFIX):
+        return CassetteAdapter(cassette)
+    return _original_get_adapter(session, url)
+
+
+def install(cassette):
+    """
+    Route every Alpha Vantage request in the process through `cassette` until uninstall() is called.
+    """
+    global _installed
+    _installed = cassette
+    requests.Session.get_adapter = _get_adapter
+    return cassette
+
+
+def uninstall():
+    global _installed
+    cassette, _installed = _installed, None
+    requests.Session.get_adapter = _original_get_adapter
+    if cassette is not None:
+        cassette.close()
+    return cassette
+
+
+@contextmanager
+def use_cassette(directory, mode='replay', **options):
+    cassette = install(Cassette(directory, mode=mode, **options))
+    try:
+        yield cassette
+    finally:
+        uninstall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script with Alpha Vantage calls recorded or replayed.")
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('--dir', required=True, help="cassette directory")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to each replayed call")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument('--quota-per-minute', type=int, default=None)
+    parser.add_argument('--quota-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+
+    script = os.path.abspath(options.script)
+    cassette = Cassette(os.path.abspath(options.dir), mode=options.mode, latency=options.latency,
+                        latency_jitter=options.jitter, quota_per_minute=options.quota_per_minute,
+                        quota_error_rate=options.quota_error_rate, seed=options.seed)
+    install(cassette)
+    sys.argv = [script] + options.args
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        uninstall()
+        print(f"Alpha Vantage cassette ({options.mode}): {dict(cassette.stats)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
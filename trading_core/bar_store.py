@@ -0,0 +1,79 @@
+"""
+Per-symbol OHLCV bars kept on disk, so ingestion only has to fetch what is new.
+
+One CSV per symbol and timeframe under <state dir>/bars/<timeframe>/. append() merges a freshly fetched
+frame into what is stored: bars newer than the stored ones are added, and an overlapping bar replaces
+the stored one, because the latest bar may still have been forming. The newest `max_bars` are kept.
+
+    store = BarStore('5min')
+    since = store.last_timestamp('BTC-USD')     # None on the first run: fetch the full history
+    store.append('BTC-USD', fetched)            # columns open, high, low, close, volume; DatetimeIndex
+    bars = store.load('BTC-USD')
+"""
+import os
+import threading
+
+import pandas as pd
+
+from .config import get_config
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MAX_BARS = 4032  # two weeks of 5-minute bars, enough for the 10-day averages
+
+
+class BarStore:
+    def __init__(self, timeframe, directory=None, max_bars=MAX_BARS):
+        self.timeframe = timeframe
+        self.directory = directory or os.path.join(get_config().get_state_dir(), 'bars', timeframe)
+        self.max_bars = max_bars
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol):
+        return os.path.join(self.directory, f"{symbol.replace('/', '-')}.csv")
+
+    def load(self, symbol):
+        """
+        The stored bars (oldest first), or an empty frame.
+        """
+        with self._lock:
+            frame = self._frames.get(symbol)
+        if frame is not None:
+            return frame
+        path = self.path(symbol)
+        if os.path.exists(path):
+            frame = pd.read_csv(path, index_col=0, parse_dates=True)[COLUMNS]
+        else:
+            frame = pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='timestamp'), dtype=float)
+        with self._lock:
+            self._frames[symbol] = frame
+        return frame
+
+    def last_timestamp(self, symbol):
+        frame = self.load(symbol)
+        return frame.index[-1] if len(frame) else None
+
+    def append(self, symbol, bars):
+        """
+        Merge `bars` into the stored series and save it. Returns the number of bars that were not stored yet.
+        """
+        stored = self.load(symbol)
+        bars = bars[COLUMNS].astype(float).sort_index()
+        bars = bars[~bars.index.duplicated(keep='last')]
+        if len(stored):
+            new = int((bars.index > stored.index[-1]).sum())
+            merged = pd.concat([stored[~stored.index.isin(bars.index)], bars]).sort_index()
+        else:
+            new = len(bars)
+            merged = bars
+        merged = merged.iloc[-self.max_bars:]
+        merged.index.name = 'timestamp'
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(symbol)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        merged.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._frames[symbol] = merged
+        return new
@@ -0,0 +1,115 @@
+"""
+Filesystem-backed stand-in for the subset of azure.storage.blob.BlobServiceClient used by the scripts.
+
+Blobs are plain files under root/<container>/<blob>, so separate processes (e.g. the two stages of a
+benchmark run) see each other's uploads. configure(blob_factory=lambda: LocalBlobService(root)) makes
+s3connector.get_blob_service_client() return it.
+"""
+import os
+import shutil
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from . import metrics
+
+
+class _Download:
+    def __init__(self, path):
+        self._path = path
+
+    def readall(self):
+        with open(self._path, 'rb') as f:
+            return f.read()
+
+    def readinto(self, stream):
+        with open(self._path, 'rb') as f:
+            shutil.copyfileobj(f, stream)
+        return os.path.getsize(self._path)
+
+    def content_as_text(self, encoding='UTF-8'):
+        return self.readall().decode(encoding)
+
+
+class LocalBlobClient:
+    def __init__(self, service, container, blob):
+        self.service = service
+        self.container_name = container
+        self.blob_name = blob
+
+    @property
+    def path(self):
+        return os.path.join(self.service.root, self.container_name, self.blob_name)
+
+    def download_blob(self, *args, **kwargs):
+        self.service._call('download_blob')
+        if not os.path.exists(self.path):
+            raise ResourceNotFoundError(f"The specified blob does not exist: {self.container_name}/{self.blob_name}")
+        return _Download(self.path)
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        self.service._call('upload_blob')
+        path = self.path
+        if os.path.exists(path) and not overwrite:
+            raise ValueError(f"Blob already exists: {self.container_name}/{self.blob_name}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+        os.replace(tmp_path, path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+class LocalContainerClient:
+    def __init__(self, service, container):
+        self.service = service
+        self.container_name = container
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self.service, self.container_name, blob)
+
+    def download_blob(self, blob, *args, **kwargs):
+        return self.get_blob_client(blob).download_blob()
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        return self.get_blob_client(name).upload_blob(data, overwrite=overwrite)
+
+    def list_blobs(self):
+        self.service._call('list_blobs')
+        directory = os.path.join(self.service.root, self.container_name)
+        if not os.path.isdir(directory):
+            return []
+        return [SimpleNamespace(name=name) for name in sorted(os.listdir(directory)) if not name.endswith('.tmp')]
+
+
+class LocalBlobService:
+    def __init__(self, root):
+        self.root = root
+        self.call_counts = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _call(self, endpoint):
+        with self._lock:
+            self.call_counts[endpoint] += 1
+        metrics.record('azure_blob', endpoint, 0.0)
+
+    def get_container_client(self, container):
+        return LocalContainerClient(self, container)
+
+    def get_blob_client(self, container, blob):
+        return LocalBlobClient(self, container, blob)
+
+    def list_containers(self):
+        self._call('list_containers')
+        return [SimpleNamespace(name=name) for name in sorted(os.listdir(self.root))
+                if os.path.isdir(os.path.join(self.root, name))]
@@ -0,0 +1,729 @@
+"""
+Deterministic in-process stand-in for the subset of alpaca_trade_api.REST used by the trading scripts.
+
+Orders are matched against recorded bars loaded with load_bars(); the clock only moves when advance()
+is called, so a run with the same bars and the same calls always produces the same fills. Per-call
+latency and Alpaca's per-minute rate limit can be simulated to load-test the scripts without a network.
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+from alpaca_trade_api.entity import Account, AccountActivity, Asset, Entity, Order, PortfolioHistory, Position
+from alpaca_trade_api.entity_v2 import BarV2
+from alpaca_trade_api.rest import APIError
+
+from . import metrics
+from .assets import normalize_symbol
+
+NY = 'America/New_York'
+
+OPEN_STATUSES = ('new', 'accepted', 'partially_filled', 'held')
+
+
+class SimulatedAPIError(APIError):
+    """
+    APIError raised by the simulator; status_code mirrors what the live endpoint would return.
+    """
+
+    def __init__(self, message, status_code, code=None):
+        super().__init__({'message': message, 'code': code or status_code})
+        self._status_code = status_code
+
+    @property
+    def status_code(self):
+        return self._status_code
+
+
+class SimBars(list):
+    """
+    List of BarV2 entities with the .df view that get_bars results provide.
+    """
+
+    def __init__(self, bars, frame):
+        super().__init__(bars)
+        self.df = frame
+
+
+class SimBarSet(dict):
+    """
+    Minimal get_barset result: barset.df[symbol]['close'] and barset[symbol] work as with the v1 API.
+    """
+
+    def __init__(self, frames):
+        super().__init__({symbol: SimBars(_frame_to_bars(symbol, frame), frame) for symbol, frame in frames.items()})
+        self.df = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+
+def _frame_to_bars(symbol, frame):
+    return [BarV2({'S': symbol, 't': ts.isoformat(), 'o': row.open, 'h': row.high, 'l': row.low,
+                   'c': row.close, 'v': row.volume}) for ts, row in zip(frame.index, frame.itertuples())]
+
+
+_TIMEFRAME_RULES = {
+    'minute': '1min', '1min': '1min', '5min': '5min', '15min': '15min',
+    'hour': '1h', '1hour': '1h', 'day': '1D', '1day': '1D',
+}
+
+
+def _to_ns(value, tz=NY):
+    # naive dates/times are read in the given timezone, like the live API does for date_start/date_end
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize(tz) if ts.tz is None else ts).value
+
+
+def _resample_rule(timeframe):
+    if timeframe is None:
+        return None
+    key = str(getattr(timeframe, 'value', timeframe)).lower().replace(' ', '')
+    return _TIMEFRAME_RULES.get(key, key)
+
+
+class _SymbolBars:
+    def __init__(self, frame):
+        frame = frame.sort_index()
+        self.index = frame.index
+        self.ts = frame.index.asi8
+        self.open = frame['open'].to_numpy(dtype=float)
+        self.high = frame['high'].to_numpy(dtype=float)
+        self.low = frame['low'].to_numpy(dtype=float)
+        self.close = frame['close'].to_numpy(dtype=float)
+        self.volume = frame['volume'].to_numpy(dtype=float) if 'volume' in frame else np.zeros(len(frame))
+
+    def cursor(self, now_ns):
+        # index of the last bar at or before now, -1 if none yet
+        return int(np.searchsorted(self.ts, now_ns, side='right')) - 1
+
+    def frame(self, end_cursor, start_cursor=0):
+        sl = slice(max(0, start_cursor), end_cursor + 1)
+        return pd.DataFrame({'open': self.open[sl], 'high': self.high[sl], 'low': self.low[sl],
+                             'close': self.close[sl], 'volume': self.volume[sl]}, index=self.index[sl])
+
+
+class SimulatedBroker:
+    """
+    Parameters:
+        cash: starting cash.
+        latency: seconds added to every call, or a (low, high) range drawn from a seeded RNG.
+        rate_limit: calls allowed per rolling minute (Alpaca's default is 200); None disables it.
+        rate_limit_mode: 'raise' returns HTTP 429 errors like the live API, 'block' waits for a free slot.
+        slippage_bps: applied to market fills against the bar close.
+    """
+
+    def __init__(self, cash=100000.0, latency=0.0, rate_limit=None, rate_limit_mode='raise', slippage_bps=0.0,
+                 seed=0, sleep=time.sleep, clock=time.monotonic):
+        self.starting_cash = float(cash)
+        self.cash = float(cash)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_mode = rate_limit_mode
+        self.slippage_bps = slippage_bps
+        self.call_counts = Counter()
+        self.throttled_calls = 0
+        self._rng = random.Random(seed)
+        self._sleep = sleep
+        self._clock = clock
+        self._calls = deque()
+        self._lock = threading.RLock()
+        self._bars = {}
+        self._assets = {}
+        self._positions = {}
+        self._orders = {}
+        self._activities = []
+        self._equity_history = []
+        self._timeline = np.array([], dtype='int64')
+        self._now = None
+        self._order_seq = 0
+
+    # ----- setup -----
+
+    def add_asset(self, symbol, asset_class=None, fractionable=True, tradable=True, min_order_size=None,
+                  min_trade_increment=None, price_increment=None):
+        if asset_class is None:
+            asset_class = 'crypto' if '/' in symbol else 'us_equity'
+        self._assets[normalize_symbol(symbol)] = {
+            'id': f"asset-{normalize_symbol(symbol)}", 'symbol': symbol, 'class': asset_class,
+            'exchange': 'CRYPTO' if asset_class == 'crypto' else 'NASDAQ', 'status': 'active',
+            'tradable': tradable, 'fractionable': fractionable, 'marginable': False, 'shortable': False,
+            'min_order_size': min_order_size, 'min_trade_increment': min_trade_increment,
+            'price_increment': price_increment,
+        }
+
+    def load_bars(self, symbol, frame):
+        """
+        Register recorded bars (DataFrame with open/high/low/close[/volume] and a DatetimeIndex) for a symbol.
+        """
+        frame = frame.copy()
+        frame.columns = [str(c).lower() for c in frame.columns]
+        index = pd.DatetimeIndex(frame.index).as_unit('ns')
+        frame.index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        with self._lock:
+            key = normalize_symbol(symbol)
+            if key not in self._assets:
+                self.add_asset(symbol)
+            self._bars[key] = _SymbolBars(frame)
+            self._timeline = np.union1d(self._timeline, self._bars[key].ts)
+            if self._now is None and len(self._timeline):
+                self._now = int(self._timeline[0])
+
+    def add_position(self, symbol, qty, avg_entry_price):
+        """
+        Start the account with a holding (bought before the simulation, so cash is not charged).
+        """
+        with self._lock:
+            key = normalize_symbol(symbol)
+            if key not in self._assets:
+                self.add_asset(symbol)
+            self._positions[key] = {'qty': float(qty), 'avg_entry_price': float(avg_entry_price)}
+
+    def load_bars_csv(self, path):
+        """
+        Load a long-format CSV with timestamp, symbol, open, high, low, close and volume columns.
+        """
+        data = pd.read_csv(path, parse_dates=['timestamp'])
+        for symbol, frame in data.groupby('symbol'):
+            self.load_bars(symbol, frame.set_index('timestamp').drop(columns=['symbol']))
+
+    # ----- clock -----
+
+    @property
+    def now(self):
+        return pd.Timestamp(self._now, tz='UTC') if self._now is not None else None
+
+    def advance(self, steps=1, until=None):
+        """
+        Move the clock forward by `steps` timeline bars (or up to `until`) and match open orders on the way.
+        Returns False once the recorded bars are exhausted.
+        """
+        with self._lock:
+            if self._now is None:
+                return False
+            position = int(np.searchsorted(self._timeline, self._now, side='right'))
+            if until is not None:
+                target = int(np.searchsorted(self._timeline, pd.Timestamp(until).value, side='right')) - 1
+            else:
+                target = position + steps - 1
+            target = min(target, len(self._timeline) - 1)
+            if target < position:
+                return False
+
+            for i in range(position, target + 1):
+                previous = self._now
+                self._now = int(self._timeline[i])
+                if self._ny_date(previous) != self._ny_date(self._now):
+                    self._expire_day_orders()
+                self._match_open_orders()
+                self._equity_history.append((self._now, self._equity()))
+            return target < len(self._timeline) - 1
+
+    def run(self, on_bar=None):
+        """
+        Step through all remaining bars, calling on_bar(broker) after each one.
+        """
+        while self.advance():
+            if on_bar is not None:
+                on_bar(self)
+
+    @staticmethod
+    def _ny_date(ns):
+        return pd.Timestamp(ns, tz='UTC').tz_convert(NY).date()
+
+    def _iso(self, ns=None):
+        ns = self._now if ns is None else ns
+        return pd.Timestamp(ns, tz='UTC').isoformat() if ns is not None else None
+
+    # ----- call accounting -----
+
+    def _call(self, endpoint):
+        self.call_counts[endpoint] += 1
+        start = time.perf_counter()
+
+        if self.rate_limit:
+            while True:
+                with self._lock:
+                    now = self._clock()
+                    while self._calls and now - self._calls[0] >= 60:
+                        self._calls.popleft()
+                    if len(self._calls) < self.rate_limit:
+                        self._calls.append(now)
+                        break
+                    wait = 60 - (now - self._calls[0])
+                    self.throttled_calls += 1
+                if self.rate_limit_mode != 'block':
+                    metrics.record('alpaca', endpoint, time.perf_counter() - start, 'throttled', 'http_429')
+                    raise SimulatedAPIError('rate limit exceeded', 429)
+                self._sleep(wait)
+
+        if self.latency:
+            if isinstance(self.latency, (tuple, list)):
+                with self._lock:
+                    delay = self._rng.uniform(*self.latency)
+            else:
+                delay = self.latency
+            self._sleep(delay)
+
+        metrics.record('alpaca', endpoint, time.perf_counter() - start)
+
+    # ----- prices -----
+
+    def _last_close(self, key):
+        bars = self._bars.get(key)
+        if bars is None or self._now is None:
+            return None
+        cursor = bars.cursor(self._now)
+        return float(bars.close[cursor]) if cursor >= 0 else None
+
+    def _lastday_close(self, key):
+        bars = self._bars.get(key)
+        if bars is None or self._now is None:
+            return None
+        day_start = pd.Timestamp(self._now, tz='UTC').tz_convert(NY).normalize().value
+        cursor = bars.cursor(day_start - 1)
+        return float(bars.close[cursor]) if cursor >= 0 else self._last_close(key)
+
+    def _equity(self):
+        value = 0.0
+        for key, position in self._positions.items():
+            price = self._last_close(key)
+            value += position['qty'] * (price if price is not None else position['avg_entry_price'])
+        return self.cash + value
+
+    # ----- account -----
+
+    def _open_buy_notional(self):
+        total = 0.0
+        for order in self._orders.values():
+            if order['status'] in OPEN_STATUSES and order['side'] == 'buy' and order['parent_id'] is None:
+                price = order['limit_price'] or order['stop_price'] or self._last_close(order['key']) or 0.0
+                total += order['qty'] * price
+        return total
+
+    def get_account(self):
+        self._call('get_account')
+        with self._lock:
+            equity = self._equity()
+            last_equity = self._equity_history[-2][1] if len(self._equity_history) > 1 else self.starting_cash
+            return Account({
+                'id': 'sim-account', 'status': 'ACTIVE', 'currency': 'USD',
+                'cash': str(self.cash), 'equity': str(equity), 'portfolio_value': str(equity),
+                'last_equity': str(last_equity), 'buying_power': str(max(0.0, self.cash - self._open_buy_notional())),
+                'pattern_day_trader': False, 'trading_blocked': False, 'daytrade_count': 0,
+            })
+
+    def get_portfolio_history(self, date_start=None, date_end=None, period=None, timeframe=None,
+                              extended_hours=None):
+        self._call('get_portfolio_history')
+        with self._lock:
+            points = self._equity_history
+            if date_start is not None:
+                start = _to_ns(date_start)
+                points = [p for p in points if p[0] >= start]
+            if date_end is not None:
+                end = _to_ns(date_end)
+                points = [p for p in points if p[0] <= end]
+            base = self.starting_cash
+            return PortfolioHistory({
+                'timestamp': [int(ts // 10 ** 9) for ts, _ in points],
+                'equity': [equity for _, equity in points],
+                'profit_loss': [equity - base for _, equity in points],
+                'profit_loss_pct': [(equity - base) / base if base else 0.0 for _, equity in points],
+                'base_value': base,
+                'timeframe': timeframe or '1D',
+            })
+
+    def get_activities(self, activity_types=None, until=None, after=None, direction=None, date=None,
+                       page_size=None, page_token=None):
+        self._call('get_activities')
+        with self._lock:
+            activities = list(self._activities)
+        if activity_types:
+            wanted = activity_types.split(',') if isinstance(activity_types, str) else activity_types
+            activities = [a for a in activities if a['activity_type'] in wanted]
+        if direction != 'asc':
+            activities.reverse()
+        if page_size:
+            activities = activities[:page_size]
+        return [AccountActivity(a) for a in activities]
+
+    # ----- assets -----
+
+    def list_assets(self, status=None, asset_class=None):
+        self._call('list_assets')
+        assets = [a for a in self._assets.values()
+                  if (status is None or a['status'] == status) and (asset_class is None or a['class'] == asset_class)]
+        return [Asset(dict(a)) for a in assets]
+
+    def get_asset(self, symbol):
+        self._call('get_asset')
+        asset = self._assets.get(normalize_symbol(symbol))
+        if asset is None:
+            raise SimulatedAPIError(f'asset not found for {symbol}', 404)
+        return Asset(dict(asset))
+
+    # ----- positions -----
+
+    def _position_entity(self, key, position):
+        price = self._last_close(key)
+        price = price if price is not None else position['avg_entry_price']
+        qty = position['qty']
+        cost_basis = qty * position['avg_entry_price']
+        market_value = qty * price
+        lastday = self._lastday_close(key) or price
+        return Position({
+            'symbol': key, 'asset_class': self._assets[key]['class'], 'side': 'long',
+            'qty': str(qty), 'qty_available': str(qty - self._held_for_sell(key)),
+            'avg_entry_price': str(position['avg_entry_price']), 'current_price': str(price),
+            'lastday_price': str(lastday), 'market_value': str(market_value), 'cost_basis': str(cost_basis),
+            'unrealized_pl': str(market_value - cost_basis),
+            'unrealized_plpc': str((market_value - cost_basis) / cost_basis if cost_basis else 0.0),
+            'change_today': str((price - lastday) / lastday if lastday else 0.0),
+        })
+
+    def list_positions(self):
+        self._call('list_positions')
+        with self._lock:
+            return [self._position_entity(key, p) for key, p in self._positions.items() if p['qty'] > 0]
+
+    def get_position(self, symbol):
+        self._call('get_position')
+        with self._lock:
+            key = normalize_symbol(symbol)
+            position = self._positions.get(key)
+            if position is None or position['qty'] <= 0:
+                raise SimulatedAPIError('position does not exist', 404)
+            return self._position_entity(key, position)
+
+    # ----- orders -----
+
+    def _held_for_sell(self, key):
+        return sum(o['qty'] - o['filled_qty'] for o in self._orders.values()
+                   if o['key'] == key and o['side'] == 'sell' and o['status'] in OPEN_STATUSES
+                   and o['status'] != 'held')
+
+    def _order_entity(self, order):
+        raw = {k: v for k, v in order.items() if k not in ('key', 'parent_id', 'leg_ids')}
+        for field in ('qty', 'filled_qty', 'limit_price', 'stop_price', 'filled_avg_price'):
+            if raw.get(field) is not None:
+                raw[field] = str(raw[field])
+        raw['legs'] = [self._order_entity(self._orders[i])._raw for i in order['leg_ids']] or None
+        return Order(raw)
+
+    def _new_order(self, symbol, qty, side, type, time_in_force, limit_price=None, stop_price=None,
+                   client_order_id=None, order_class=None, parent_id=None, status='new'):
+        self._order_seq += 1
+        order_id = f"sim-order-{self._order_seq:08d}"
+        order = {
+            'id': order_id, 'client_order_id': client_order_id or f"sim-{self._order_seq:08d}",
+            'symbol': symbol, 'key': normalize_symbol(symbol), 'qty': float(qty), 'filled_qty': 0.0,
+            'filled_avg_price': None, 'side': side, 'type': type, 'time_in_force': time_in_force,
+            'limit_price': float(limit_price) if limit_price is not None else None,
+            'stop_price': float(stop_price) if stop_price is not None else None,
+            'status': status, 'order_class': order_class or 'simple', 'parent_id': parent_id, 'leg_ids': [],
+            'created_at': self._iso(), 'submitted_at': self._iso(), 'updated_at': self._iso(),
+            'filled_at': None, 'canceled_at': None, 'expired_at': None,
+        }
+        self._orders[order_id] = order
+        return order
+
+    def submit_order(self, symbol, qty=None, side='buy', type='market', time_in_force='day', limit_price=None,
+                     stop_price=None, client_order_id=None, extended_hours=None, order_class=None,
+                     take_profit=None, stop_loss=None, trail_price=None, trail_percent=None, notional=None):
+        self._call('submit_order')
+        with self._lock:
+            key = normalize_symbol(symbol)
+            asset = self._assets.get(key)
+            if asset is None or not asset['tradable']:
+                raise SimulatedAPIError(f'asset {symbol} is not tradable', 422)
+
+            price = self._last_close(key)
+            if price is None:
+                raise SimulatedAPIError(f'no market data for {symbol}', 422)
+            if qty is None and notional is not None:
+                qty = float(notional) / price
+            qty = float(qty)
+            if qty <= 0:
+                raise SimulatedAPIError('qty must be > 0', 422)
+            if not asset['fractionable'] and qty != int(qty):
+                raise SimulatedAPIError(f'fractional orders are not supported for {symbol}', 422)
+            if asset['min_order_size'] and qty < asset['min_order_size']:
+                raise SimulatedAPIError(f'qty is below the minimum order size for {symbol}', 422)
+            if type in ('limit', 'stop_limit') and limit_price is None:
+                raise SimulatedAPIError('limit_price is required', 422)
+            if type in ('stop', 'stop_limit') and stop_price is None:
+                raise SimulatedAPIError('stop_price is required', 422)
+
+            if side == 'buy':
+                order_price = float(limit_price) if limit_price is not None else price
+                if qty * order_price > self.cash - self._open_buy_notional():
+                    raise SimulatedAPIError('insufficient buying power', 403)
+            else:
+                held = self._positions.get(key, {}).get('qty', 0.0)
+                if qty > held - self._held_for_sell(key) + 1e-9:
+                    raise SimulatedAPIError(f'insufficient qty available for order (requested: {qty})', 403)
+
+            order = self._new_order(symbol, qty, side, type, time_in_force, limit_price, stop_price,
+                                    client_order_id, order_class)
+
+            if order_class == 'bracket':
+                exit_side = 'sell' if side == 'buy' else 'buy'
+                if take_profit:
+                    leg = self._new_order(symbol, qty, exit_side, 'limit', time_in_force,
+                                          limit_price=take_profit['limit_price'], parent_id=order['id'],
+                                          status='held')
+                    order['leg_ids'].append(leg['id'])
+                if stop_loss:
+                    leg = self._new_order(symbol, qty, exit_side, 'stop', time_in_force,
+                                          stop_price=stop_loss['stop_price'],
+                                          limit_price=stop_loss.get('limit_price'), parent_id=order['id'],
+                                          status='held')
+                    order['leg_ids'].append(leg['id'])
+
+            if type == 'market':
+                slip = price * self.slippage_bps / 10000.0
+                self._fill(order, price + slip if side == 'buy' else price - slip)
+            elif type == 'limit' and (order['limit_price'] >= price if side == 'buy' else order['limit_price'] <= price):
+                # marketable limit orders fill right away at the last price
+                self._fill(order, price)
+
+            return self._order_entity(order)
+
+    def _fill(self, order, price):
+        key = order['key']
+        qty = order['qty'] - order['filled_qty']
+        position = self._positions.setdefault(key, {'qty': 0.0, 'avg_entry_price': 0.0})
+
+        if order['side'] == 'buy':
+            total = position['qty'] + qty
+            position['avg_entry_price'] = (position['qty'] * position['avg_entry_price'] + qty * price) / total
+            position['qty'] = total
+            self.cash -= qty * price
+        else:
+            qty = min(qty, position['qty'])
+            position['qty'] -= qty
+            self.cash += qty * price
+            if position['qty'] <= 1e-12:
+                del self._positions[key]
+
+        order['filled_qty'] += qty
+        order['filled_avg_price'] = price
+        order['status'] = 'filled'
+        order['filled_at'] = order['updated_at'] = self._iso()
+        self._activities.append({
+            'id': f"{self._iso()}::{order['id']}", 'activity_type': 'FILL', 'type': 'fill',
+            'symbol': key, 'side': order['side'], 'qty': str(qty), 'cum_qty': str(order['filled_qty']),
+            'leaves_qty': '0', 'price': str(price), 'order_id': order['id'], 'transaction_time': self._iso(),
+        })
+
+        # bracket legs become active once the entry fills; one exit leg filling cancels the other
+        for leg_id in order['leg_ids']:
+            leg = self._orders[leg_id]
+            if leg['status'] == 'held':
+                leg['status'] = 'new'
+        if order['parent_id'] is not None:
+            for sibling_id in self._orders[order['parent_id']]['leg_ids']:
+                sibling = self._orders[sibling_id]
+                if sibling_id != order['id'] and sibling['status'] in OPEN_STATUSES:
+                    self._cancel(sibling)
+
+    def _match_price(self, order, bars, cursor):
+        o, h, l = bars.open[cursor], bars.high[cursor], bars.low[cursor]
+        kind, side = order['type'], order['side']
+        if kind == 'limit':
+            if side == 'buy' and l <= order['limit_price']:
+                return min(o, order['limit_price'])
+            if side == 'sell' and h >= order['limit_price']:
+                return max(o, order['limit_price'])
+        elif kind in ('stop', 'stop_limit'):
+            if side == 'sell' and l <= order['stop_price']:
+                price = min(o, order['stop_price'])
+            elif side == 'buy' and h >= order['stop_price']:
+                price = max(o, order['stop_price'])
+            else:
+                return None
+            if kind == 'stop':
+                return price
+            order['type'] = 'limit'  # a triggered stop-limit rests as a limit order
+            return self._match_price(order, bars, cursor)
+        elif kind == 'market':
+            return o
+        return None
+
+    def _match_open_orders(self):
+        for order in list(self._orders.values()):
+            if order['status'] not in ('new', 'accepted', 'partially_filled'):
+                continue
+            bars = self._bars.get(order['key'])
+            if bars is None:
+                continue
+            cursor = bars.cursor(self._now)
+            if cursor < 0 or bars.ts[cursor] != self._now:
+                continue  # no new bar for this symbol at this step
+            price = self._match_price(order, bars, cursor)
+            if price is None:
+                continue
+            if order['side'] == 'sell':
+                held = self._positions.get(order['key'], {}).get('qty', 0.0)
+                if held <= 0:
+                    self._cancel(order)
+                    continue
+            self._fill(order, float(price))
+
+    def _cancel(self, order):
+        order['status'] = 'canceled'
+        order['canceled_at'] = order['updated_at'] = self._iso()
+        for leg_id in order['leg_ids']:
+            leg = self._orders[leg_id]
+            if leg['status'] in OPEN_STATUSES:
+                self._cancel(leg)
+
+    def _expire_day_orders(self):
+        for order in self._orders.values():
+            if order['time_in_force'] == 'day' and order['status'] in OPEN_STATUSES:
+                order['status'] = 'expired'
+                order['expired_at'] = order['updated_at'] = self._iso()
+
+    def list_orders(self, status=None, limit=None, after=None, until=None, direction=None, params=None,
+                    nested=None, symbols=None, side=None):
+        self._call('list_orders')
+        status = status or 'open'
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        keys = {normalize_symbol(s) for s in symbols} if symbols else None
+        with self._lock:
+            orders = []
+            for order in self._orders.values():
+                is_open = order['status'] in OPEN_STATUSES
+                if (status == 'open' and not is_open) or (status == 'closed' and is_open):
+                    continue
+                if keys is not None and order['key'] not in keys:
+                    continue
+                if side is not None and order['side'] != side:
+                    continue
+                if nested and order['parent_id'] is not None:
+                    continue
+                orders.append(order)
+            if direction != 'asc':
+                orders.reverse()
+            orders = orders[:limit or 50]
+            return [self._order_entity(o) for o in orders]
+
+    def get_order(self, order_id):
+        self._call('get_order')
+        with self._lock:
+            if order_id not in self._orders:
+                raise SimulatedAPIError('order not found', 404)
+            return self._order_entity(self._orders[order_id])
+
+    def get_order_by_client_order_id(self, client_order_id):
+        self._call('get_order_by_client_order_id')
+        with self._lock:
+            for order in self._orders.values():
+                if order['client_order_id'] == client_order_id:
+                    return self._order_entity(order)
+        raise SimulatedAPIError('order not found', 404)
+
+    def cancel_order(self, order_id):
+        self._call('cancel_order')
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                raise SimulatedAPIError('order not found', 404)
+            if order['status'] not in OPEN_STATUSES:
+                raise SimulatedAPIError('order is not cancelable', 422)
+            self._cancel(order)
+
+    def cancel_all_orders(self):
+        self._call('cancel_all_orders')
+        with self._lock:
+            for order in self._orders.values():
+                if order['status'] in OPEN_STATUSES:
+                    self._cancel(order)
+
+    # ----- market data -----
+
+    def _latest_bar_raw(self, symbol):
+        key = normalize_symbol(symbol)
+        bars = self._bars.get(key)
+        cursor = bars.cursor(self._now) if bars is not None and self._now is not None else -1
+        if cursor < 0:
+            raise SimulatedAPIError(f'no bars for {symbol}', 404)
+        return {'S': symbol, 't': self._iso(int(bars.ts[cursor])), 'o': float(bars.open[cursor]),
+                'h': float(bars.high[cursor]), 'l': float(bars.low[cursor]), 'c': float(bars.close[cursor]),
+                'v': float(bars.volume[cursor])}
+
+    def _latest_bar(self, symbol):
+        return BarV2(self._latest_bar_raw(symbol))
+
+    def peek_latest_bar(self, symbol):
+        """
+        The current bar as a raw {'S', 't', 'o', 'h', 'l', 'c', 'v'} dict, or None. Not counted as an API call;
+        stream_sim.LocalMarketStream uses it to publish the simulator's bars.
+        """
+        with self._lock:
+            try:
+                return self._latest_bar_raw(symbol)
+            except SimulatedAPIError:
+                return None
+
+    def get_latest_bar(self, symbol, feed=None):
+        self._call('get_latest_bar')
+        with self._lock:
+            return self._latest_bar(symbol)
+
+    def get_latest_bars(self, symbols, feed=None):
+        self._call('get_latest_bars')
+        with self._lock:
+            return {s: self._latest_bar(s) for s in symbols if normalize_symbol(s) in self._bars}
+
+    def get_latest_crypto_bars(self, symbols, loc=None):
+        self._call('get_latest_crypto_bars')
+        with self._lock:
+            return {s: self._latest_bar(s) for s in symbols if normalize_symbol(s) in self._bars}
+
+    def get_last_trade(self, symbol):
+        self._call('get_last_trade')
+        with self._lock:
+            bar = self._latest_bar(symbol)
+        return Entity({'symbol': symbol, 'price': float(bar.c), 'timestamp': bar.t})
+
+    get_latest_trade = get_last_trade
+
+    def _history_frame(self, symbol, timeframe=None, start=None, end=None, limit=None):
+        bars = self._bars.get(normalize_symbol(symbol))
+        if bars is None or self._now is None:
+            return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+        end_ns = min(self._now, _to_ns(end, 'UTC')) if end is not None else self._now
+        frame = bars.frame(bars.cursor(end_ns))
+        if start is not None:
+            frame = frame[frame.index.asi8 >= _to_ns(start, 'UTC')]
+        rule = _resample_rule(timeframe)
+        if rule is not None and len(frame):
+            frame = frame.resample(rule).agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                              'close': 'last', 'volume': 'sum'}).dropna(subset=['close'])
+        if limit:
+            frame = frame.iloc[-limit:]
+        return frame
+
+    def get_bars(self, symbol, timeframe, start=None, end=None, adjustment='raw', limit=None, feed=None,
+                 asof=None, sort=None):
+        self._call('get_bars')
+        with self._lock:
+            frame = self._history_frame(symbol, timeframe, start, end, limit)
+        return SimBars(_frame_to_bars(symbol, frame), frame)
+
+    def get_crypto_bars(self, symbol, timeframe, start=None, end=None, limit=None, exchanges=None, loc=None):
+        self._call('get_crypto_bars')
+        with self._lock:
+            frame = self._history_frame(symbol, timeframe, start, end, limit)
+        return SimBars(_frame_to_bars(symbol, frame), frame)
+
+    def get_barset(self, symbols, timeframe, limit=None, start=None, end=None):
+        self._call('get_barset')
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        with self._lock:
+            frames = {s: self._history_frame(s, timeframe, start, end, limit) for s in symbols}
+        return SimBarSet(frames)
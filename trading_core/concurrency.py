@@ -0,0 +1,172 @@
+"""
+Adaptive worker limits for the executor loops that call rate-limited services.
+
+The executors keep their thread pools, sized to `max_workers`, and AdaptiveConcurrency gates how many tasks
+run at once. The limit follows AIMD (additive increase, multiplicative decrease), driven by the calls the
+metrics registry records for `service`:
+
+    throttled   a 429 or Alpha Vantage quota note since the last decision: limit * decrease
+    quota       the service's remaining quota is under quota_reserve of its limit: limit * decrease
+    latency     mean call latency over the round is above target_latency (by default latency_tolerance
+                times the best round seen so far, and never under latency_floor): limit - 1
+    increase    the round ran with every slot busy and none of the above: limit + 1
+    hold        otherwise (the pool was not the bottleneck)
+
+Throttling and quota cut the limit multiplicatively; latency, a noisier signal, only takes one worker off.
+A round ends after `limit` calls, or `interval` seconds, so the limit moves about once per batch of
+requests. Each decision is counted in trading_concurrency_decisions_total{pool, decision} and the current
+limit, active tasks and round latency are gauges, next to the call metrics.
+
+    pool = AdaptiveConcurrency('bracket_order', 'alpha_vantage', max_workers=24)
+    with ThreadPoolExecutor(max_workers=pool.max_workers) as executor:
+        futures = [executor.submit(pool.wrap(handle_symbol), symbol) for symbol in symbols]
+"""
+import functools
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from . import metrics
+from .logs import get_logger
+
+log = get_logger('concurrency')
+
+
+class AdaptiveConcurrency:
+    def __init__(self, name, service, max_workers, min_workers=1, initial=None, target_latency=None,
+                 latency_tolerance=2.0, latency_floor=0.05, decrease=0.5, interval=1.0, quota_reserve=0.1,
+                 registry=None):
+        self.name = name
+        self.service = service
+        self.max_workers = max_workers
+        self.min_workers = min_workers
+        self.limit = initial or min(max_workers, max(min_workers, 4))
+        self.target_latency = target_latency
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor  # round latencies under this are timing noise, never 'slow'
+        self.decrease = decrease
+        self.interval = interval
+        self.quota_reserve = quota_reserve
+        self.registry = registry or metrics.registry
+        self.decisions = Counter()
+        self.baseline_latency = None
+        self._active = 0
+        self._busy = False  # every slot was taken at some point this round
+        self._calls = 0
+        self._seconds = 0.0
+        self._throttled = 0
+        self._decided_at = self._decreased_at = time.monotonic()
+        self._cond = threading.Condition()
+        metrics.install()  # the decisions need the service's calls recorded
+        self.registry.add_listener(self._observe)
+        self._publish(None, 'initial')
+
+    # ----- gating -----
+
+    def acquire(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+            if self._active >= self.limit:
+                self._busy = True
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            if time.monotonic() - self._decided_at >= self.interval:
+                self._decide()
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def wrap(self, fn):
+        """
+        fn running inside a slot, for executor.submit / executor.map.
+        """
+        @functools.wraps(fn)
+        def gated(*args, **kwargs):
+            with self.slot():
+                return fn(*args, **kwargs)
+        return gated
+
+    def close(self):
+        self.registry.remove_listener(self._observe)
+
+    # ----- control -----
+
+    def _observe(self, service, endpoint, seconds, outcome):
+        if service != self.service:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if outcome == 'throttled':
+                # calls sent before the last cut say nothing about the current limit
+                if now - seconds >= self._decreased_at:
+                    self._throttled += 1
+            else:
+                self._calls += 1
+                self._seconds += seconds
+            if self._throttled or self._calls >= self.limit or now - self._decided_at >= self.interval:
+                self._decide()
+
+    def _decide(self):
+        # called with the condition held
+        now = time.monotonic()
+        latency = self._seconds / self._calls if self._calls else None
+        remaining, quota_limit = self.registry.quota(self.service)
+        target = self.target_latency
+        if target is None and self.baseline_latency is not None:
+            target = max(self.baseline_latency * self.latency_tolerance, self.latency_floor)
+
+        if self._throttled:
+            decision = 'throttled'
+        elif remaining is not None and quota_limit and remaining < quota_limit * self.quota_reserve:
+            decision = 'quota'
+        elif latency is not None and target is not None and latency > target:
+            decision = 'latency'
+        elif self._busy:
+            decision = 'increase'
+        else:
+            decision = 'hold'
+
+        previous = self.limit
+        if decision == 'increase':
+            self.limit = min(self.max_workers, self.limit + 1)
+        elif decision == 'latency':
+            self.limit = max(self.min_workers, self.limit - 1)
+        elif decision != 'hold':
+            self.limit = max(self.min_workers, int(self.limit * self.decrease))
+            self._decreased_at = now
+        if latency is not None and decision != 'latency':
+            self.baseline_latency = latency if self.baseline_latency is None else min(self.baseline_latency, latency)
+
+        self._calls = self._throttled = 0
+        self._seconds = 0.0
+        self._busy = self._active >= self.limit
+        self._decided_at = now
+        self._publish(latency, decision)
+        if self.limit != previous:
+            log.debug("%s: %s, limit %d -> %d (latency %s, quota %s)", self.name, decision, previous, self.limit,
+                      f"{latency:.3f}s" if latency is not None else '-', remaining)
+            self._cond.notify_all()
+
+    def _publish(self, latency, decision):
+        self.decisions[decision] += 1
+        self.registry.increment('concurrency_decisions_total', pool=self.name, decision=decision)
+        self.registry.set_gauge('concurrency_limit', self.limit, pool=self.name)
+        self.registry.set_gauge('concurrency_active', self._active, pool=self.name)
+        if latency is not None:
+            self.registry.set_gauge('concurrency_round_latency_seconds', latency, pool=self.name)
+
+    def stats(self):
+        with self._cond:
+            return {'limit': self.limit, 'active': self._active, 'max_workers': self.max_workers,
+                    'baseline_latency': self.baseline_latency, 'decisions': dict(self.decisions)}
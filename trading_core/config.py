@@ -0,0 +1,84 @@
+import os
+
+PAPER_BASE_URL = 'https://paper-api.alpaca.markets'
+DATA_BASE_URL = 'https://data.alpaca.markets'
+
+
+class TradingConfig:
+    """
+    Settings that used to differ (or be hard-coded) between the analysis, commodities and crypto copies
+    of the trading modules. One instance is active per process and shared by every strategy running in it.
+    """
+
+    def __init__(self, risk_params_path=None, crypto_quote_suffix='USD', crypto_symbols=None,
+                 max_class_equity_pct=0.45, base_url=PAPER_BASE_URL, data_url=DATA_BASE_URL, broker_factory=None,
+                 blob_factory=None, rate_limits=None, trace_budgets=None, state_dir=None, streaming=False,
+                 data_stream_url=None, stream_stale_after=90.0):
+        self.risk_params_path = risk_params_path
+        self.crypto_quote_suffix = crypto_quote_suffix
+        self.crypto_symbols = crypto_symbols or ['AAVE/USD', 'ALGO/USD', 'AVAX/USD', 'BCH/USD', 'BTC/USD', 'ETH/USD',
+                                                 'LINK/USD', 'LTC/USD', 'TRX/USD', 'UNI/USD', 'USDT/USD', 'SHIB/USD']
+        self.max_class_equity_pct = max_class_equity_pct
+        self.base_url = base_url
+        self.data_url = data_url
+        # callable returning the broker client; e.g. a broker_sim.SimulatedBroker for offline runs
+        self.broker_factory = broker_factory
+        # callable returning the blob service client; e.g. a blob_sim.LocalBlobService
+        self.blob_factory = blob_factory
+        # calls allowed per minute, used to estimate remaining quota when a service doesn't report it
+        self.rate_limits = rate_limits or {'alpaca': 200, 'alpha_vantage': 150}
+        # latency budget in seconds per traced stage (e.g. {'submit_order': 0.5}); slower spans are flagged
+        self.trace_budgets = trace_budgets or {}
+        # where incremental state (covariance estimates, ...) is persisted between runs
+        self.state_dir = state_dir
+        # read prices from the websocket last-price book (stream.py) instead of polling REST
+        self.streaming = streaming
+        # market data websocket host; None uses Alpaca's (or APCA_API_STREAM_URL)
+        self.data_stream_url = data_stream_url
+        # seconds after which a streamed price is considered stale and REST is used instead
+        self.stream_stale_after = stream_stale_after
+
+    def get_risk_params_path(self):
+        # fall back to the working directory, which is what the scripts used to do
+        return self.risk_params_path or os.path.join(os.getcwd(), 'risk_params.json')
+
+    def get_state_dir(self):
+        # next to risk_params.json unless set, i.e. in the strategy directory
+        return self.state_dir or os.path.join(os.path.dirname(self.get_risk_params_path()), 'state')
+
+    def is_crypto(self, symbol):
+        """
+        Classify a position/order symbol as crypto (e.g. BTCUSD or BTC/USD) or as an equity/commodity.
+        """
+        return symbol.endswith(self.crypto_quote_suffix)
+
+
+_config = TradingConfig()
+
+
+def get_config():
+    return _config
+
+
+def configure(**settings):
+    """
+    Override settings on the active configuration. Call before the first factory use.
+    """
+    for key, value in settings.items():
+        if not hasattr(_config, key):
+            raise AttributeError(f"Unknown trading setting: {key}")
+        setattr(_config, key, value)
+    return _config
+
+
+def configure_defaults(**settings):
+    """
+    Fill in settings that nobody has set yet. Entry-point wrappers use this so that the first
+    strategy loaded in a process decides shared settings such as the risk_params file.
+    """
+    for key, value in settings.items():
+        if not hasattr(_config, key):
+            raise AttributeError(f"Unknown trading setting: {key}")
+        if getattr(_config, key) is None:
+            setattr(_config, key, value)
+    return _config
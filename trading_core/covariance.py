@@ -0,0 +1,199 @@
+"""
+Exponentially weighted return covariance, updated one bar at a time and kept on disk per asset set.
+
+EWMACovariance holds the EW mean and covariance of simple returns plus the EW second moment of the
+cross products (needed for the shrinkage intensity). A new bar costs O(N^2); nothing is recomputed from
+the full history. estimate() shrinks the sample covariance towards a scaled identity with a
+Ledoit-Wolf-style intensity computed from the same EW state and the effective sample size, so a dozen
+assets with short, partly overlapping histories still give a well-conditioned matrix for port_op.
+
+CovarianceStore keeps one state file per asset set under the configured state directory:
+
+    store = CovarianceStore()
+    engine = store.get(symbols)
+    engine.update_from_closes(closes)   # only rows newer than engine.last_timestamp are applied
+    store.save(engine)
+    mu, cov = engine.annualized()
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from .config import get_config
+
+HALFLIFE = 60  # bars
+PERIODS_PER_YEAR = 365  # crypto trades every day
+
+
+class EWMACovariance:
+    def __init__(self, symbols, halflife=HALFLIFE, periods_per_year=PERIODS_PER_YEAR):
+        self.symbols = list(symbols)
+        self.halflife = halflife
+        self.periods_per_year = periods_per_year
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        n = len(self.symbols)
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+        self.fourth = np.zeros((n, n))  # EW mean of (d_i d_j)^2, for the shrinkage intensity
+        self.weight_sum = 0.0
+        self.weight_sq_sum = 0.0
+        self.count = 0
+        self.last_prices = np.full(n, np.nan)
+        self.last_timestamp = None
+
+    # ----- updates -----
+
+    def update_returns(self, returns):
+        """
+        Apply one bar of returns (NaN where an asset has no observation; it is treated as its mean).
+        """
+        r = np.asarray(returns, dtype=float)
+        d = np.where(np.isfinite(r), r - self.mean, 0.0)
+        if self.count == 0:
+            self.mean = np.where(np.isfinite(r), r, 0.0)
+            self.weight_sum, self.weight_sq_sum = 1.0, 1.0
+            self.count = 1
+            return
+        a = self.alpha
+        self.mean = self.mean + a * d
+        outer = np.outer(d, d)
+        self.cov = (1 - a) * (self.cov + a * outer)
+        self.fourth = (1 - a) * self.fourth + a * outer * outer
+        # effective sample size bookkeeping: weights of past bars shrink by (1 - a) each step
+        self.weight_sum = (1 - a) * self.weight_sum + 1.0
+        self.weight_sq_sum = (1 - a) ** 2 * self.weight_sq_sum + 1.0
+        self.count += 1
+
+    def update_prices(self, prices, timestamp=None):
+        """
+        Apply one bar of prices (ordered like self.symbols, or a Series / dict keyed by symbol).
+        """
+        p = self._align(prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = p / self.last_prices - 1.0
+        if np.isfinite(self.last_prices).any():
+            self.update_returns(returns)
+        self.last_prices = np.where(np.isfinite(p), p, self.last_prices)
+        if timestamp is not None:
+            self.last_timestamp = pd.Timestamp(timestamp)
+
+    def update_from_closes(self, closes):
+        """
+        Apply the rows of a close-price DataFrame (index: timestamps, columns: symbols) that are newer
+        than the last bar seen. Returns the number of bars applied.
+        """
+        closes = closes.sort_index()
+        if self.last_timestamp is not None:
+            closes = closes[closes.index > self.last_timestamp]
+        frame = closes.reindex(columns=self.symbols).to_numpy(dtype=float)
+        for timestamp, row in zip(closes.index, frame):
+            self.update_prices(row, timestamp)
+        return len(frame)
+
+    def _align(self, prices):
+        if isinstance(prices, dict):
+            prices = pd.Series(prices)
+        if isinstance(prices, pd.Series):
+            prices = prices.reindex(self.symbols)
+        return np.asarray(prices, dtype=float)
+
+    # ----- estimates -----
+
+    @property
+    def effective_observations(self):
+        return self.weight_sum ** 2 / self.weight_sq_sum if self.weight_sq_sum else 0.0
+
+    def shrinkage_intensity(self):
+        """
+        Ledoit-Wolf intensity towards mean-variance * I: estimated variance of the sample covariance
+        entries over their squared distance from the target, clipped to [0, 1].
+        """
+        n_eff = self.effective_observations
+        if n_eff < 2:
+            return 1.0
+        target = np.trace(self.cov) / len(self.symbols) * np.eye(len(self.symbols))
+        distance = np.sum((self.cov - target) ** 2)
+        if distance <= 0:
+            return 1.0
+        pi = np.sum(np.maximum(self.fourth - self.cov ** 2, 0.0))
+        return float(np.clip(pi / n_eff / distance, 0.0, 1.0))
+
+    def estimate(self, shrinkage=None):
+        """
+        (mean, covariance) per bar; `shrinkage` overrides the estimated intensity.
+        """
+        delta = self.shrinkage_intensity() if shrinkage is None else shrinkage
+        target = np.trace(self.cov) / len(self.symbols) * np.eye(len(self.symbols))
+        return self.mean.copy(), delta * target + (1 - delta) * self.cov
+
+    def annualized(self, shrinkage=None):
+        """
+        (expected returns, covariance) per year as Series / DataFrame indexed by symbol, ready for port_op.
+        """
+        mean, cov = self.estimate(shrinkage)
+        k = self.periods_per_year
+        return (pd.Series(mean * k, index=self.symbols),
+                pd.DataFrame(cov * k, index=self.symbols, columns=self.symbols))
+
+    def prices(self):
+        return pd.Series(self.last_prices, index=self.symbols)
+
+    # ----- persistence -----
+
+    def to_arrays(self):
+        return {
+            'symbols': np.array(self.symbols), 'mean': self.mean, 'cov': self.cov, 'fourth': self.fourth,
+            'last_prices': self.last_prices,
+            'scalars': np.array([self.halflife, self.periods_per_year, self.weight_sum, self.weight_sq_sum, self.count]),
+            'last_timestamp': np.array(self.last_timestamp.isoformat() if self.last_timestamp is not None else ''),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        halflife, periods_per_year, weight_sum, weight_sq_sum, count = arrays['scalars']
+        engine = cls([str(s) for s in arrays['symbols']], halflife, periods_per_year)
+        engine.mean, engine.cov, engine.fourth = arrays['mean'], arrays['cov'], arrays['fourth']
+        engine.last_prices = arrays['last_prices']
+        engine.weight_sum, engine.weight_sq_sum, engine.count = float(weight_sum), float(weight_sq_sum), int(count)
+        timestamp = str(arrays['last_timestamp'])
+        engine.last_timestamp = pd.Timestamp(timestamp) if timestamp else None
+        return engine
+
+
+class CovarianceStore:
+    """
+    One EWMACovariance per asset set, cached in memory and saved as .npz files under `directory`.
+    """
+
+    def __init__(self, directory=None, halflife=HALFLIFE, periods_per_year=PERIODS_PER_YEAR):
+        self.directory = directory or get_config().get_state_dir()
+        self.halflife = halflife
+        self.periods_per_year = periods_per_year
+        self._engines = {}
+
+    def path(self, symbols):
+        key = hashlib.sha1(','.join(sorted(symbols)).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f"covariance-{key}.npz")
+
+    def get(self, symbols):
+        symbols = sorted(symbols)
+        key = tuple(symbols)
+        engine = self._engines.get(key)
+        if engine is None:
+            path = self.path(symbols)
+            if os.path.exists(path):
+                with np.load(path) as arrays:
+                    engine = EWMACovariance.from_arrays(dict(arrays))
+            if engine is None or engine.halflife != self.halflife:
+                engine = EWMACovariance(symbols, self.halflife, self.periods_per_year)
+            self._engines[key] = engine
+        return engine
+
+    def save(self, engine):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(engine.symbols)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **engine.to_arrays())
+        os.replace(tmp_path, path)
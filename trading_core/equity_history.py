@@ -0,0 +1,199 @@
+"""
+Local cache of the account's portfolio-history equity series.
+
+The first refresh downloads the API's default window; later ones request only the days from the
+watermark (the last stored point) on. Points newer than it are appended, and the point at it is
+replaced because the latest value may still have changed. The series is kept as two growable numpy
+arrays (unix seconds, equity), trimmed to the last `window_days`, so PnL over the window reads the
+first and last entries.
+
+Peak equity is tracked while points are added, so peak and drawdown are O(1) reads and the peak
+outlives the window. The high-water mark that RiskManagement.calculate_drawdown keeps is stored
+here as well. Everything is saved to <state dir>/equity_history.npz, so neither value resets when
+the process restarts. They do reset when the saved history has expired: if its newest point is more than
+`window_days` old, load() starts empty and the peak and the mark are taken up again from the current
+equity, instead of measuring drawdown against a peak from before the bot was last stopped.
+
+    history = EquityHistory.load()
+    history.refresh(api)              # at most one request per refresh_interval, only the new days
+    history.pnl(), history.peak, history.drawdown()
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .config import get_config
+from .logs import get_logger
+
+log = get_logger('equity')
+
+REFRESH_INTERVAL = 300.0  # seconds a refresh is reused
+WINDOW_DAYS = 30          # the API's default period (1M), which report_profit_and_loss has always measured
+COMMISSION_RATE = 0.01    # of the window's first equity
+
+
+class EquityHistory:
+    def __init__(self, path=None, refresh_interval=REFRESH_INTERVAL, window_days=WINDOW_DAYS,
+                 commission_rate=COMMISSION_RATE, capacity=64):
+        self.path = path or os.path.join(get_config().get_state_dir(), 'equity_history.npz')
+        self.refresh_interval = refresh_interval
+        self.window_days = window_days
+        self.commission_rate = commission_rate
+        self.size = 0
+        self.peak = np.nan
+        self.peak_at = None
+        self.high_water_mark = None
+        self.fetched_at = None
+        self.requests = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._equity = np.zeros(capacity)
+        self._lock = threading.RLock()
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self.size]
+
+    @property
+    def equity(self):
+        return self._equity[:self.size]
+
+    @property
+    def watermark(self):
+        return int(self._timestamps[self.size - 1]) if self.size else None
+
+    # ----- updates -----
+
+    def refresh(self, api, force=False):
+        """
+        Fetch the points after the watermark unless the last refresh is younger than refresh_interval.
+        Returns the number of new points.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.fetched_at is not None and now - self.fetched_at < self.refresh_interval:
+                return 0
+            kwargs = {}
+            if self.size:
+                # the API takes dates in New York time; the day of the watermark is fetched again
+                day = pd.Timestamp(self.watermark, unit='s', tz='UTC').tz_convert('America/New_York')
+                kwargs['date_start'] = day.strftime('%Y-%m-%d')
+            history = api.get_portfolio_history(**kwargs)
+            self.requests += 1
+            self.fetched_at = now
+            points = [(int(t), float(e)) for t, e in zip(history.timestamp, history.equity) if e is not None]
+            added = self.add([t for t, _ in points], [e for _, e in points])
+            if points:
+                self.save()
+            return added
+
+    def add(self, timestamps, equity):
+        """
+        Merge points (oldest first) into the series. Returns the number that are newer than the watermark.
+        """
+        with self._lock:
+            added = 0
+            for ts, value in zip(timestamps, equity):
+                last = self.watermark
+                if last is not None and ts < last:
+                    continue
+                if last is not None and ts == last:
+                    self._equity[self.size - 1] = value
+                else:
+                    if self.size == len(self._timestamps):
+                        self._timestamps = np.resize(self._timestamps, self.size * 2)
+                        self._equity = np.resize(self._equity, self.size * 2)
+                    self._timestamps[self.size] = ts
+                    self._equity[self.size] = value
+                    self.size += 1
+                    added += 1
+                if not value <= self.peak:  # also true while peak is still nan
+                    self.peak, self.peak_at = value, ts
+            self._trim()
+            return added
+
+    def _trim(self):
+        if not self.size or self.window_days is None:
+            return
+        start = int(np.searchsorted(self.timestamps, self.watermark - self.window_days * 86400))
+        if start:
+            kept = self.size - start
+            self._timestamps[:kept] = self._timestamps[start:self.size]
+            self._equity[:kept] = self._equity[start:self.size]
+            self.size = kept
+
+    def update_high_water_mark(self, value):
+        """
+        Raise the stored high-water mark to `value` if it is higher (saved when it changes); returns the mark.
+        """
+        with self._lock:
+            if self.high_water_mark is None or value > self.high_water_mark:
+                self.high_water_mark = float(value)
+                self.save()
+            return self.high_water_mark
+
+    # ----- reads -----
+
+    def pnl(self):
+        """
+        (first equity, last equity, commissions, pnl) over the stored window; commissions are a flat
+        commission_rate of the first equity.
+        """
+        with self._lock:
+            if not self.size:
+                raise ValueError("no portfolio history loaded")
+            first, last = float(self._equity[0]), float(self._equity[self.size - 1])
+        commissions = first * self.commission_rate
+        return first, last, commissions, last - first - commissions
+
+    def last_equity(self):
+        return float(self._equity[self.size - 1]) if self.size else None
+
+    def drawdown(self):
+        """
+        Fraction below peak equity of the latest point (0 at a new high).
+        """
+        last = self.last_equity()
+        if last is None or not self.peak > 0:
+            return 0.0
+        return max(0.0, (self.peak - last) / self.peak)
+
+    # ----- persistence -----
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, timestamps=self.timestamps, equity=self.equity, peak=self.peak,
+                         peak_at=-1 if self.peak_at is None else self.peak_at,
+                         high_water_mark=np.nan if self.high_water_mark is None else self.high_water_mark)
+            os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path=None, **kwargs):
+        """
+        The history saved at `path`, or an empty one when there is none or it has expired (its newest point
+        is more than window_days old).
+        """
+        history = cls(path, **kwargs)
+        try:
+            with np.load(history.path) as saved:
+                timestamps, equity = saved['timestamps'], saved['equity']
+                peak, peak_at, mark = float(saved['peak']), int(saved['peak_at']), float(saved['high_water_mark'])
+        except (OSError, KeyError, ValueError) as e:
+            if os.path.exists(history.path):
+                log.warning("Ignoring unreadable equity history %s: %s", history.path, e)
+            return history
+        if history.window_days is not None and len(timestamps) \
+                and timestamps[-1] < time.time() - history.window_days * 86400:
+            log.info("Equity history %s is older than %d days; starting a new one", history.path,
+                     history.window_days)
+            return history
+        history.add(timestamps.tolist(), equity.tolist())
+        if not peak <= history.peak:
+            history.peak, history.peak_at = peak, peak_at if peak_at >= 0 else None
+        history.high_water_mark = None if np.isnan(mark) else mark
+        return history
@@ -0,0 +1,168 @@
+"""
+Structured logging for the decision loops, replacing print() in the hot paths.
+
+get_logger('risk') returns the 'trading.risk' logger. Records go through a queue to a background thread
+that formats and writes them, so a trading thread only pays for building the message, and only when the
+level is enabled. Nothing is formatted for suppressed levels; pass values as arguments
+(log.debug("bars for %s: %s", symbol, df)) rather than f-strings so large objects are never rendered
+for nothing.
+
+Configured from the environment on first use (or with setup()):
+
+    TRADING_LOG_LEVEL=INFO                         default level for trading.* loggers
+    TRADING_LOG_LEVELS=risk=DEBUG,screen=WARNING   per-module levels
+    TRADING_LOG_FORMAT=json                        one JSON object per line instead of text
+    TRADING_LOG_FILE=trading.log                   also append to this file
+
+Per-bar and per-symbol messages can be thinned with sampled() (every Nth call) or throttled()
+(at most once per interval, reporting how many were suppressed).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT = 'trading'
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# attributes every LogRecord has; anything else was passed in `extra` and goes into the JSON output
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_listener = None
+_counters = {}
+_last_emitted = {}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    # look sys.stdout up on every write so redirect_stdout and replaced streams still work
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # merge the arguments now (they may change after we return) but leave formatting to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_levels(value):
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup(level=None, levels=None, json_format=None, log_file=None):
+    """
+    (Re)configure the trading.* loggers. Arguments default to the TRADING_LOG_* environment variables.
+    """
+    global _listener
+    level = (level or os.environ.get('TRADING_LOG_LEVEL') or 'INFO').upper()
+    levels = levels if levels is not None else _parse_levels(os.environ.get('TRADING_LOG_LEVELS'))
+    if json_format is None:
+        json_format = os.environ.get('TRADING_LOG_FORMAT', '').lower() == 'json'
+    log_file = log_file or os.environ.get('TRADING_LOG_FILE')
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        formatter = JsonFormatter() if json_format else logging.Formatter(DEFAULT_FORMAT)
+        handlers = [_StdoutHandler()]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger(ROOT)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandler(records))
+        root.setLevel(level)
+        root.propagate = False
+        for name, module_level in levels.items():
+            logging.getLogger(name if name.startswith(ROOT) else f"{ROOT}.{name}").setLevel(module_level)
+    return root
+
+
+def _stop():
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+atexit.register(_stop)
+
+
+def get_logger(name):
+    if _listener is None:
+        setup()
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def sampled(key, every):
+    """
+    True on the first call for `key` and then every `every` calls.
+    """
+    with _lock:
+        count = _counters.get(key, 0)
+        _counters[key] = count + 1
+    return count % every == 0
+
+
+def throttled(logger, level, key, msg, *args, interval=60.0, **kwargs):
+    """
+    Log at most once per `interval` seconds for `key`; the next message reports how many were suppressed.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    now = time.monotonic()
+    with _lock:
+        last, suppressed = _last_emitted.get(key, (None, 0))
+        if last is not None and now - last < interval:
+            _last_emitted[key] = (last, suppressed + 1)
+            return
+        _last_emitted[key] = (now, 0)
+    if suppressed:
+        msg = f"{msg} ({suppressed} similar suppressed)"
+    logger.log(level, msg, *args, **kwargs)
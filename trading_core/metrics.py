@@ -0,0 +1,449 @@
+"""
+Call metrics for the external services the scripts depend on: Alpaca, Alpha Vantage, Azure Blob and Teams.
+
+install() wraps requests.Session.send, which every client here goes through: the Alpaca REST client,
+the alpha_vantage library and raw Alpha Vantage URLs, azure-core's requests transport and the Teams
+webhooks. Each call is recorded per service and endpoint with its latency, outcome (ok, error or
+throttled) and the remaining rate-limit quota. The offline stand-ins (broker_sim, blob_sim) report
+into the same registry.
+
+Other modules publish their own gauges and counters (set_gauge, increment; exported with a trading_
+prefix) and can follow the calls as they are recorded (add_listener), as concurrency.AdaptiveConcurrency does.
+
+Export as Prometheus text with write_prometheus(path) or serve(port), or print summary().
+Setting TRADING_METRICS_FILE (and/or TRADING_METRICS_PORT) before trading_core is imported enables all of
+this for a run; the file and a summary on stderr are written at exit. Scripts that do not import
+trading_core can be run through the module:
+
+    python -m trading_core.metrics --file run.prom crypto/crypto.py
+"""
+import argparse
+import atexit
+import os
+import re
+import runpy
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from .config import get_config
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_THROTTLE_BODY = re.compile(rb'^\s*\{\s*"(Note|Information)"')
+_ALPACA_ID_SEGMENTS = re.compile(r'/(orders|positions|assets|stocks|watchlists|activities)/([^/]+)')
+_UUID = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.I)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th observation (Prometheus histogram_quantile without interpolation).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            if running >= rank:
+                return bound
+        return float('inf')
+
+
+class _EndpointStats:
+    __slots__ = ('histogram', 'outcomes', 'errors')
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.outcomes = {'ok': 0, 'error': 0, 'throttled': 0}
+        self.errors = {}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of per-(service, endpoint) call counts, latency histograms, errors and quota.
+    """
+
+    def __init__(self, window=60.0):
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._recent = {}
+        self._quota = {}
+        self._gauges = {}    # (name, labels) -> value
+        self._counters = {}  # (name, labels) -> value
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """
+        Call listener(service, endpoint, seconds, outcome) after every recorded call.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record(self, service, endpoint, seconds, outcome='ok', error=None):
+        with self._lock:
+            stats = self._endpoints.get((service, endpoint))
+            if stats is None:
+                stats = self._endpoints[(service, endpoint)] = _EndpointStats()
+            stats.histogram.observe(seconds)
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+            if error:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+            recent = self._recent.get(service)
+            if recent is None:
+                recent = self._recent[service] = deque()
+            now = time.monotonic()
+            recent.append(now)
+            while recent and now - recent[0] > self.window:
+                recent.popleft()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(service, endpoint, seconds, outcome)
+
+    def set_quota(self, service, remaining, limit=None):
+        """
+        Record quota reported by the service itself (e.g. Alpaca's X-RateLimit-Remaining header).
+        """
+        with self._lock:
+            self._quota[service] = (float(remaining), float(limit) if limit is not None else None, time.monotonic())
+
+    def quota(self, service):
+        """
+        (remaining, limit) for the current window: the last value the service reported if it is recent,
+        otherwise the configured per-minute limit minus the calls made in the last minute.
+        """
+        with self._lock:
+            reported = self._quota.get(service)
+            if reported is not None and time.monotonic() - reported[2] < self.window:
+                return reported[0], reported[1]
+            limit = get_config().rate_limits.get(service)
+            if limit is None:
+                return None, None
+            recent = self._recent.get(service, ())
+            now = time.monotonic()
+            used = sum(1 for t in recent if now - t <= self.window)
+            return max(limit - used, 0), float(limit)
+
+    def snapshot(self):
+        """
+        Plain-dict copy of everything recorded, for JSON reports.
+        """
+        with self._lock:
+            endpoints = list(self._endpoints.items())
+            services = sorted({service for service, _ in self._endpoints} | set(self._quota))
+        result = {'services': {}}
+        for (service, endpoint), stats in sorted(endpoints):
+            h = stats.histogram
+            entry = result['services'].setdefault(service, {'endpoints': {}})
+            entry['endpoints'][endpoint] = {
+                'calls': h.count, 'ok': stats.outcomes.get('ok', 0), 'errors': stats.outcomes.get('error', 0),
+                'throttled': stats.outcomes.get('throttled', 0), 'error_kinds': dict(stats.errors),
+                'seconds_total': round(h.sum, 6), 'p50_s': h.quantile(0.5), 'p95_s': h.quantile(0.95),
+                'p99_s': h.quantile(0.99),
+            }
+        for service in services:
+            remaining, limit = self.quota(service)
+            entry = result['services'].setdefault(service, {'endpoints': {}})
+            entry['quota_remaining'] = remaining
+            entry['quota_limit'] = limit
+        with self._lock:
+            gauges, counters = dict(self._gauges), dict(self._counters)
+        for kind, values in (('gauges', gauges), ('counters', counters)):
+            for (name, labels), value in sorted(values.items()):
+                result.setdefault(kind, {}).setdefault(name, {})[_label_text(labels)] = value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._recent.clear()
+            self._quota.clear()
+            self._gauges.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def prometheus_text(self):
+        with self._lock:
+            endpoints = [(key, stats.histogram.counts[:], stats.histogram.sum, stats.histogram.count,
+                          dict(stats.outcomes), dict(stats.errors))
+                         for key, stats in sorted(self._endpoints.items())]
+            services = sorted({service for service, _ in self._endpoints} | set(self._quota))
+            gauges, counters = sorted(self._gauges.items()), sorted(self._counters.items())
+        lines = [
+            '# HELP trading_external_calls_total Calls to external services by outcome.',
+            '# TYPE trading_external_calls_total counter',
+        ]
+        for (service, endpoint), _, _, _, outcomes, _ in endpoints:
+            for outcome, value in sorted(outcomes.items()):
+                lines.append(f'trading_external_calls_total{{{_labels(service, endpoint)},outcome="{outcome}"}} {value}')
+        lines += ['# HELP trading_external_errors_total Failed calls to external services by error kind.',
+                  '# TYPE trading_external_errors_total counter']
+        for (service, endpoint), _, _, _, _, errors in endpoints:
+            for kind, value in sorted(errors.items()):
+                lines.append(f'trading_external_errors_total{{{_labels(service, endpoint)},kind="{kind}"}} {value}')
+        lines += ['# HELP trading_external_call_seconds Latency of calls to external services.',
+                  '# TYPE trading_external_call_seconds histogram']
+        for (service, endpoint), counts, total, count, _, _ in endpoints:
+            labels = _labels(service, endpoint)
+            running = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                running += bucket_count
+                lines.append(f'trading_external_call_seconds_bucket{{{labels},le="{bound}"}} {running}')
+            lines.append(f'trading_external_call_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'trading_external_call_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'trading_external_call_seconds_count{{{labels}}} {count}')
+        lines += ['# HELP trading_quota_remaining Estimated calls left in the current rate-limit window.',
+                  '# TYPE trading_quota_remaining gauge']
+        for service in services:
+            remaining, limit = self.quota(service)
+            if remaining is not None:
+                lines.append(f'trading_quota_remaining{{service="{service}"}} {remaining:g}')
+                if limit is not None:
+                    lines.append(f'trading_quota_limit{{service="{service}"}} {limit:g}')
+        for kind, values in (('gauge', gauges), ('counter', counters)):
+            typed = set()
+            for (name, labels), value in values:
+                if name not in typed:
+                    lines.append(f'# TYPE trading_{name} {kind}')
+                    typed.add(name)
+                lines.append(f'trading_{name}{{{_label_text(labels)}}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        snapshot = self.snapshot()
+        elapsed = time.time() - self.started_at
+        lines = [f"External calls over {elapsed:.1f}s:"]
+        for service, entry in snapshot['services'].items():
+            calls = sum(e['calls'] for e in entry['endpoints'].values())
+            seconds = sum(e['seconds_total'] for e in entry['endpoints'].values())
+            quota = ''
+            if entry.get('quota_remaining') is not None:
+                quota = f", quota left {entry['quota_remaining']:g}/{entry['quota_limit']:g}"
+            lines.append(f"  {service}: {calls} calls, {seconds:.2f}s total{quota}")
+            for endpoint, e in sorted(entry['endpoints'].items(), key=lambda item: -item[1]['seconds_total']):
+                problems = ''
+                if e['errors'] or e['throttled']:
+                    problems = f", {e['errors']} errors, {e['throttled']} throttled"
+                lines.append(f"    {endpoint:40} {e['calls']:6} calls  {e['seconds_total']:8.2f}s  "
+                             f"p50<={e['p50_s']:g}s p95<={e['p95_s']:g}s{problems}")
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _label_text(labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+def _labels(service, endpoint):
+    return f'service="{_escape(service)}",endpoint="{_escape(endpoint)}"'
+
+
+registry = MetricsRegistry()
+
+
+def record(service, endpoint, seconds, outcome='ok', error=None):
+    registry.record(service, endpoint, seconds, outcome, error)
+
+
+# ----- requests hook -----
+
+def classify(url, method='GET'):
+    """
+    (service, endpoint) for a request URL. Endpoints are kept low-cardinality: Alpha Vantage by function,
+    Alpaca by path with ids and symbols replaced, blob storage by operation and container.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host.endswith('alphavantage.co'):
+        params = dict(parse_qsl(parts.query))
+        return 'alpha_vantage', params.get('function', parts.path or '/').upper()
+    if host.endswith('alpaca.markets'):
+        path = _UUID.sub('{id}', parts.path)
+        path = _ALPACA_ID_SEGMENTS.sub(lambda m: f"/{m.group(1)}/{{id}}", path)
+        return 'alpaca', f"{method} {path}"
+    if host.endswith('blob.core.windows.net'):
+        container = parts.path.strip('/').split('/', 1)[0] or '/'
+        operation = {'GET': 'download', 'HEAD': 'properties', 'PUT': 'upload', 'DELETE': 'delete'}.get(method, method)
+        return 'azure_blob', f"{operation} {container}"
+    if host.endswith('webhook.office.com'):
+        return 'teams', 'webhook'
+    return host or 'unknown', f"{method} {parts.path or '/'}"
+
+
+_original_send = requests.Session.send
+_installed = False
+
+
+def _timed_send(session, request, **kwargs):
+    service, endpoint = classify(request.url, request.method)
+    start = time.perf_counter()
+    try:
+        response = _original_send(session, request, **kwargs)
+    except requests.exceptions.Timeout:
+        record(service, endpoint, time.perf_counter() - start, 'error', 'timeout')
+        raise
+    except requests.exceptions.ConnectionError:
+        record(service, endpoint, time.perf_counter() - start, 'error', 'connection')
+        raise
+    except Exception as e:
+        record(service, endpoint, time.perf_counter() - start, 'error', type(e).__name__)
+        raise
+    elapsed = time.perf_counter() - start
+
+    status = response.status_code
+    if status == 429:
+        record(service, endpoint, elapsed, 'throttled', 'http_429')
+    elif status >= 400:
+        record(service, endpoint, elapsed, 'error', f"http_{status // 100}xx")
+    elif service == 'alpha_vantage' and not kwargs.get('stream') and _THROTTLE_BODY.match(response.content[:200]):
+        # Alpha Vantage reports quota exhaustion as a 200 with a "Note"/"Information" message
+        record(service, endpoint, elapsed, 'throttled', 'quota_note')
+    else:
+        record(service, endpoint, elapsed)
+
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    if remaining is not None:
+        try:
+            registry.set_quota(service, remaining, response.headers.get('X-RateLimit-Limit'))
+        except ValueError:
+            pass
+    return response
+
+
+def install():
+    """
+    Start timing every requests call in the process. Safe to call more than once.
+    """
+    global _installed
+    if not _installed:
+        requests.Session.send = _timed_send
+        _installed = True
+
+
+def uninstall():
+    global _installed
+    requests.Session.send = _original_send
+    _installed = False
+
+
+# ----- export -----
+
+def write_prometheus(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(registry.prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def serve(port, host='127.0.0.1'):
+    """
+    Expose the metrics at http://host:port/metrics from a daemon thread.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+def _finish(path):
+    if path:
+        write_prometheus(path)
+    print(registry.summary(), file=sys.stderr)
+
+
+def enable(path=None, port=None, summary=True):
+    """
+    Install the requests hook and arrange for the Prometheus file and the run summary at exit.
+    """
+    install()
+    if port:
+        serve(int(port))
+    if path or summary:
+        atexit.register(_finish, path)
+
+
+def enable_from_env():
+    path = os.environ.get('TRADING_METRICS_FILE')
+    port = os.environ.get('TRADING_METRICS_PORT')
+    if path or port:
+        enable(path=path, port=port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script with external call metrics.")
+    parser.add_argument('--file', help="write Prometheus text metrics here at exit")
+    parser.add_argument('--port', type=int, help="also serve /metrics on this port while the script runs")
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+
+    script = os.path.abspath(options.script)
+    install()
+    if options.port:
+        serve(options.port)
+    sys.argv = [script] + options.args
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        _finish(options.file)
+
+
+if __name__ == '__main__':
+    # use the package's module so the hook, the stand-ins and the export share one registry
+    from trading_core.metrics import main as _main
+    _main()
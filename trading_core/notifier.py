@@ -0,0 +1,189 @@
+"""
+Non-blocking Teams notifications.
+
+send_teams_message() only puts the message on a queue; a background worker posts it. Messages for the
+same webhook that arrive within WINDOW seconds of each other are coalesced into one card, so a burst of
+fills becomes one post instead of one per order. Failed posts (connection errors, 429 and 5xx) are retried
+with exponential backoff, honouring Retry-After. When the queue is full the message is dropped and
+counted, and the next card says how many were lost. Order threads never wait on the webhook.
+
+Queued messages are flushed at exit (for up to FLUSH_TIMEOUT seconds); call flush() to wait earlier.
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+WINDOW = 2.0
+MAX_QUEUE = 1000
+MAX_BATCH = 25
+MAX_CARD_CHARS = 20000
+MAX_RETRIES = 4
+BACKOFF = 1.0
+TIMEOUT = 10
+FLUSH_TIMEOUT = 15.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def _message_text(message):
+    # callers pass either the text or a {'text': ...} payload
+    if isinstance(message, dict):
+        return message.get('text', json.dumps(message))
+    return str(message)
+
+
+class TeamsNotifier:
+    def __init__(self, window=WINDOW, max_queue=MAX_QUEUE, max_batch=MAX_BATCH, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF, timeout=TIMEOUT):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sent = 0
+        self.posts = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._dropped_by_url = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def send(self, teams_url, message):
+        """
+        Queue a message for teams_url and return immediately.
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((teams_url, _message_text(message)))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._dropped_by_url[teams_url] = self._dropped_by_url.get(teams_url, 0) + 1
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """
+        Wait until everything queued so far has been posted (or given up on). Returns False on timeout.
+        """
+        if self._worker is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='teams-notifier', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            first = self._queue.get()
+            batch = [first]
+            # coalesce whatever else arrives within the window
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                by_url = {}
+                for teams_url, text in batch:
+                    by_url.setdefault(teams_url, []).append(text)
+                for teams_url, texts in by_url.items():
+                    for card in self._cards(teams_url, texts):
+                        self._post(teams_url, card, len(texts))
+            except Exception as e:
+                logging.error(f"Teams notifier failed to send a batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _cards(self, teams_url, texts):
+        with self._lock:
+            dropped = self._dropped_by_url.pop(teams_url, 0)
+        if dropped:
+            texts = texts + [f"({dropped} notification(s) dropped: queue full)"]
+        card = []
+        size = 0
+        for text in texts:
+            if card and size + len(text) > MAX_CARD_CHARS:
+                yield '\n\n'.join(card)
+                card, size = [], 0
+            card.append(text)
+            size += len(text) + 2
+        if card:
+            yield '\n\n'.join(card)
+
+    def _post(self, teams_url, text, count):
+        headers = {'Content-Type': 'application/json'}
+        data = json.dumps({'text': text})
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = requests.post(teams_url, headers=headers, data=data, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    with self._lock:
+                        self.posts += 1
+                        self.sent += count
+                    logging.info(f"Message sent to Teams successfully: {text[:200]}")
+                    return True
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                error = f"HTTP {response.status_code}"
+            except requests.exceptions.HTTPError as e:
+                logging.error(f"HTTP error occurred when sending message to Teams: {e}")
+                break
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            if attempt < self.max_retries:
+                logging.warning(f"Teams webhook failed ({error}); retrying in {delay:.1f}s")
+                self._stop.wait(delay)
+        with self._lock:
+            self.failed += count
+        logging.error(f"Giving up on a Teams message after {self.max_retries + 1} attempts: {text[:200]}")
+        return False
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = TeamsNotifier()
+                atexit.register(_notifier.flush)
+    return _notifier
+
+
+def send_teams_message(teams_url, message):
+    """
+    Queue a Teams message (text or a {'text': ...} payload); it is posted in the background.
+    """
+    get_notifier().send(teams_url, message)
+
+
+def flush(timeout=FLUSH_TIMEOUT):
+    if _notifier is None:
+        return True
+    return _notifier.flush(timeout)
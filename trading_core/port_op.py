@@ -0,0 +1,162 @@
+"""
+Long-only mean-variance allocation.
+
+Maximises  mu.w - risk_aversion * w'Cw  subject to  w >= 0, sum(w) = 1  (and optionally w <= max_weight)
+with accelerated projected gradient (FISTA with adaptive restart). The gradient is analytic, the
+projection onto the simplex is exact, and the step size comes from the largest eigenvalue of C, so no
+line search or generic solver is needed. Several risk-aversion values are solved together as columns of
+one matrix, which is how efficient_frontier() gets a whole frontier in one call. A few hundred
+iterations of an n x n matrix product are enough for 100+ assets, i.e. milliseconds.
+
+MeanVarianceOptimizer keeps the last solution and warm-starts from it, which makes a re-solve every
+cycle (with slightly different estimates) cheaper still.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse.linalg import eigsh
+
+TOL = 1e-9
+MAX_ITER = 20000
+
+
+def project_simplex(V, upper=None):
+    """
+    Euclidean projection of each column of V onto {w : w >= 0, sum(w) = 1, w <= upper}.
+    """
+    n = V.shape[0]
+    if upper is None or upper * n <= 1:
+        # sort-based projection (exact)
+        U = -np.sort(-V, axis=0)
+        css = np.cumsum(U, axis=0) - 1.0
+        ind = np.arange(1, n + 1)[:, None]
+        rho = np.count_nonzero(U - css / ind > 0, axis=0)
+        theta = css[rho - 1, np.arange(V.shape[1])] / rho
+        return np.maximum(V - theta, 0.0)
+
+    # capped simplex: bisect on the shift; sum(clip(v - t, 0, upper)) is monotone in t
+    lo = (V.min(axis=0) - upper)[None, :]
+    hi = V.max(axis=0)[None, :]
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        total = np.clip(V - mid, 0.0, upper).sum(axis=0, keepdims=True)
+        lo = np.where(total > 1.0, mid, lo)
+        hi = np.where(total > 1.0, hi, mid)
+    return np.clip(V - (lo + hi) / 2, 0.0, upper)
+
+
+def _lipschitz(C):
+    # largest eigenvalue of the (symmetric PSD) covariance matrix; Lanczos beats a full solve for large n
+    if len(C) > 200:
+        top = eigsh(C, k=1, which='LA', return_eigenvectors=False, tol=1e-8)[0] * (1 + 1e-6)
+    else:
+        top = np.linalg.eigvalsh(C)[-1]
+    return max(float(top), 1e-12)
+
+
+def solve_weights(mu, C, risk_aversions, initial=None, max_weight=None, tol=TOL, max_iter=MAX_ITER, lipschitz=None):
+    """
+    Optimal weights for each risk aversion in `risk_aversions`; returns an (n, k) array, one column per value.
+    `initial` (n or n x k) warm-starts the iteration.
+    """
+    mu = np.asarray(mu, dtype=float)
+    C = np.asarray(C, dtype=float)
+    lam = np.atleast_1d(np.asarray(risk_aversions, dtype=float))
+    n, k = len(mu), len(lam)
+    if max_weight is not None and max_weight * n < 1:
+        raise ValueError(f"max_weight {max_weight} is infeasible for {n} assets")
+
+    L = lipschitz or _lipschitz(C)
+    step = 1.0 / np.maximum(2.0 * lam * L, 1e-12)
+    if initial is None:
+        W = np.full((n, k), 1.0 / n)
+    else:
+        W = np.asarray(initial, dtype=float).reshape(n, -1)
+        W = np.repeat(W, k, axis=1) if W.shape[1] == 1 and k > 1 else W.copy()
+    W = project_simplex(W, max_weight)
+
+    Y = W.copy()
+    t = np.ones(k)
+    for _ in range(max_iter):
+        grad = 2.0 * (C @ Y) * lam - mu[:, None]
+        W_next = project_simplex(Y - grad * step, max_weight)
+        change = W_next - W
+        if np.abs(change).max() < tol:
+            W = W_next
+            break
+        # adaptive restart: drop momentum in columns where it points uphill
+        restart = np.einsum('ij,ij->j', Y - W_next, change) > 0
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        momentum = np.where(restart, 0.0, (t - 1.0) / t_next)
+        t = np.where(restart, 1.0, t_next)
+        Y = W_next + change * momentum
+        W = W_next
+    return W
+
+
+def weights_to_quantities(weights, prices, total_investment):
+    """
+    Units to hold for each asset: the dollar allocation divided by its price (0 where the price is unknown).
+    """
+    prices = np.asarray(prices, dtype=float)
+    valid = np.isfinite(prices) & (prices > 0)
+    dollars = np.asarray(weights, dtype=float) * total_investment
+    return np.where(valid, dollars / np.where(valid, prices, 1.0), 0.0)
+
+
+class MeanVarianceOptimizer:
+    """
+    Solves the allocation repeatedly, warm-starting from the previous solution for the same universe.
+    """
+
+    def __init__(self, max_weight=None, tol=TOL, max_iter=MAX_ITER):
+        self.max_weight = max_weight
+        self.tol = tol
+        self.max_iter = max_iter
+        self._last = None
+        self._last_key = None
+
+    def weights(self, expected_returns, covariance_matrix, risk_aversion):
+        symbols = list(expected_returns.index) if isinstance(expected_returns, pd.Series) else None
+        mu = np.asarray(expected_returns, dtype=float)
+        key = tuple(symbols) if symbols is not None else len(mu)
+        initial = self._last if key == self._last_key else None
+        W = solve_weights(mu, covariance_matrix, [risk_aversion], initial, self.max_weight, self.tol, self.max_iter)
+        self._last, self._last_key = W, key
+        weights = W[:, 0]
+        return pd.Series(weights, index=symbols) if symbols is not None else weights
+
+    def frontier(self, expected_returns, covariance_matrix, risk_aversions):
+        """
+        Weights, expected return and variance for each risk aversion, solved in one batch.
+        """
+        mu = np.asarray(expected_returns, dtype=float)
+        C = np.asarray(covariance_matrix, dtype=float)
+        W = solve_weights(mu, C, risk_aversions, None, self.max_weight, self.tol, self.max_iter)
+        returns = mu @ W
+        variances = np.einsum('ij,ij->j', W, C @ W)
+        return W.T, returns, variances
+
+
+def efficient_frontier(expected_returns, covariance_matrix, risk_aversions, max_weight=None):
+    """
+    (weights (k x n), expected returns (k), variances (k)) for each value in risk_aversions.
+    """
+    return MeanVarianceOptimizer(max_weight).frontier(expected_returns, covariance_matrix, risk_aversions)
+
+
+def optimize_portfolio(expected_returns, covariance_matrix, risk_aversion, total_investment, prices=None,
+                       max_weight=None, optimizer=None):
+    """
+    Long-only allocation of total_investment. Returns the units to buy per asset when `prices` is given,
+    otherwise the dollar amount per asset (a Series when the inputs are indexed by symbol).
+    """
+    optimizer = optimizer or MeanVarianceOptimizer(max_weight)
+    weights = optimizer.weights(expected_returns, covariance_matrix, risk_aversion)
+    if prices is None:
+        return weights * total_investment
+    if isinstance(weights, pd.Series) and isinstance(prices, pd.Series):
+        prices = prices.reindex(weights.index)
+    quantities = weights_to_quantities(weights, prices, total_investment)
+    if isinstance(weights, pd.Series):
+        return pd.Series(quantities, index=weights.index)
+    return quantities
@@ -0,0 +1,277 @@
+"""
+Per-stage profiling for the runners and long jobs.
+
+Wrap a stage with `with stage('predict.train'):`. Every stage is timed (always on, negligible cost) and
+its duration is kept in stage_durations.json; a stage that takes more than SLOW_FACTOR x its usual
+(median) duration is logged as a warning and printed.
+
+Setting TRADING_PROFILE (or passing --profile to run_algo_trading.py / crypto_trading.py) also profiles
+each stage. The value is a comma-separated list of modes, or 'all' / '1' for every mode:
+
+    cpu     cProfile of the thread running the stage -> <stage>-<time>.prof and a .cpu.txt summary
+    sample  wall-clock stack samples of every thread (incl. thread pools) -> .collapsed (flamegraph format)
+    memory  tracemalloc snapshot and the top allocations since the stage started -> .tracemalloc / .memory.txt
+
+Artifacts go to TRADING_PROFILE_DIR, by default profiles/ in the working directory (where the scripts log).
+A whole script can be profiled as one stage with:
+
+    python -m trading_core.profiling --mode cpu,memory commodities/bracket_order.py
+"""
+import argparse
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import runpy
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+MODES = ('cpu', 'sample', 'memory')
+SLOW_FACTOR = 1.5
+SLOW_MIN_SECONDS = 1.0
+HISTORY_LENGTH = 20
+MIN_HISTORY = 3
+SAMPLE_INTERVAL = 0.01
+
+_here = os.path.dirname(os.path.abspath(__file__))
+_lock = threading.Lock()
+_cpu_active = False
+
+
+def modes():
+    value = os.environ.get('TRADING_PROFILE', '').strip().lower()
+    if not value or value in ('0', 'false', 'off'):
+        return set()
+    if value in ('1', 'true', 'all'):
+        return set(MODES)
+    return {mode.strip() for mode in value.split(',') if mode.strip() in MODES}
+
+
+def profile_dir():
+    return os.environ.get('TRADING_PROFILE_DIR') or os.path.join(os.getcwd(), 'profiles')
+
+
+def history_path():
+    return os.environ.get('TRADING_STAGE_HISTORY') or os.path.join(os.getcwd(), 'stage_durations.json')
+
+
+def enable(mode='all', directory=None):
+    """
+    Turn profiling on for this process and the scripts it starts (the settings are passed in the environment).
+    """
+    os.environ['TRADING_PROFILE'] = mode
+    if directory:
+        os.environ['TRADING_PROFILE_DIR'] = directory
+    root = os.path.dirname(_here)
+    paths = [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p]
+    if root not in paths:
+        os.environ['PYTHONPATH'] = os.pathsep.join([root] + paths)
+
+
+def command(script_path, python='python3'):
+    """
+    Command line the runners use for a script: profiled as one stage when profiling is on.
+    """
+    if modes():
+        # the runner already times the script; the child only writes the profile
+        return [sys.executable, '-m', 'trading_core.profiling', '--no-history', script_path]
+    return [python, script_path]
+
+
+# ----- always-on duration check -----
+
+def _load_history(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_duration(name, seconds, path=None):
+    """
+    Add a stage duration to the history and return the usual (median) duration if this one is unusually slow.
+    """
+    path = path or history_path()
+    with _lock:
+        history = _load_history(path)
+        previous = history.get(name, [])
+        usual = statistics.median(previous) if len(previous) >= MIN_HISTORY else None
+        history[name] = (previous + [round(seconds, 4)])[-HISTORY_LENGTH:]
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(history, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not save stage durations to {path}: {e}")
+    if usual is not None and seconds > usual * SLOW_FACTOR and seconds - usual > SLOW_MIN_SECONDS:
+        return usual
+    return None
+
+
+# ----- profilers -----
+
+class StackSampler:
+    """
+    Samples the stacks of all threads every `interval` seconds and counts them in collapsed
+    (flamegraph.pl / speedscope) format.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                # skip this and any nested stage's sampler
+                if names.get(ident) == 'stack-sampler':
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _artifact_base(name):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    safe = ''.join(c if c.isalnum() or c in '._-' else '_' for c in name)
+    return os.path.join(directory, f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+
+def _write_cpu(profiler, base):
+    profiler.dump_stats(f"{base}.prof")
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(40)
+    with open(f"{base}.cpu.txt", 'w') as f:
+        f.write(text.getvalue())
+
+
+def _write_memory(start_snapshot, base):
+    snapshot = tracemalloc.take_snapshot()
+    snapshot.dump(f"{base}.tracemalloc")
+    current, peak = tracemalloc.get_traced_memory()
+    with open(f"{base}.memory.txt", 'w') as f:
+        f.write(f"traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+        f.write("top allocations since the stage started:\n")
+        for stat in snapshot.compare_to(start_snapshot, 'lineno')[:25]:
+            f.write(f"{stat}\n")
+
+
+@contextmanager
+def stage(name, profile=True, history=True):
+    """
+    Time (and, when TRADING_PROFILE is set, profile) the enclosed block as stage `name`. profile=False only
+    times it, e.g. a runner waiting on a subprocess; history=False skips the duration check.
+    """
+    global _cpu_active
+    active = modes() if profile else set()
+    profiler = sampler = start_snapshot = None
+    started_tracing = False
+
+    if 'cpu' in active:
+        with _lock:
+            # one cProfile at a time; nested stages are covered by the outer profile
+            if not _cpu_active:
+                _cpu_active = True
+                profiler = cProfile.Profile()
+    if 'sample' in active:
+        sampler = StackSampler()
+        sampler.start()
+    if 'memory' in active:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        start_snapshot = tracemalloc.take_snapshot()
+
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        if active:
+            base = _artifact_base(name)
+            try:
+                if profiler is not None:
+                    _write_cpu(profiler, base)
+                if sampler is not None:
+                    sampler.stop()
+                    sampler.write(f"{base}.collapsed")
+                if start_snapshot is not None:
+                    _write_memory(start_snapshot, base)
+                logging.info(f"Profile for stage {name} written to {base}.*")
+            except Exception as e:
+                logging.warning(f"Could not write the profile for stage {name}: {e}")
+            finally:
+                if profiler is not None:
+                    with _lock:
+                        _cpu_active = False
+                if started_tracing:
+                    tracemalloc.stop()
+
+        usual = record_duration(name, elapsed) if history else None
+        if usual is not None:
+            message = f"Stage {name} took {elapsed:.1f}s, usually {usual:.1f}s"
+            logging.warning(message)
+            print(message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script as one profiled stage.")
+    parser.add_argument('--mode', default=os.environ.get('TRADING_PROFILE') or 'all',
+                        help="comma-separated: cpu, sample, memory (default: all)")
+    parser.add_argument('--out', help="directory for the profile artifacts (default: ./profiles)")
+    parser.add_argument('--stage', help="stage name (default: the script's file name)")
+    parser.add_argument('--no-history', action='store_true', help="don't record the duration in stage_durations.json")
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+
+    script = os.path.abspath(options.script)
+    os.environ['TRADING_PROFILE'] = options.mode
+    if options.out:
+        os.environ['TRADING_PROFILE_DIR'] = os.path.abspath(options.out)
+    sys.argv = [script] + options.args
+    sys.path.insert(0, os.path.dirname(script))
+    with stage(options.stage or os.path.basename(script), history=not options.no_history):
+        runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == '__main__':
+    # use the package's module so stages inside the script share its profiler state
+    from trading_core.profiling import main as _main
+    _main()
@@ -0,0 +1,152 @@
+"""
+Latest prices for many symbols at once.
+
+QuoteService.prices(symbols) answers from a short-lived cache and fetches everything it is missing in
+at most two broker calls: one get_latest_crypto_bars for the crypto pairs and one get_latest_bars for
+the equities. Every symbol the service has been asked about is remembered, so a miss refreshes the
+whole known universe in the same request and the next per-symbol lookups in the cycle are cache hits.
+Only symbols the batch could not price go to the per-symbol `fallback` (e.g. the Alpha Vantage lookup).
+
+With a stream.PriceBook (`book`), fresh streamed prices are used first and REST only covers symbols the
+stream has not delivered recently.
+
+    quotes = QuoteService(api, fallback=lookup_price)
+    quotes.prices(symbols)        # one or two requests for the cycle
+    quotes.price('BTC/USD')       # cached
+"""
+import threading
+import time
+
+from .assets import get_asset_index, normalize_symbol, pair_symbol
+from .config import get_config
+from .logs import get_logger
+
+log = get_logger('quotes')
+
+TTL = 15.0  # seconds a fetched price is reused
+
+
+def _bar_close(bar):
+    # entities expose .c; raw responses are dicts
+    if isinstance(bar, dict):
+        return float(bar['c'])
+    return float(bar.c)
+
+
+class QuoteService:
+    def __init__(self, api, ttl=TTL, fallback=None, config=None, book=None):
+        self.api = api
+        self.ttl = ttl
+        self.fallback = fallback
+        self.book = book
+        self.config = config or get_config()
+        self.assets = get_asset_index(api)
+        self.requests = 0
+        self.hits = 0
+        self.stream_hits = 0
+        self.fallbacks = 0
+        self._prices = {}  # normalized symbol -> (price, fetched_at)
+        self._known = {}   # normalized symbol -> symbol as first requested
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def _fresh(self, key, now):
+        entry = self._prices.get(key)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def price(self, symbol):
+        return self.prices([symbol]).get(symbol)
+
+    def prices(self, symbols):
+        """
+        {symbol: latest price} for the requested symbols; symbols nobody could price are left out.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        result = self._cached(symbols)
+        if len(result) == len(symbols):
+            return result
+
+        # one thread refreshes at a time; the others then find their symbols in the cache
+        with self._fetch_lock:
+            result = self._cached(symbols, count_hits=False)
+            missing = [s for s in symbols if s not in result]
+            if not missing:
+                return result
+            with self._lock:
+                for symbol in missing:
+                    self._known.setdefault(normalize_symbol(symbol), symbol)
+                now = time.monotonic()
+                stale = [s for key, s in self._known.items()
+                         if self._fresh(key, now) is None and (self.book is None or self.book.price(key) is None)]
+            self._fetch_batch(stale)
+
+        result = self._cached(symbols, count_hits=False)
+        for symbol in symbols:
+            if symbol not in result and self.fallback is not None:
+                price = self._fetch_one(symbol)
+                if price:
+                    result[symbol] = price
+        return result
+
+    def _cached(self, symbols, count_hits=True):
+        now = time.monotonic()
+        result = {}
+        streamed = 0
+        with self._lock:
+            for symbol in symbols:
+                price = self.book.price(symbol) if self.book is not None else None
+                if price is not None:
+                    streamed += 1
+                else:
+                    price = self._fresh(normalize_symbol(symbol), now)
+                if price is not None:
+                    result[symbol] = price
+            if count_hits:
+                self.hits += len(result) - streamed
+                self.stream_hits += streamed
+        return result
+
+    def _fetch_batch(self, symbols):
+        crypto = [pair_symbol(s, self.config.crypto_quote_suffix) for s in symbols if self.assets.is_crypto(s)]
+        equities = [s for s in symbols if not self.assets.is_crypto(s)]
+        fetched = {}
+        for request, batch in (('get_latest_crypto_bars', crypto), ('get_latest_bars', equities)):
+            if not batch:
+                continue
+            try:
+                self.requests += 1
+                bars = getattr(self.api, request)(batch)
+                for symbol, bar in bars.items():
+                    fetched[normalize_symbol(symbol)] = _bar_close(bar)
+            except Exception as e:
+                log.warning("%s failed for %d symbols: %s", request, len(batch), e)
+        self._store(fetched)
+        log.debug("Fetched %d of %d latest prices", len(fetched), len(symbols))
+
+    def _fetch_one(self, symbol):
+        try:
+            price = self.fallback(symbol)
+        except Exception as e:
+            log.warning("Fallback price lookup failed for %s: %s", symbol, e)
+            return None
+        with self._lock:
+            self.fallbacks += 1
+        if price:
+            self._store({normalize_symbol(symbol): float(price)})
+        return price
+
+    def _store(self, prices):
+        now = time.monotonic()
+        with self._lock:
+            for key, price in prices.items():
+                if price > 0:
+                    self._prices[key] = (price, now)
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._prices.clear()
+            else:
+                self._prices.pop(normalize_symbol(symbol), None)
@@ -0,0 +1,182 @@
+"""
+Higher-timeframe OHLCV bars derived locally from stored 5-minute (or 1-minute) bars.
+
+resample() bins bars by time with integer arithmetic on the timestamps and aggregates each bin with numpy
+reduceat (first open, max high, min low, last close, summed volume), so no Python loop runs per bar or
+per bin. Bins are labelled with their start time, like Alpaca's bars.
+
+Two calendars:
+    crypto  trades 24/7; bins are aligned to UTC midnight (a 4h bar starts at 00:00, 04:00, ...)
+    equity  regular session only (09:30-16:00 America/New_York). Intraday bins are aligned to the open,
+            so the 1h bars are 09:30, 10:30, ... 15:30 (a 30-minute bar), and a daily bar is one session.
+            Pre/post-market bars are dropped. Sessions come from the bars themselves, so holidays need
+            no table and an early close just gives a shorter last bar.
+
+Resampler caches the derived series per symbol and timeframe, in memory and next to the BarStore. When
+the store gains bars, only the bins from the last (possibly unfinished) one onwards are recomputed:
+
+    resampler = Resampler(BarStore('5min'))
+    daily = resampler.bars('BTC/USD', '1D')
+    closed = resampler.complete_bars('BTC/USD', '1D')   # without today's unfinished bar
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import COLUMNS
+
+TIMEFRAMES = {'5min': '5min', '15min': '15min', '1h': '1h', '4h': '4h', '1D': '1D'}
+
+SESSION_TZ = 'America/New_York'
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_CLOSE = pd.Timedelta(hours=16)
+
+
+def _frequency(timeframe):
+    return pd.Timedelta(TIMEFRAMES.get(timeframe, timeframe)).value
+
+
+def _as_utc(index):
+    index = pd.DatetimeIndex(index).as_unit('ns')  # bins are computed on int64 nanoseconds
+    return index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+
+
+def _bins(index, timeframe, calendar):
+    """
+    (bin start per bar as int64 ns UTC, mask of bars that belong to a bin).
+    """
+    freq = _frequency(timeframe)
+    utc = _as_utc(index)
+    if calendar == 'crypto':
+        ns = utc.asi8
+        return ns - ns % freq, np.ones(len(ns), dtype=bool)
+    if calendar != 'equity':
+        raise ValueError(f"Unknown calendar: {calendar}")
+
+    local = utc.tz_convert(SESSION_TZ)
+    midnight = local.normalize()
+    since_midnight = (local - midnight).as_unit('ns').asi8
+    in_session = (since_midnight >= SESSION_OPEN.value) & (since_midnight < SESSION_CLOSE.value)
+    session_open = midnight + SESSION_OPEN
+    if freq >= pd.Timedelta('1D').value:
+        # one bar per session, labelled with the session date
+        starts = midnight.tz_localize(None).as_unit('ns').asi8
+    else:
+        offset = since_midnight - SESSION_OPEN.value
+        starts = (session_open + pd.to_timedelta(offset - offset % freq)).tz_convert('UTC').as_unit('ns').asi8
+    return starts, in_session
+
+
+def resample(bars, timeframe, calendar='crypto'):
+    """
+    Aggregate `bars` (DatetimeIndex, columns open/high/low/close/volume, oldest first) into `timeframe` bars.
+    Daily equity bars are indexed by session date; everything else by UTC bin start.
+    """
+    if not len(bars):
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='timestamp'), dtype=float)
+    bars = bars.sort_index()
+    starts, mask = _bins(bars.index, timeframe, calendar)
+    starts = starts[mask]
+    values = {column: bars[column].to_numpy(dtype=float)[mask] for column in COLUMNS}
+    if not len(starts):
+        return resample(bars.iloc[:0], timeframe, calendar)
+
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(starts) - 1]
+    daily_equity = calendar == 'equity' and _frequency(timeframe) >= pd.Timedelta('1D').value
+    index = pd.DatetimeIndex(starts[first], tz=None if daily_equity else 'UTC', name='timestamp')
+    return pd.DataFrame({
+        'open': values['open'][first],
+        'high': np.maximum.reduceat(values['high'], first),
+        'low': np.minimum.reduceat(values['low'], first),
+        'close': values['close'][last],
+        'volume': np.add.reduceat(values['volume'], first),
+    }, index=index)
+
+
+class Resampler:
+    """
+    Derived timeframes for the symbols in a BarStore, cached and updated incrementally.
+
+    The cache is keyed on the last derived bin, which may still have been forming: as long as the store
+    holds every source bar from that bin's start on, only the bins from there are recomputed, however many
+    old bars the store has trimmed since. Bins older than the store's first bar are dropped. The derived
+    series are also saved under <store directory>/resampled/<timeframe>/, so the next run starts from them.
+    """
+
+    def __init__(self, store, calendar='crypto'):
+        self.store = store
+        self.calendar = calendar
+        self.directory = os.path.join(store.directory, 'resampled')
+        self._cache = {}  # (symbol, timeframe) -> (last source timestamp, result)
+        self._lock = threading.Lock()
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.directory, timeframe, os.path.basename(self.store.path(symbol)))
+
+    def bars(self, symbol, timeframe):
+        source = self.store.load(symbol)
+        if timeframe == self.store.timeframe or not len(source):
+            return source
+        key = (symbol, timeframe)
+        last = source.index[-1]
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == last:
+            return cached[1]
+        previous = cached[1] if cached is not None else self._load(symbol, timeframe)
+
+        boundary = None
+        if previous is not None and len(previous):
+            boundary = previous.index[-1]
+            boundary = boundary.tz_localize(SESSION_TZ) if boundary.tz is None else boundary
+        if boundary is None or _as_utc(source.index[:1])[0] > boundary or boundary > _as_utc(source.index[-1:])[0]:
+            # first use, a gap longer than a bin, or the store was reset: aggregate everything
+            result = resample(source, timeframe, self.calendar)
+        else:
+            # the last derived bin may have been incomplete: rebuild from its first source bar onwards
+            tail = source[_as_utc(source.index) >= boundary]
+            result = pd.concat([previous.iloc[:-1], resample(tail, timeframe, self.calendar)])
+            first_bin = _bins(source.index[:1], timeframe, self.calendar)[0][0]
+            result = result[result.index.as_unit('ns').asi8 >= first_bin]
+        self._save(symbol, timeframe, result)
+        with self._lock:
+            self._cache[key] = (last, result)
+        return result
+
+    def complete_bars(self, symbol, timeframe):
+        """
+        bars() without the last bin while the store does not reach its end yet (the bin is still forming).
+        """
+        result = self.bars(symbol, timeframe)
+        if timeframe == self.store.timeframe or not len(result):
+            return result
+        source_end = _as_utc(self.store.load(symbol).index[-1:])[0] + pd.Timedelta(_frequency(self.store.timeframe))
+        if source_end < self._bin_end(result.index[-1], timeframe):
+            return result.iloc[:-1]
+        return result
+
+    def _bin_end(self, start, timeframe):
+        freq = pd.Timedelta(_frequency(timeframe))
+        if self.calendar == 'crypto':
+            return start + freq
+        if start.tz is None:
+            # daily equity bars are labelled with the session date
+            return start.tz_localize(SESSION_TZ) + SESSION_CLOSE
+        local = start.tz_convert(SESSION_TZ)
+        return min(start + freq, local.normalize() + SESSION_CLOSE)
+
+    def _load(self, symbol, timeframe):
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        return pd.read_csv(path, index_col=0, parse_dates=True)[COLUMNS]
+
+    def _save(self, symbol, timeframe, result):
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        result.to_csv(tmp_path)
+        os.replace(tmp_path, path)
@@ -0,0 +1,186 @@
+"""
+Risk state shared by the order threads: the daily trade count, per-symbol locks and reservations.
+
+validate_trade() reads prices, cash and positions without holding a lock, then calls reserve() with a
+check that runs under the ledger lock. The check sees the cash and exposure that other threads have
+reserved but not submitted yet, so two workers cannot both spend the same cash or fill the same class cap.
+An approved trade gets a Reservation, which holds its cash, class exposure and quantity until the order
+is submitted (commit(): the fill is then in the portfolio manager's totals) or abandoned (release()):
+
+    reservation = rm.validate_trade(symbol, qty, 'buy')
+    if reservation:
+        with reservation:            # commits on success, releases if the block raises
+            api.submit_order(...)
+            rm.manager.record_fill(...)
+
+Reservations nobody settles expire after `ttl` seconds so a crashed worker cannot block the book; like a
+released one, an expired reservation no longer counts against the daily trade limit.
+"""
+import itertools
+import threading
+import time
+from datetime import date
+
+from .assets import normalize_symbol
+from .logs import get_logger
+
+log = get_logger('reservations')
+
+TTL = 120.0  # seconds an unsettled reservation is held
+
+
+class Reservation:
+    def __init__(self, ledger, reservation_id, symbol, side, qty, value, asset_class):
+        self.ledger = ledger
+        self.id = reservation_id
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.value = value
+        self.asset_class = asset_class
+        self.created_at = time.monotonic()
+        self.state = 'open'
+
+    def commit(self):
+        """
+        The order was submitted; its exposure is now tracked by the portfolio manager.
+        """
+        self.ledger._settle(self, 'committed')
+
+    def release(self):
+        """
+        The order was not placed; give back the cash, exposure and the daily trade.
+        """
+        self.ledger._settle(self, 'released')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.release()
+        return False
+
+    def __repr__(self):
+        return (f"Reservation({self.symbol!r}, {self.side}, qty={self.qty}, value={self.value:.2f}, "
+                f"{self.state})")
+
+
+class RiskLedger:
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+        self._open = {}
+        self._ids = itertools.count(1)
+        self._day = date.today()
+        self._trades = 0
+        self._cash = 0.0
+        self._value = {}     # asset class -> reserved buy value
+        self._buy_qty = {}   # symbol -> reserved buy quantity
+        self._sell_qty = {}  # symbol -> reserved sell quantity
+        self.counts = {'reserved': 0, 'committed': 0, 'released': 0, 'expired': 0, 'rejected': 0}
+
+    def symbol_lock(self, symbol):
+        """
+        The lock serialising validate-and-submit for one symbol (re-entrant).
+        """
+        key = normalize_symbol(symbol)
+        with self._lock:
+            lock = self._symbol_locks.get(key)
+            if lock is None:
+                lock = self._symbol_locks[key] = threading.RLock()
+            return lock
+
+    # ----- reads (call from a reserve() check, which already holds the lock) -----
+
+    @property
+    def trades_today(self):
+        self._roll_day()
+        return self._trades
+
+    def reserved_cash(self):
+        return self._cash
+
+    def reserved_value(self, asset_class):
+        return self._value.get(asset_class, 0.0)
+
+    def reserved_qty(self, symbol, side='buy'):
+        quantities = self._buy_qty if side == 'buy' else self._sell_qty
+        return quantities.get(normalize_symbol(symbol), 0.0)
+
+    def open_reservations(self):
+        with self._lock:
+            return list(self._open.values())
+
+    # ----- updates -----
+
+    def reserve(self, symbol, side, qty, value, asset_class, check=None):
+        """
+        Run `check(ledger)` under the lock and, if it returns no rejection reason, reserve the trade and
+        count it against the daily limit. Returns the Reservation, or None with the reason logged.
+        """
+        with self._lock:
+            self._roll_day()
+            self._expire()
+            reason = check(self) if check is not None else None
+            if reason:
+                self.counts['rejected'] += 1
+                log.info("Rejected %s of %s: %s", side, symbol, reason)
+                return None
+            return self._add(symbol, side, qty, value, asset_class)
+
+    def reserve_batch(self, plan):
+        """
+        Run `plan(ledger)` under the lock; it returns (symbol, side, qty, value, asset_class) tuples, which are
+        all reserved before any other thread can check. Returns their Reservations.
+        """
+        with self._lock:
+            self._roll_day()
+            self._expire()
+            return [self._add(*order) for order in plan(self)]
+
+    def _add(self, symbol, side, qty, value, asset_class):
+        reservation = Reservation(self, next(self._ids), symbol, side, float(qty), float(value), asset_class)
+        self._apply(reservation, 1)
+        self._open[reservation.id] = reservation
+        self._trades += 1
+        self.counts['reserved'] += 1
+        return reservation
+
+    def _apply(self, reservation, sign):
+        key = normalize_symbol(reservation.symbol)
+        if reservation.side == 'buy':
+            self._cash += sign * reservation.value
+            self._value[reservation.asset_class] = self.reserved_value(reservation.asset_class) + sign * reservation.value
+            self._buy_qty[key] = self._buy_qty.get(key, 0.0) + sign * reservation.qty
+        else:
+            self._sell_qty[key] = self._sell_qty.get(key, 0.0) + sign * reservation.qty
+
+    def _settle(self, reservation, state):
+        with self._lock:
+            self._close(reservation, state)
+
+    def _close(self, reservation, state):
+        # called with the lock held; an expired reservation gives back its daily trade like a released one
+        if self._open.pop(reservation.id, None) is None:
+            return  # already settled or expired
+        self._apply(reservation, -1)
+        reservation.state = state
+        self.counts[state] += 1
+        if state in ('released', 'expired'):
+            self._trades = max(0, self._trades - 1)
+
+    def _expire(self):
+        now = time.monotonic()
+        for reservation in [r for r in self._open.values() if now - r.created_at > self.ttl]:
+            log.warning("Reservation for %s %s expired unsettled", reservation.side, reservation.symbol)
+            self._close(reservation, 'expired')
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._trades = 0
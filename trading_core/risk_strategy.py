@@ -0,0 +1,1500 @@
+import alpaca_trade_api as tradeapi
+from credentials import ALPACA_API_KEY, ALPACA_SECRET_KEY, ALPHA_VANTAGE_API
+import requests
+import json
+from .trade_stats import download_trades
+from alpha_vantage.timeseries import TimeSeries
+from alpha_vantage.cryptocurrencies import CryptoCurrencies
+from datetime import datetime
+from .port_op import optimize_portfolio, MeanVarianceOptimizer
+from .covariance import CovarianceStore
+from .equity_history import EquityHistory
+from .quotes import QuoteService
+from .reservations import RiskLedger
+from . import sizing
+from .stream import get_market_stream
+from .config import get_config
+from .assets import get_asset_index, normalize_symbol
+from .tracing import traced
+from .notifier import send_teams_message
+from .logs import get_logger
+import numpy as np
+import pandas as pd
+import time
+import os
+import tempfile
+import threading
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+log = get_logger('risk')
+
+_factory_lock = threading.RLock()
+
+
+def _cached_factory(factory):
+    """
+    Create the wrapped object on first use and return the same instance afterwards.
+    Importing this module therefore does no network or file I/O.
+    """
+    instance = []
+
+    @functools.wraps(factory)
+    def wrapper():
+        if not instance:
+            with _factory_lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    wrapper.cache_clear = instance.clear
+    return wrapper
+
+
+@_cached_factory
+def get_api():
+    config = get_config()
+    if config.broker_factory is not None:
+        return config.broker_factory()
+    return tradeapi.REST(ALPACA_API_KEY, ALPACA_SECRET_KEY, base_url=get_config().base_url)
+
+
+@_cached_factory
+def get_alpha_vantage_ts():
+    return TimeSeries(key=ALPHA_VANTAGE_API, output_format='pandas')
+
+
+@_cached_factory
+def get_alpha_vantage_crypto():
+    return CryptoCurrencies(key=ALPHA_VANTAGE_API, output_format='pandas')
+
+
+@_cached_factory
+def get_risk_params():
+    # read the risk_params in and use the values
+    # these are updated by the algorithm below by pnl
+    return RiskParams(get_config().get_risk_params_path())
+
+
+_lazy_globals = {
+    'api': get_api,
+    'alpha_vantage_ts': get_alpha_vantage_ts,
+    'alpha_vantage_crypto': get_alpha_vantage_crypto,
+    'risk_params': get_risk_params,
+    'account': lambda: get_api().get_account(),
+    'equity': lambda: float(get_api().get_account().equity),
+}
+
+
+def __getattr__(name):
+    # keep `from risk_strategy import api, risk_params` working without creating them at import time
+    if name in _lazy_globals:
+        return _lazy_globals[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class RiskParams:
+    """
+    In-memory store for the risk parameters kept in risk_params.json.
+
+    The file is read once; reads are served from memory and updates are applied under a lock.
+    Writes are debounced so a burst of updates produces a single write, and are done by writing
+    to a temp file and renaming it over the original so readers never see a half-written file.
+    A background watcher reloads the parameters when the file's mtime changes on disk.
+    """
+
+    def __init__(self, path, debounce_seconds=2.0, watch_interval=5.0):
+        self.path = path
+        self.debounce_seconds = debounce_seconds
+        self.watch_interval = watch_interval
+        self._lock = threading.RLock()
+        self._params = {}
+        self._mtime = None
+        self._dirty = False
+        self._timer = None
+        self._watcher = None
+        self._closed = False
+
+        self.load()
+        atexit.register(self.close)
+
+        if watch_interval:
+            self._watcher = threading.Thread(target=self._watch, name='risk-params-watcher', daemon=True)
+            self._watcher.start()
+
+    def _read(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, 'r') as f:
+            params = json.load(f)
+        return params, mtime
+
+    def load(self):
+        params, mtime = self._read()
+        with self._lock:
+            self._params = params
+            self._mtime = mtime
+
+    def reload_if_changed(self):
+        """
+        Reload the parameters if the file was changed by another process.
+        Pending local updates win over the file until they have been written.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+
+        with self._lock:
+            if self._dirty or mtime == self._mtime:
+                return False
+
+        try:
+            params, mtime = self._read()
+        except (OSError, ValueError) as e:
+            log.warning("Could not reload %s: %s", self.path, e)
+            return False
+
+        with self._lock:
+            if self._dirty:
+                return False
+            self._params = params
+            self._mtime = mtime
+        return True
+
+    def _watch(self):
+        while not self._closed:
+            time.sleep(self.watch_interval)
+            self.reload_if_changed()
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._params[key]
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._params
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._params.get(key, default)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._params)
+
+    def update(self, values):
+        with self._lock:
+            self._params.update(values)
+            self._dirty = True
+            self._schedule_save()
+
+    def mutate(self, fn):
+        """
+        Read-modify-write in one step: fn(params) is called with a copy of the parameters under the lock
+        and returns the values to update (or None), so no other update can land in between. Returns the
+        values applied.
+        """
+        with self._lock:
+            values = fn(dict(self._params))
+            if values:
+                self.update(values)
+            return values or {}
+
+    def _schedule_save(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce_seconds, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """
+        Write pending updates to disk atomically (write temp file, then rename).
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.risk_params.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self._params, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self._dirty = False
+
+    def close(self):
+        self._closed = True
+        self.flush()
+
+
+
+# Define a class to represent a crypto asset
+class CryptoAsset:
+    def __init__(self, symbol, quantity, value_usd):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.value_usd = value_usd
+        self.value_24h_ago = None  # to store the value 24 hours ago
+        self.crypto_symbols = get_config().crypto_symbols
+
+    def profit_loss_24h(self):
+        if self.value_24h_ago is not None:
+            return (self.value_usd - self.value_24h_ago) / self.value_24h_ago * 100
+        else:
+            return None
+
+
+# Define a class to manage the portfolio
+class PortfolioManager:
+    """
+    Holdings stored as array columns (qty, price, value, 24h value, asset class) indexed by symbol,
+    with running totals per asset class so portfolio and class values are O(1) reads.
+
+    Totals are adjusted by the value delta on add_asset/update_asset_value/record_fill and rebuilt in
+    one pass by sync_positions when a fresh broker snapshot is loaded.
+    """
+    EQUITY, CRYPTO = 0, 1
+
+    def __init__(self, api, capacity=64):
+        self.api = api
+        self.operations = 0  # track the number of operations
+        self.synced_at = None
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def _reset(self, capacity):
+        self._index = {}
+        self._symbols = []
+        self._qty = np.zeros(capacity)
+        self._price = np.zeros(capacity)
+        self._value = np.zeros(capacity)
+        self._value_24h = np.full(capacity, np.nan)
+        self._class = np.zeros(capacity, dtype=np.int8)
+        self._class_totals = [0.0, 0.0]
+
+    def _grow(self):
+        capacity = len(self._qty) * 2
+        self._qty = np.resize(self._qty, capacity)
+        self._price = np.resize(self._price, capacity)
+        self._value = np.resize(self._value, capacity)
+        self._value_24h = np.concatenate([self._value_24h, np.full(capacity - len(self._value_24h), np.nan)])
+        self._class = np.resize(self._class, capacity)
+
+    def _classify(self, symbol):
+        return self.CRYPTO if get_asset_index(self.api).is_crypto(symbol) else self.EQUITY
+
+    def _row(self, symbol, asset_class=None):
+        row = self._index.get(symbol)
+        if row is None:
+            row = len(self._symbols)
+            if row == len(self._qty):
+                self._grow()
+            self._index[symbol] = row
+            self._symbols.append(symbol)
+            self._qty[row] = self._price[row] = self._value[row] = 0.0
+            self._value_24h[row] = np.nan
+            self._class[row] = self._classify(symbol) if asset_class is None else asset_class
+        return row
+
+    def _set(self, row, qty, price, value):
+        self._class_totals[self._class[row]] += value - self._value[row]
+        self._qty[row] = qty
+        self._price[row] = price
+        self._value[row] = value
+
+    def increment_operations(self):
+        self.operations += 1
+
+    def add_asset(self, symbol, quantity, value_usd, asset_class=None):
+        quantity, value_usd = float(quantity), float(value_usd)
+        with self._lock:
+            row = self._row(symbol, asset_class)
+            price = value_usd / quantity if quantity else self._price[row]
+            self._set(row, quantity, price, value_usd)
+
+    def update_asset_value(self, symbol, value_usd):
+        with self._lock:
+            row = self._index.get(symbol)
+            if row is not None:
+                qty = self._qty[row]
+                price = float(value_usd) / qty if qty else self._price[row]
+                self._set(row, qty, price, float(value_usd))
+
+    def update_price(self, symbol, price):
+        with self._lock:
+            row = self._index.get(symbol)
+            if row is not None:
+                self._set(row, self._qty[row], float(price), self._qty[row] * float(price))
+
+    def record_fill(self, symbol, side, qty, price):
+        """
+        Apply a buy/sell fill to the holdings and the running totals.
+        """
+        qty, price = float(qty), float(price)
+        with self._lock:
+            row = self._row(symbol)
+            new_qty = self._qty[row] + qty if side == 'buy' else max(0.0, self._qty[row] - qty)
+            self._set(row, new_qty, price, new_qty * price)
+
+    def sync_positions(self, positions):
+        """
+        Rebuild the columns and totals from a list_positions() snapshot. The 24h values are not part of
+        the snapshot and are carried over by symbol.
+        """
+        with self._lock:
+            value_24h = {symbol: self._value_24h[row] for symbol, row in self._index.items()}
+            self._reset(max(64, len(positions)))
+            for position in positions:
+                qty = float(position.qty)
+                price = float(position.current_price)
+                row = self._row(position.symbol)
+                self._set(row, qty, price, qty * price)
+                self._value_24h[row] = value_24h.get(position.symbol, np.nan)
+            self.synced_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        return self.synced_at is None or time.monotonic() - self.synced_at > max_age
+
+    def quantity(self, symbol):
+        row = self._index.get(symbol)
+        return float(self._qty[row]) if row is not None else 0.0
+
+    def price(self, symbol):
+        row = self._index.get(symbol)
+        return float(self._price[row]) if row is not None else None
+
+    def asset_value(self, symbol):
+        row = self._index.get(symbol)
+        return float(self._value[row]) if row is not None else 0.0
+
+    def crypto_value(self):
+        return self._class_totals[self.CRYPTO]
+
+    def commodity_value(self):
+        return self._class_totals[self.EQUITY]
+
+    def portfolio_value(self):
+        return self._class_totals[self.EQUITY] + self._class_totals[self.CRYPTO]
+
+    def symbols(self):
+        return [symbol for symbol in self._symbols if self._qty[self._index[symbol]] > 0]
+
+    @property
+    def assets(self):
+        # object view of the columns for callers that want CryptoAsset instances
+        with self._lock:
+            assets = {}
+            for symbol, row in self._index.items():
+                asset = CryptoAsset(symbol, float(self._qty[row]), float(self._value[row]))
+                if not np.isnan(self._value_24h[row]):
+                    asset.value_24h_ago = float(self._value_24h[row])
+                assets[symbol] = asset
+            return assets
+
+    def portfolio_balance(self):
+        with self._lock:
+            total = self.portfolio_value()
+            n = len(self._symbols)
+            if not total:
+                return {symbol: 0.0 for symbol in self._symbols}
+            pct = self._value[:n] / total * 100
+            return dict(zip(self._symbols, pct.tolist()))
+
+    def sell_decision(self, symbol):
+        total = self.portfolio_value()
+        if not total or symbol not in self._index:
+            return False
+
+        # the balances sum to 100%, so 0.4 * sum(balance) is 40%
+        balance = self.asset_value(symbol) / total * 100
+        return balance > 25 or balance > 40
+
+    def scale_out(self, symbol):
+        quantity_to_sell = int(self.quantity(symbol) * 0.1)  # Sell 10% of holdings
+        return quantity_to_sell
+
+    def update_asset_values_24h(self):
+        with self._lock:
+            n = len(self._symbols)
+            self._value_24h[:n] = self._value[:n]
+
+
+class RiskManagement:
+    def __init__(self, api, risk_params, config=None):
+        self.api = api
+        self.risk_params = risk_params
+        self.config = config or get_config()
+        self.assets = get_asset_index(api)
+        self.alpha_vantage_ts = get_alpha_vantage_ts()
+        self.alpha_vantage_crypto = get_alpha_vantage_crypto()
+        self.manager = PortfolioManager(api)
+        self.optimizer = MeanVarianceOptimizer()  # warm-starts each rebalance from the previous weights
+        self.covariance = CovarianceStore()
+        # with streaming on, price lookups read the websocket price book and only fall back to REST
+        self.stream = get_market_stream(api) if self.config.streaming else None
+        self.stream_warmup = 2.0  # seconds prefetch_prices waits for the first streamed prices
+        self.quotes = QuoteService(api, fallback=self._lookup_price, config=self.config,
+                                   book=self.stream.book if self.stream else None)
+        self.positions_ttl = 30  # seconds a list_positions snapshot is reused by the risk checks
+        # trade count, per-symbol locks and in-flight reservations shared by the order threads
+        self.ledger = RiskLedger()
+        self.max_trades_per_day = 120
+        self.crypto_value = 0
+        self.commodity_value = 0
+
+        # Get account info
+        account = self.api.get_account()
+
+        # Cached portfolio-history equity series, with the drawdown high-water mark, persisted across runs
+        self.equity_history = EquityHistory.load()
+
+        # Initialize self.peak_portfolio_value with the stored high-water mark, or the current cash value when
+        # there is none (first run, or the stored history expired: see EquityHistory.load). A stored mark above
+        # the current value is kept on purpose, so calculate_drawdown sees the drawdown across restarts.
+        mark = self.equity_history.high_water_mark
+        self.peak_portfolio_value = self.equity_history.update_high_water_mark(
+            float(account.cash) if mark is None else mark)
+
+    def refresh_positions(self, force=False):
+        """
+        Load a list_positions snapshot into the portfolio manager when the current one is older than
+        positions_ttl. Fills recorded in between keep the manager's totals current.
+        """
+        if force or self.manager.is_stale(self.positions_ttl):
+            self.manager.sync_positions(self.api.list_positions())
+            if self.stream is not None:
+                self.stream.watch(self.manager.symbols())
+        return self.manager
+
+    @property
+    def crypto_symbols(self):
+        """
+        The configured crypto universe (config.crypto_symbols), less the pairs the asset index no longer
+        lists as tradable. The index only filters; it never adds pairs to what the strategies trade.
+        """
+        tradable = {normalize_symbol(symbol) for symbol in self.assets.crypto_symbols()}
+        return [symbol for symbol in self.config.crypto_symbols if normalize_symbol(symbol) in tradable]
+
+    def update_max_crypto_equity(self):
+        # Get the current buying power of the account
+        account = self.api.get_account()
+        buying_power = float(account.buying_power)
+
+        # Compute max_crypto_equity
+        max_crypto_equity = buying_power * self.config.max_class_equity_pct
+
+        # Update the stored value, persisted in the background
+        self.risk_params['max_crypto_equity'] = max_crypto_equity
+
+        return max_crypto_equity
+
+    def get_commodity_equity(self):
+        equity = float(self.api.get_account().equity)
+        max_commodity_equity = equity * self.config.max_class_equity_pct
+        return max_commodity_equity
+
+
+    def get_crypto_equity(self):
+        equity = float(self.api.get_account().equity)
+        max_crypto_equity = equity * self.config.max_class_equity_pct
+        return max_crypto_equity
+
+
+    def max_commodity_equity(self):
+        equity = float(self.api.get_account().equity)
+        max_equity = equity * self.config.max_class_equity_pct
+        return max_equity
+
+    def max_crypto_equity(self):
+        equity = float(self.api.get_account().equity)
+        max_equity = equity * self.config.max_class_equity_pct
+        return max_equity
+
+    def _daily_closes(self, symbols):
+        def fetch(symbol):
+            data, _ = self.alpha_vantage_crypto.get_digital_currency_daily(symbol=symbol.split('/')[0], market='USD')
+            return symbol, data['4b. close (USD)']
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            historical_data = dict(executor.map(fetch, symbols))
+        return pd.DataFrame(historical_data).sort_index()
+
+    def optimize_portfolio(self, risk_aversion=None, prices=None):
+        """
+        Units of each crypto pair to hold. The covariance comes from the persisted EWMA state, which only
+        needs the daily history fetched once a day; pass live `prices` to re-optimize intraday.
+        """
+        engine = self.covariance.get(self.crypto_symbols)
+        last_complete_bar = pd.Timestamp.utcnow().tz_localize(None).normalize() - pd.Timedelta(days=1)
+        if engine.last_timestamp is None or engine.last_timestamp < last_complete_bar:
+            applied = engine.update_from_closes(self._daily_closes(engine.symbols))
+            log.debug("Applied %d new daily bars to the covariance state", applied)
+            self.covariance.save(engine)
+
+        expected_returns, covariance_matrix = engine.annualized()
+
+        # Total investment amount and how strongly variance is penalised
+        total_investment = float(self.risk_params['max_crypto_equity'])
+        if risk_aversion is None:
+            risk_aversion = float(self.risk_params.get('risk_aversion', 3.0))
+
+        quantities_to_purchase = optimize_portfolio(expected_returns, covariance_matrix, risk_aversion,
+                                                    total_investment,
+                                                    prices=engine.prices() if prices is None else pd.Series(prices),
+                                                    optimizer=self.optimizer)
+
+        return quantities_to_purchase
+
+    def get_daily_returns(self, symbol: str, days: int = 3) -> float:
+        # Find the position for the given symbol
+        position_data = None
+        for position in self.api.list_positions():
+            if position.symbol == symbol:
+                position_data = position
+                break
+
+        if position_data is None:
+            raise ValueError(f"No position found for symbol {symbol}")
+
+        # Get the closing prices for the past `days` days
+        closing_prices = [float(position_data.lastday_price) for _ in range(days)]
+
+        # Calculate the daily returns
+        returns = [np.log(closing_prices[i] / closing_prices[i - 1]) for i in range(1, len(closing_prices))]
+
+        # Return the daily returns
+        return returns
+
+    def rebalance_positions(self):
+        account = self.api.get_account()
+        equity = float(account.equity)
+        positions = self.api.list_positions()
+
+        # Overall portfolio value and separate values for crypto and commodities
+        self.manager.sync_positions(positions)
+        crypto_value = self.manager.crypto_value()
+        commodity_value = self.manager.commodity_value()
+
+        print(f'Total crypto value: {crypto_value}. And total commodity value: {commodity_value}.')
+
+        # Get volatility of each position
+        volatility = {}
+        for position in positions:
+            daily_returns = self.get_daily_returns(position.symbol)
+            volatility[position.symbol] = np.std(daily_returns)
+
+        # Sort positions by descending volatility
+        sorted_positions = sorted(volatility.items(), key=lambda x: x[1], reverse=True)
+
+        if crypto_value > 0.5 * equity or commodity_value > 0.5 * equity:
+            print("Rebalancing positions as crypto or commodity exceeds 50% of equity.")
+
+            current_date = datetime.now().date()
+
+            activities = self.api.get_activities()
+            fill_activities = [activity for activity in activities if
+                               activity.activity_type == 'FILL' and activity.transaction_time.to_pydatetime().date() == current_date]
+
+            for symbol, _ in sorted_positions:
+                position = self.api.get_position(symbol)
+                qty = float(position.qty)
+                current_price = float(position.current_price)
+
+
+                is_crypto = self.assets.is_crypto(symbol)
+                if (is_crypto and crypto_value > 0.5 * equity) or (
+                        not is_crypto and commodity_value > 0.5 * equity):
+
+                    if equity < 25000:
+                        if any(activity.symbol == symbol and activity.side == 'buy' for activity in fill_activities):
+                            print(f"Cannot sell {symbol} as it was bought today and equity is less than 25k.")
+                            continue
+
+                    actual_qty = float(position.qty)
+                    print(f'Actual shares: {actual_qty} for {symbol}.')
+
+                    shares_to_sell = min(actual_qty, int(qty * 0.07))
+
+                    delta = 0.0001
+                    if abs(shares_to_sell - actual_qty) < delta:
+                        shares_to_sell = actual_qty
+
+                    price_floor = 0.001
+                    price_at_which_to_sell = max(price_floor, current_price * 0.9999)
+                    price_at_which_to_sell = round(price_at_which_to_sell, 2)
+
+                    print(f"Trying to sell {shares_to_sell} shares of {symbol} at {price_at_which_to_sell}.")
+
+                    # Fetch open orders for the current symbol
+                    open_orders = self.api.list_orders(status='open', symbols=symbol, side='sell')
+
+                    # Check for any open sell order for the exact same quantity
+                    if any(order.qty == str(shares_to_sell) for order in open_orders):
+                        print(
+                            f"Open sell order already exists for {shares_to_sell} shares of {symbol}. Skipping new order.")
+                        continue
+
+                    try:
+                        if symbol == 'SHIBUSD':
+                            self.api.submit_order(symbol=symbol, qty=shares_to_sell, side='sell', type='market',
+                                                  time_in_force='gtc')
+                        else:
+                            if shares_to_sell > 0:
+                                self.api.submit_order(
+                                    symbol=symbol,
+                                    qty=shares_to_sell,
+                                    side='sell',
+                                    type='limit',
+                                    limit_price=price_at_which_to_sell,
+                                    time_in_force='gtc'
+                                )
+                    except Exception as e:
+                        print(
+                            f"Failed to sell {shares_to_sell} shares of {symbol}. Possible reason: unsettled shares. Error: {e}")
+
+                    time.sleep(1.2)
+
+
+    def get_position(self, symbol):
+        """
+        Get position details for a specific symbol
+        """
+        positions = self.api.list_positions()
+
+        # Filter positions to find matches for the symbol
+        symbol_positions = [p for p in positions if p.symbol == symbol]
+
+        if not symbol_positions:
+            print(f"No positions found for {symbol}")
+            return None
+
+        # Assuming there's only one position per symbol
+        p = symbol_positions[0]
+
+        # Get actual qty and unsettled qty
+        actual_qty = float(p.qty)
+        # This is our hypothetical attribute, replace with the actual one if it exists
+        unsettled_qty = float(p.unsettled_shares) if hasattr(p, 'unsettled_shares') else 0
+
+        pos = {
+            "symbol": p.symbol,
+            "qty": actual_qty,
+            "unsettled_qty": unsettled_qty,  # New field added
+            "avg_entry_price": p.avg_entry_price
+        }
+
+        return pos
+
+
+    @property
+    def total_trades_today(self):
+        return self.ledger.trades_today
+
+    def symbol_lock(self, symbol):
+        """
+        Hold while validating and submitting an order for `symbol`, so two workers never trade it at once.
+        """
+        return self.ledger.symbol_lock(symbol)
+
+    def calculate_position_values(self):
+        # Total value of crypto and commodity positions, from the manager's running totals
+        self.refresh_positions(force=True)
+        self.crypto_value = self.manager.crypto_value()
+        self.commodity_value = self.manager.commodity_value()
+
+    @traced()
+    def validate_trade(self, symbol, qty, order_type):
+        """
+        Check an order against the position, cash, class-equity and daily trade limits, counting the
+        orders other threads have validated but not submitted yet. Returns a Reservation (truthy) that
+        holds the order's cash and exposure until it is committed or released, or False.
+        """
+        if self.total_trades_today >= self.max_trades_per_day:
+            log.info("Hit daily trade limit, rejecting order for %s", symbol)
+            return False
+
+        try:
+            #quantity check to see if we buy delta of suggested shares or do not buy before proceeding
+            manager = self.refresh_positions()
+            current_qty = float(manager.quantity(symbol))
+            qty = float(qty)
+            if qty <= 0:
+                log.info("No increase in position size for %s, rejecting order", symbol)
+                return False
+
+            log.debug("Running validation logic against trade for %s", symbol)
+
+            # Position values from the portfolio manager's running totals
+            crypto_value = manager.crypto_value()
+            commodity_value = manager.commodity_value()
+
+            portfolio_value = manager.portfolio_value()
+            log.debug("Current portfolio value (market value of all positions): $%.2f", portfolio_value)
+
+            # get the current price from the get_current_price method
+            current_price = self.get_current_price(symbol)
+
+            log.debug("Current price for %s is: $%s", symbol, current_price)
+
+            # get the proposed trade value from the new trade being run using current price * qty
+            proposed_trade_value = float(current_price) * qty
+            log.debug("Total $ to purchase new order: $%.2f", proposed_trade_value)
+
+            # current account cash (for crypto spending)
+            account_cash = float(self.api.get_account().cash)
+            log.debug("Current account cash to buy: %s", account_cash)
+
+            if self.assets.is_crypto(symbol):
+                asset_class, class_value, class_cap = 'crypto', crypto_value, self.max_crypto_equity()
+                log.debug("Crypto portfolio value: $%s, max crypto equity: $%s", crypto_value, class_cap)
+            else:
+                asset_class, class_value, class_cap = 'commodity', commodity_value, self.get_commodity_equity()
+                log.debug("Max commodity equity: $%s, commodity value: $%s, proposed trade value: $%s",
+                          class_cap, commodity_value, proposed_trade_value)
+
+            position_qty = float(self.get_position(symbol)['qty']) if order_type == 'sell' else 0.0
+            max_position_size = self.risk_params['max_position_size']
+
+            def check(ledger):
+                # runs under the ledger lock, against what the other threads have reserved
+                if ledger.trades_today >= self.max_trades_per_day:
+                    return "daily trade limit reached"
+                if current_qty + ledger.reserved_qty(symbol, 'buy') + qty > max_position_size:
+                    return "exceeds max position size"
+                if proposed_trade_value + ledger.reserved_cash() > account_cash:
+                    return "exceeds cash available"
+                if float(class_value) + ledger.reserved_value(asset_class) + proposed_trade_value > float(class_cap):
+                    return (f"exceeds max {asset_class} equity limit of "
+                            f"{self.config.max_class_equity_pct * 100:.0f}% of account equity")
+                if order_type == 'sell' and qty + ledger.reserved_qty(symbol, 'sell') > position_qty:
+                    return "sell quantity exceeds position size"
+                return None
+
+            reservation = self.ledger.reserve(symbol, order_type, qty, proposed_trade_value, asset_class, check)
+            return reservation or False
+
+        except Exception as e:
+            log.error("Error validating trade for %s: %s", symbol, e)
+            return False
+
+
+    def monitor_account_status(self):
+        # Monitor and report on account status
+        try:
+            account = self.api.get_account()
+            print(f"Equity: {account.equity}")
+            print(f"Cash: {account.cash}")
+            print(f"Buying Power: {account.buying_power}")
+            return account
+        except Exception as e:
+            print(f"An exception occurred while monitoring account status: {str(e)}")
+            return None
+
+    def monitor_positions(self):
+        # Monitor and report on open positions
+        try:
+            positions = self.api.list_positions()
+            for position in positions:
+                print(
+                    f"Symbol: {position.symbol}, Quantity: {position.qty}, Avg Entry Price: {position.avg_entry_price}")
+            return positions
+        except Exception as e:
+            print(f"An exception occurred while monitoring positions: {str(e)}")
+            return None
+
+
+    def get_crypto_fee(self, volume):
+        if volume < 100_000:
+            return 0.0025
+        elif volume < 500_000:
+            return 0.0022
+        elif volume < 1_000_000:
+            return 0.002
+        elif volume < 10_000_000:
+            return 0.0018
+        elif volume < 25_000_000:
+            return 0.0015
+        elif volume < 50_000_000:
+            return 0.0013
+        elif volume < 100_000_000:
+            return 0.0012
+        else:
+            return 0.001
+
+    def report_profit_and_loss(self):
+        try:
+            # Get account data
+            cash_not_invested = float(self.api.get_account().cash)
+
+            # Calculate PnL based on the cached portfolio history
+            first_equity, last_equity, commissions, pnl_total = self.portfolio_pnl()
+
+            print(f'First equity is: {first_equity}.')
+            print(f'Last equity is: {last_equity}.')
+            print(f'Total commisions were: {commissions}.')
+
+            # find total equity for reporting
+            total_equity = pnl_total + cash_not_invested
+
+            print(
+                f"Total Profit/Loss: ${round(pnl_total,2)}. Total equity (cash invested plus cash not invested): ${round(total_equity,2)}")
+            return pnl_total
+
+        except Exception as e:
+            print(f"An exception occurred while reporting profit and loss: {str(e)}")
+            return 0
+
+    def portfolio_pnl(self):
+        """
+        (first equity, last equity, commissions, pnl) from the cached equity history, which fetches only
+        the new points, at most every refresh_interval.
+        """
+        self.equity_history.refresh(self.api)
+        return self.equity_history.pnl()
+
+    def pnl_total(self):
+        # report_profit_and_loss's figure without the printout; 0 when the history cannot be read
+        try:
+            return self.portfolio_pnl()[3]
+        except Exception as e:
+            log.warning("Could not read portfolio history: %s", e)
+            return 0.0
+
+    def get_equity(self):
+        return float(self.api.get_account().equity)
+
+    def update_risk_parameters(self):
+        # Dynamically adjust risk parameters based on account performance
+        pnl_total = self.report_profit_and_loss()
+        account = self.api.get_account()
+        current_equity = float(account.equity)
+
+        if pnl_total is None:
+            self.risk_params['max_portfolio_size'] = current_equity  # Update the max_portfolio_size with the current equity
+            print("Could not calculate PnL, not updating risk parameters.")
+            return
+
+        pnl_total = float(round(pnl_total, 2))
+        print(f'pnl is accurately: {pnl_total}')
+
+        if pnl_total <= 0:
+            print("PnL is negative...")
+            factor = 0.90  # reduce by 10%
+        else:
+            print("PnL is positive...")
+            factor = 1.0015  # increase by .15%
+
+        def adjust(params):
+            # max_portfolio_size follows the current equity; both limits scale only from a position size of 50
+            values = {'max_portfolio_size': current_equity}
+            if params['max_position_size'] >= 50:
+                values['max_position_size'] = params['max_position_size'] * factor
+                values['max_portfolio_size'] = current_equity * factor
+            return values
+
+        # check and scale in one locked step, so a concurrent update cannot be overwritten
+        if 'max_position_size' in self.risk_params.mutate(adjust):
+            print("Reducing risk parameters..." if factor < 1 else "Increasing risk parameters...")
+        else:
+            print(f"Max position size is less than 50. Not {'reducing' if factor < 1 else 'increasing'} risk parameters.")
+
+        print("Risk parameters updated.")
+        return self.risk_params
+
+    def calculate_drawdown(self):
+        try:
+            portfolio_value = self.refresh_positions(force=True).portfolio_value()
+
+            # Update peak portfolio value if current portfolio value is higher (persisted, so restarts keep it)
+            self.peak_portfolio_value = self.equity_history.update_high_water_mark(portfolio_value)
+
+            # Calculate drawdown if portfolio is not empty
+            if portfolio_value > 0 and self.peak_portfolio_value > 0:
+                drawdown = (self.peak_portfolio_value - portfolio_value) / self.peak_portfolio_value
+            else:
+                drawdown = 0
+
+            return drawdown
+        except Exception as e:
+            print(f"An exception occurred while calculating drawdown: {str(e)}")
+            return None
+
+    def check_risk_before_order(self, symbol, new_shares):
+        """
+        Check the risk parameters before placing an order.
+
+        The function will prevent an order if the new shares would result in a position size
+        that violates the risk parameters.
+        """
+        # Get the current position
+        try:
+            current_position = self.api.get_position(symbol)
+            current_shares = float(current_position.qty)
+        except:
+            current_shares = 0
+
+        # Calculate the new quantity of shares after the purchase
+        total_shares = current_shares + float(new_shares)
+
+        # Check if the new quantity violates the risk parameters
+        if total_shares > self.risk_params['max_position_size']:
+            # If the new quantity violates the max position size, prevent the order
+            return False
+        else:
+            # If the new quantity doesn't violate the risk parameters, adjust the quantity and place the order
+            delta_shares = self.risk_params['max_position_size'] - current_shares
+
+            if delta_shares > 0:
+                # Get the average entry price
+                avg_entry_price = self.get_avg_entry_price(symbol)
+
+                if avg_entry_price is not None and avg_entry_price != 0:
+                    # Calculate the adjusted quantity based on the average entry price
+                    adjusted_quantity = int(delta_shares / avg_entry_price)
+
+                    # Place the order with the adjusted quantity
+                    self.api.submit_order(
+                        symbol=symbol,
+                        qty=adjusted_quantity,
+                        side='buy',
+                        type='limit',
+                        time_in_force='gtc',
+                        limit_price=avg_entry_price
+                    )
+
+            return True
+
+    @traced()
+    def check_momentum(self, symbol, momentum_signal):
+        """
+        Checks the momentum signal and decides whether to sell the entire position.
+        """
+        # Get position
+        position_list = [position for position in self.api.list_positions() if position.symbol == symbol]
+
+        if len(position_list) == 0:
+            print(f"No position exists for {symbol}.")
+            return
+
+        position = position_list[0]
+
+        # If momentum signal is 'Sell' and the percentage change is negative, sell the entire position
+        if momentum_signal == "Sell" and float(position.unrealized_plpc) < 0:
+            qty = position.qty
+            reservation = self.validate_trade(symbol, qty, "sell")
+            if reservation:
+                with reservation:  # committed once submitted, released if the submit raises
+                    # Place a market sell order
+                    self.api.submit_order(
+                        symbol=symbol,
+                        qty=qty,
+                        side='sell',
+                        type='market',
+                        time_in_force='gtc'
+                    )
+                print(f"Selling the entire position of {symbol} due to negative momentum.")
+
+    def get_momentum_at_time(self, symbol, datetime):
+        """
+        Given a symbol and a datetime, this function calculates the momentum
+        at that specific time.
+        """
+        # Check if symbol includes a '/'
+        if '/' in symbol:
+            # Split the symbol into crypto_symbol and market
+            crypto_symbol, market = symbol.split('/')
+
+            # If the market is 'USD', we assume it's a cryptocurrency
+            if market == 'USD':
+                data, meta_data = self.alpha_vantage_crypto.get_digital_currency_daily(symbol=crypto_symbol,
+                                                                                       market=market)
+        else:
+            # If the symbol does not include a '/', we assume it's a commodity
+            data, meta_data = self.alpha_vantage_ts.get_daily(symbol=symbol)
+
+        # Calculate momentum
+        print(data.info())
+        close_data = data['4a. close (USD)']
+        momentum = close_data.pct_change().rolling(window=5).mean()
+
+        # Check if the date exists in the momentum DataFrame
+        try:
+            print(f"Accessing momentum for date: {datetime.date()}")
+            return momentum.loc[datetime.date()].iloc[0]
+        except KeyError:
+            # If the date doesn't exist, find the nearest date's momentum
+            try:
+                print("Date not found. Attempting to find nearest date.")
+                nearest_date = momentum.index[momentum.index.get_loc(datetime.date(), method='nearest')]
+                print(f"Nearest date found: {nearest_date}")
+                return momentum.loc[nearest_date].iloc[0]
+            except Exception as e:
+                print(f"Failed to find nearest date. Exception: {e}")
+                print("Momentum index:")
+                print(momentum.index)
+                return None  # or some appropriate fallback value
+
+    @traced()
+    def calculate_quantity(self, symbol):
+        """
+        Calculates the quantity to purchase based on available equity and current price.
+        """
+        # Get account info
+        account = self.api.get_account()
+        available_cash = float(account.cash)
+
+        # Read max_crypto_equity from the in-memory risk params
+        max_crypto_equity = float(self.risk_params['max_crypto_equity'])
+
+        # Calculate the current total investment in cryptocurrencies
+        total_investment = self.pnl_total() - available_cash
+
+        # If total investment is already at or exceeds max_crypto_equity, return quantity 0
+        if total_investment >= max_crypto_equity:
+            log.info("Total investment in cryptocurrencies is already at or exceeds the maximum permitted. "
+                     "Returning quantity 0 for %s.", symbol)
+            return 0
+
+        # Calculate allowable investment as max_crypto_equity minus total investment
+        allowable_investment = max_crypto_equity - total_investment
+
+        # Determine investable amount
+        investable_amount = min(available_cash, allowable_investment)
+
+        # Check if investable amount is less than 1
+        if investable_amount < 1:
+            log.info("Investable amount for %s is less than 1. Returning quantity 0.", symbol)
+            return 0
+
+        # Use the current price
+        current_price = self.get_current_price(symbol)
+
+        if current_price == 0 or current_price is None:
+            return 0
+
+        # Quantity for the investable amount, scaled by price tier (sizing.PRICE_TIERS): less of high-priced assets
+        quantity = float(sizing.tier_quantities([current_price], investable_amount)[0])
+
+        log.debug("Calculated quantity for %s: %s", symbol, quantity)
+        return quantity
+
+    def account_snapshot(self):
+        """
+        Cash, equity and portfolio-history PnL from one get_account and the cached equity history.
+        """
+        account = self.api.get_account()
+        return sizing.AccountSnapshot(float(account.cash), float(account.equity), self.pnl_total())
+
+    @traced()
+    def plan_buys(self, symbols, quantities=None, scores=None, trim='proportional'):
+        """
+        Size and validate a cycle's buy candidates together (see sizing.plan_buys) and reserve the approved
+        orders. Without `quantities` they are sized like calculate_quantity. The class caps, cash, position
+        size and daily trade limit are checked against all candidates jointly, with what other threads have
+        reserved, from one account snapshot, one positions snapshot and one batch price request. Returns
+        [(PlannedOrder, Reservation)], best-ranked first; commit or release each reservation.
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return []
+        snapshot = self.account_snapshot()
+        manager = self.refresh_positions()
+        prices = self.prefetch_prices(symbols)
+        price_array = np.array([prices.get(s) or np.nan for s in symbols], dtype=float)
+        classes = ['crypto' if self.assets.is_crypto(s) else 'commodity' for s in symbols]
+        held = [float(manager.quantity(s)) for s in symbols]
+        investable = sizing.investable_amount(snapshot, float(self.risk_params['max_crypto_equity']))
+        class_cap = snapshot.equity * self.config.max_class_equity_pct
+        class_values = {'crypto': manager.crypto_value(), 'commodity': manager.commodity_value()}
+
+        def plan(ledger):
+            # runs under the ledger lock, so the headroom accounts for every other thread's reservations
+            orders = sizing.plan_buys(
+                symbols, price_array, classes, held,
+                reserved_qty=[ledger.reserved_qty(s, 'buy') for s in symbols],
+                max_position_size=float(self.risk_params['max_position_size']),
+                class_room={c: class_cap - class_values[c] - ledger.reserved_value(c) for c in class_values},
+                cash_room=snapshot.cash - ledger.reserved_cash(),
+                trades_left=self.max_trades_per_day - ledger.trades_today,
+                quantities=quantities, investable=investable, scores=scores, method=trim)
+            planned.extend(orders)
+            return [(o.symbol, 'buy', o.qty, o.value, o.asset_class) for o in orders]
+
+        planned = []
+        reservations = self.ledger.reserve_batch(plan)
+        trimmed = sum(1 for o in planned if o.qty < o.requested_qty)
+        log.info("Planned %d of %d buy candidates (%d trimmed), $%.2f of $%.2f cash",
+                 len(planned), len(symbols), trimmed, sum(o.value for o in planned), snapshot.cash)
+        return list(zip(planned, reservations))
+
+    def execute_profit_taking(self, symbol, pct_gain=0.05):
+        """
+        Executes a profit-taking strategy.
+        If the profit for a specific crypto reaches a certain percentage, sell enough shares to realize the profit.
+        """
+        position_list = [position for position in self.api.list_positions() if position.symbol == symbol]
+
+        if len(position_list) == 0:
+            print(f"No position exists for {symbol}.")
+            return
+
+        position = position_list[0]
+
+        # If the unrealized profit percentage is greater than the specified percentage, sell a portion of the position
+        if float(position.unrealized_plpc) > pct_gain:
+            qty = int(float(position.qty) * pct_gain)  # Selling enough shares to realize the 5% gain
+
+            reservation = self.validate_trade(symbol, qty, "sell")
+            if reservation:
+                with reservation:  # committed once submitted, released if the submit raises
+                    self.api.submit_order(
+                        symbol=symbol,
+                        qty=qty,
+                        side='sell',
+                        type='market',
+                        time_in_force='gtc'
+                    )
+                print(f"Selling {qty} shares of {symbol} to realize profit.")
+
+    def execute_stop_loss(self, symbol, pct_loss=0.07):
+        """
+        Executes a stop-loss strategy.
+        If the loss for a specific crypto reaches a certain percentage, sell the entire position.
+        """
+        position_list = [position for position in self.api.list_positions() if position.symbol == symbol]
+
+        if len(position_list) == 0:
+            print(f"No position exists for {symbol}.")
+            return
+
+        position = position_list[0]
+
+        # If the unrealized loss percentage is greater than the specified percentage, sell the entire position
+        unrealized_loss_pct = float(position.unrealized_plpc)
+        if unrealized_loss_pct < -pct_loss:
+            print(f"Unrealized loss for {symbol} exceeds {pct_loss}%: {unrealized_loss_pct}%")
+            qty = position.qty
+
+            reservation = self.validate_trade(symbol, qty, "sell")
+            if reservation:
+                with reservation:  # committed once submitted, released if the submit raises
+                    self.api.submit_order(
+                        symbol=symbol,
+                        qty=qty,
+                        side='sell',
+                        type='market',
+                        time_in_force='gtc'
+                    )
+                print(f"Selling the entire position of {symbol} due to stop loss.")
+
+    def enforce_diversification(self, symbol, max_pct_portfolio=0.30):
+        """
+        Enforces diversification by ensuring that no crypto makes up more than a certain percentage of the portfolio.
+        """
+        manager = self.refresh_positions()
+        portfolio_value = manager.portfolio_value()
+
+        if manager.quantity(symbol) <= 0:
+            print(f"No position exists for {symbol}.")
+            return
+
+        position_value = manager.asset_value(symbol)
+
+        # If the value of this position exceeds the maximum percentage of the portfolio, sell enough shares to get below the maximum
+        if position_value / portfolio_value > max_pct_portfolio:
+            excess_value = position_value - (portfolio_value * max_pct_portfolio)
+            qty_to_sell = int(excess_value / manager.price(symbol))
+
+            reservation = self.validate_trade(symbol, qty_to_sell, "sell")
+            if reservation:
+                with reservation:  # committed once submitted, released if the submit raises
+                    self.api.submit_order(
+                        symbol=symbol,
+                        qty=qty_to_sell,
+                        side='sell',
+                        type='market',
+                        time_in_force='gtc'
+                    )
+                print(f"Selling {qty_to_sell} shares of {symbol} to maintain diversification.")
+
+    def generate_momentum_signal(self, symbol):
+        """
+        Generate a momentum signal for the given symbol.
+
+        Returns "Buy" if the symbol has increased in value by 5% or more since purchase,
+        and "Sell" if it has decreased by 7% or more. Otherwise, returns "Hold".
+        """
+        # Get the purchase price for this stock
+        # TODO: Replace this with your own logic
+        purchase_price = self.get_purchase_price(symbol)
+
+        # Get the current price for this stock
+        current_price = get_avg_entry_price(self, symbol)
+
+        # Calculate the percentage change since purchase
+        pct_change = (current_price - purchase_price) / purchase_price * 100
+
+        # Generate the momentum signal
+        if pct_change >= 5:
+            return "Buy"
+        elif pct_change <= -7:
+            return "Sell"
+        else:
+            return "Hold"
+
+    def get_exchange_rate(base_currency, quote_currency):
+        # Your Alpha Vantage API key
+        api_key = ALPHA_VANTAGE_API
+
+        # Prepare the URL
+        url = f"https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={base_currency}&to_currency={quote_currency}&apikey={api_key}"
+
+        # Send GET request
+        response = requests.get(url)
+
+        # Parse JSON response
+        data = json.loads(response.text)
+
+        # Extract exchange rate
+        exchange_rate = data["Realtime Currency Exchange Rate"]["5. Exchange Rate"]
+
+        return float(exchange_rate)
+
+    def get_purchase_price(self, symbol):
+        """
+        Retrieve the purchase price of the given symbol.
+        """
+        trades = download_trades()
+
+        # Filter trades for the given symbol
+        trades = [trade for trade in trades if trade[0] == symbol]
+
+        if not trades:
+            return None
+
+        # Get the last trade for the symbol
+        last_trade = trades[-1]
+
+        # The price is the third element in the trade
+        return float(last_trade[2])
+
+    @traced()
+    def get_avg_entry_price(self, symbol):
+        try:
+            position = self.api.get_position(symbol)
+            avg_entry_price = float(position.avg_entry_price)
+            print(f"For symbol {symbol}, average entry price is {avg_entry_price}.")
+            return avg_entry_price
+        except Exception as e:
+            print(f"No position in {symbol} to calculate average entry price. Error: {str(e)}")
+            return 0
+
+    def prefetch_prices(self, symbols):
+        """
+        Price a whole cycle's symbols in one or two batch requests; later get_current_price calls hit the cache.
+        When streaming, the symbols are added to the subscription first.
+        """
+        symbols = list(symbols)
+        if self.stream is not None:
+            added = self.stream.watch(symbols)
+            if added:
+                self.stream.wait_for(added, self.stream_warmup)
+        return self.quotes.prices(symbols)
+
+    @traced()
+    def get_current_price(self, symbol):
+        return self.quotes.price(symbol)
+
+    def _lookup_price(self, symbol):
+        # per-symbol fallback for symbols the batch quote request could not price
+        try:
+            # Attempt to fetch price from Alpha Vantage
+            url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={ALPHA_VANTAGE_API}"
+            response = requests.get(url)
+            data = response.json()
+
+            last_update = list(data['Time Series (Daily)'].keys())[0]
+            current_price_str = data['Time Series (Daily)'][last_update]['4. close']
+            current_price = float(current_price_str)
+
+            log.debug("Current price for %s is %s at %s", symbol, current_price, last_update)
+            return current_price
+        except Exception as e:
+            log.debug("Cannot find %s in Alpha Vantage: %s", symbol, e)
+
+        # If Alpha Vantage fails, attempt to fetch price from Alpaca
+        if self.assets.is_crypto(symbol):
+            suffix = self.config.crypto_quote_suffix
+            crypto, sort = symbol[:-len(suffix)].rstrip('/'), suffix
+            alpaca_symbol = f"{crypto}/{sort}"
+
+            try:
+                log.debug("Fetching price from Alpaca API for %s", symbol)
+                url = f"{self.config.data_url}/v1beta3/crypto/us/latest/bars?symbols={alpaca_symbol}"
+                headers = {"accept": "application/json"}
+                response = requests.get(url, headers=headers)
+
+                if response.status_code != 200:
+                    log.warning("Connection failure %s from Alpaca. Status code: %s", symbol, response.status_code)
+                    return None
+
+                crypto_data = response.json()
+                current_price = float(crypto_data['bars'][alpaca_symbol]['c'])
+
+                log.debug("Current price for %s is %s", symbol, current_price)
+                return current_price
+            except Exception as e:
+                log.warning("Failed to get current price from Alpaca or Alpha Vantage for %s. Error: %s", symbol, e)
+                return 0
+
+def get_alpha_vantage_data(base_currency, quote_currency):
+    url = f"https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={base_currency}&to_currency={quote_currency}&apikey={ALPHA_VANTAGE_API}"
+
+    response = requests.get(url)
+    data = response.json()
+
+    if "Realtime Currency Exchange Rate" in data:
+        # Get the exchange rate
+        exchange_rate = data["Realtime Currency Exchange Rate"]["5. Exchange Rate"]
+        return exchange_rate
+    else:
+        print("Error getting data from Alpha Vantage")
+        return None
+
+def get_profit_loss(positions):
+    profit_loss = 0
+    for position in positions:
+        profit_loss += (position['current_price'] - position['avg_entry_price']) * float(position['quantity'])
+    return profit_loss
+
+
+
+facts = []
+
+
+def main():
+    """
+    Account check run: monitor the account and positions, adjust the risk parameters, rebalance and post
+    an account summary to Teams.
+    """
+    api = get_api()
+    risk_manager = RiskManagement(api, get_risk_params())
+
+    risk_manager.monitor_account_status()
+    risk_manager.monitor_positions()
+    risk_manager.report_profit_and_loss()
+    account = risk_manager.api.get_account()
+    current_equity = float(account.equity)
+    risk_manager.update_risk_parameters()
+
+    risk_manager.rebalance_positions()
+
+    account = risk_manager.api.get_account()
+    portfolio = risk_manager.api.list_positions()
+
+    commodity_equity = risk_manager.get_commodity_equity()
+    crypto_equity = risk_manager.get_crypto_equity()
+    max_commodity_equity = risk_manager.max_commodity_equity()
+
+    print(f"Total Allowed Commodity Equity: {commodity_equity}")
+    print(f"Total Allowed Crypto Equity: {crypto_equity}")
+
+    portfolio_summary = {}
+    portfolio_summary['equity'] = float(account.equity)
+    portfolio_summary['cash'] = float(account.cash)
+    portfolio_summary['buying_power'] = float(account.buying_power)
+    portfolio_summary['positions'] = []
+
+    # one batch quote request for every position instead of a lookup per symbol
+    latest_prices = risk_manager.prefetch_prices([position.symbol for position in portfolio])
+
+    for position in portfolio:
+        symbol = position.symbol
+        average_entry_price = float(position.avg_entry_price)
+
+        # Check if average entry price is zero and skip to the next iteration if so
+        if average_entry_price == 0:
+            print(f"Warning: Average Entry Price for {symbol} is zero. Skipping this symbol.")
+            continue
+
+        current_price = float(latest_prices.get(symbol) or 0)
+
+        profitability = (current_price - float(position.avg_entry_price)) / float(position.avg_entry_price) * 100
+
+        print(
+            f"Symbol: {symbol}, Average Entry Price: {average_entry_price}, Current Price: {current_price}, "
+            f"Profitability: {profitability}%")
+
+        pos_details = {
+            'symbol': symbol,
+            'avg_entry_price': average_entry_price,
+            'current_price': current_price,
+            'profitability': profitability,
+            'quantity': round(float(position.qty), 2)
+        }
+
+        portfolio_summary['positions'].append(pos_details)
+
+        if profitability <= -0.07:
+            # Sell the position
+            pass
+
+        elif profitability >= 0.05:
+            # Place buy orders to take profit
+            pass
+
+    portfolio_summary['equity'] = round(float(account.equity), 2)
+    portfolio_summary['cash'] = round(float(account.cash), 2)
+    portfolio_summary['buying_power'] = round(float(account.buying_power), 2)
+    portfolio_summary['profit_loss'] = round(get_profit_loss(portfolio_summary['positions']), 2)
+    portfolio_summary['risk_parameters_updated'] = True if portfolio_summary['profit_loss'] > 0 else False
+
+    message = {
+        "@type": "MessageCard",
+        "@context": "http://schema.org/extensions",
+        "themeColor": "0076D7",
+        "summary": "Account Summary",
+        "sections": [{
+            "activityTitle": "Account Summary Report",
+            "activitySubtitle": "",
+            "facts": []
+        }]
+    }
+
+    facts = message["sections"][0]["facts"]
+
+    for position in portfolio_summary['positions']:
+        facts.append({
+            'name': position['symbol'],
+            'value': f"Average Entry Price: ${position['avg_entry_price']}, Current Price: ${position['current_price']}, Profitability: ${position['profitability']}%, Quantity: {position['quantity']}"
+        })
+
+    facts.append({'name': 'Equity', 'value': round(portfolio_summary['equity'], 2)})
+    facts.append({'name': 'Cash', 'value': round(portfolio_summary['cash'], 2)})
+    facts.append({'name': 'Buying Power', 'value': round(portfolio_summary['buying_power'], 2)})
+    facts.append({'name': 'Profit/Loss', 'value': round(portfolio_summary['profit_loss'], 2)})
+    facts.append({'name': 'Risk Parameters Updated', 'value': portfolio_summary['risk_parameters_updated']})
+
+    teams_url = 'https://data874.webhook.office.com/webhookb2/9cb96ee7-c2ce-44bc-b4fe-fe2f6f308909@4f84582a-9476-452e-a8e6-0b57779f244f/IncomingWebhook/7e8bd751e7b4457aba27a1fddc7e8d9f/6d2e1385-bdb7-4890-8bc5-f148052c9ef5'
+
+    send_teams_message(teams_url, message)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Incremental mean-reversion (Bollinger) and momentum signals for the crypto pairs.
+
+RollingSignals keeps the last max(window, period + 1) closes of one pair in a ring buffer, together with
+running sums of the closes in the window. A new bar updates the mean, standard deviation, band signals and
+momentum in O(1), however long the window or the history is. The values match crypto.apply_strategies:
+a `window`-bar rolling mean and sample std, Buy below mean - k * std, Sell above mean + k * std, and
+momentum = close - close `period` bars ago.
+
+The state depends only on the last few closes, so warm_up() from history replays just that tail.
+SignalEngine holds one RollingSignals per pair and persists the tails (and the last bar time) in the
+state directory, so the next run only applies the bars it has not seen:
+
+    engine = SignalEngine.load()
+    rows, signals = engine.apply('BTC/USD', frame['Date'], frame['Close'])
+    engine.save()
+"""
+import json
+import math
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .config import get_config
+
+WINDOW = 20
+STD_DEV_FACTOR = 1
+PERIOD = 14
+RESYNC_EVERY = 1000  # bars between exact recomputations of the running sums
+
+Signals = namedtuple('Signals', ['mean', 'std', 'buy', 'sell', 'mean_reversion', 'momentum', 'momentum_signal'])
+
+
+def _direction(value):
+    if value > 0:
+        return 'Buy'
+    if value < 0:
+        return 'Sell'
+    return 'Hold'
+
+
+class RollingSignals:
+    def __init__(self, window=WINDOW, period=PERIOD, std_dev_factor=STD_DEV_FACTOR):
+        self.window = window
+        self.period = period
+        self.std_dev_factor = std_dev_factor
+        self.size = max(window, period + 1)
+        self.reset()
+
+    def reset(self):
+        self.closes = np.full(self.size, np.nan)
+        self.count = 0
+        self.last_timestamp = None
+        self.last = None
+        # sums of (close - shift) over the window; the shift keeps the variance free of cancellation
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._since_resync = 0
+
+    def _back(self, bars):
+        # close `bars` bars before the latest one
+        return self.closes[(self.count - 1 - bars) % self.size]
+
+    def update(self, close, timestamp=None):
+        """
+        Apply one bar and return its Signals.
+        """
+        close = float(close)
+        if self.count == 0:
+            self._shift = close
+        # read what leaves the window (and the momentum reference) before the slot is overwritten
+        leaving = self._back(self.window - 1) if self.count >= self.window else None
+        reference = self._back(self.period - 1) if self.count >= self.period else None
+
+        x = close - self._shift
+        self._sum += x
+        self._sum_sq += x * x
+        if leaving is not None:
+            y = leaving - self._shift
+            self._sum -= y
+            self._sum_sq -= y * y
+        self.closes[self.count % self.size] = close
+        self.count += 1
+        if timestamp is not None:
+            self.last_timestamp = pd.Timestamp(timestamp)
+
+        self._since_resync += 1
+        if self._since_resync >= RESYNC_EVERY:
+            self._resync()
+
+        if self.count >= self.window:
+            n = self.window
+            mean = self._shift + self._sum / n
+            variance = (self._sum_sq - self._sum * self._sum / n) / (n - 1)
+            std = math.sqrt(variance) if variance > 0 else 0.0
+            band = self.std_dev_factor * std
+            buy, sell = close < mean - band, close > mean + band
+        else:
+            mean = std = math.nan
+            buy = sell = False
+        momentum = close - reference if reference is not None else math.nan
+
+        self.last = Signals(mean, std, buy, sell, 'Buy' if buy else 'Sell' if sell else 'Hold',
+                            momentum, _direction(momentum))
+        return self.last
+
+    def _resync(self):
+        # recompute the running sums exactly, re-centred on the current mean, to stop rounding drift
+        n = min(self.count, self.window)
+        values = np.array([self._back(i) for i in range(n)])
+        self._shift = float(values.mean())
+        centred = values - self._shift
+        self._sum = float(centred.sum())
+        self._sum_sq = float((centred * centred).sum())
+        self._since_resync = 0
+
+    def warm_up(self, closes, timestamps=None):
+        """
+        Reset and replay history; only the last `size` bars affect the state, so only those are applied.
+        """
+        self.reset()
+        closes = np.asarray(closes, dtype=float)[-self.size:]
+        if timestamps is not None:
+            timestamps = list(timestamps)[-self.size:]
+        for i, close in enumerate(closes):
+            self.update(close, timestamps[i] if timestamps is not None else None)
+        return self.last
+
+    def tail(self):
+        # the buffered closes, oldest first
+        n = min(self.count, self.size)
+        return [float(self._back(i)) for i in reversed(range(n))]
+
+
+class SignalEngine:
+    """
+    RollingSignals per pair, persisted as JSON (the closes tail and last bar time per pair).
+    """
+
+    def __init__(self, path=None, window=WINDOW, period=PERIOD, std_dev_factor=STD_DEV_FACTOR):
+        self.path = path or os.path.join(get_config().get_state_dir(), 'crypto_signals.json')
+        self.window = window
+        self.period = period
+        self.std_dev_factor = std_dev_factor
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def state(self, pair):
+        with self._lock:
+            state = self._states.get(pair)
+            if state is None:
+                state = self._states[pair] = RollingSignals(self.window, self.period, self.std_dev_factor)
+            return state
+
+    def update(self, pair, close, timestamp=None):
+        return self.state(pair).update(close, timestamp)
+
+    def apply(self, pair, timestamps, closes):
+        """
+        Apply the bars of a pair's history (oldest first) that are newer than the last one seen.
+
+        Returns (row positions, Signals per position). When the stored state does not reach the start of
+        the history (first run, or a gap) the state is warmed up from the history instead. When the bar at
+        the last timestamp seen has a different close now (it was still forming), its update is rolled
+        back and it is applied again. When there is nothing new, the latest bar's signals are returned again.
+        """
+        timestamps = pd.to_datetime(pd.Series(timestamps)).reset_index(drop=True)
+        closes = np.asarray(closes, dtype=float)
+        state = self.state(pair)
+        if not len(closes):
+            return [], []
+
+        if state.last_timestamp is None or state.last_timestamp < timestamps.iloc[0]:
+            start = max(0, len(closes) - state.size)
+            state.warm_up(closes[:start], timestamps[:start])
+        else:
+            start = int(timestamps.searchsorted(state.last_timestamp, side='right'))
+            revised = start - 1
+            if (revised >= 0 and timestamps.iloc[revised] == state.last_timestamp
+                    and closes[revised] != state.tail()[-1]):
+                # the bar at last_timestamp was still forming when it was applied and has changed since:
+                # replay the stored tail without it, then apply the revised bar with the newer ones
+                state.warm_up(state.tail()[:-1])
+                start = revised
+            elif start == len(closes):
+                last = len(closes) - 1
+                if timestamps.iloc[last] == state.last_timestamp and state.last is not None:
+                    return [last], [state.last]
+                return [], []
+
+        rows = list(range(start, len(closes)))
+        return rows, [state.update(closes[i], timestamps.iloc[i]) for i in rows]
+
+    def to_dict(self):
+        with self._lock:
+            states = dict(self._states)
+        return {
+            'params': {'window': self.window, 'period': self.period, 'std_dev_factor': self.std_dev_factor},
+            'pairs': {pair: {'closes': state.tail(),
+                             'last_timestamp': state.last_timestamp.isoformat() if state.last_timestamp is not None else None}
+                      for pair, state in states.items() if state.count},
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path=None, window=WINDOW, period=PERIOD, std_dev_factor=STD_DEV_FACTOR):
+        """
+        The engine saved at `path`; starts empty when there is none or it was saved with other parameters.
+        """
+        engine = cls(path, window, period, std_dev_factor)
+        try:
+            with open(engine.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return engine
+        if saved.get('params') != {'window': window, 'period': period, 'std_dev_factor': std_dev_factor}:
+            return engine
+        for pair, entry in saved.get('pairs', {}).items():
+            state = engine.state(pair)
+            state.warm_up(entry['closes'])
+            if entry.get('last_timestamp'):
+                state.last_timestamp = pd.Timestamp(entry['last_timestamp'])
+        return engine
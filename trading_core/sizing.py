@@ -0,0 +1,117 @@
+"""
+Order sizing and joint limit checks for all of a cycle's candidate orders at once.
+
+tier_quantities() is calculate_quantity's price-tier sizing over an array of prices (np.select over the
+tiers). plan_buys() then applies the limits to the candidates together instead of one at a time:
+
+    1. max_position_size per symbol (less what is held and already reserved)
+    2. the class caps: each class's candidates share the cap's headroom
+    3. the cash the account has left, shared by all candidates
+    4. the daily trade limit
+
+When candidates need more than a limit leaves, they are trimmed, either proportionally (every order in the
+group scaled by the same factor) or by rank (the best-scored orders are filled first). Orders worth less
+than min_value after trimming are dropped. Everything is computed from one AccountSnapshot.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+AccountSnapshot = namedtuple('AccountSnapshot', ['cash', 'equity', 'pnl_total'])
+PlannedOrder = namedtuple('PlannedOrder', ['symbol', 'qty', 'price', 'value', 'asset_class', 'requested_qty'])
+
+# (lower bound exclusive, upper bound inclusive, multiplier); prices outside every tier buy the full amount
+PRICE_TIERS = [
+    (4001, np.inf, 0.01),  # high-priced assets like BTC
+    (3001, 4000, 0.0354),
+    (1000, 3000, 0.0334),
+    (201, 999, 0.04534),
+    (20, 200, 0.09434),
+    (-0.000714, 20.00, 0.031434),
+]
+MIN_VALUE = 1.0
+
+
+def tier_multipliers(prices):
+    prices = np.asarray(prices, dtype=float)
+    conditions = [(prices > low) & (prices <= high) for low, high, _ in PRICE_TIERS]
+    return np.select(conditions, [multiplier for _, _, multiplier in PRICE_TIERS], default=1.0)
+
+
+def tier_quantities(prices, investable):
+    """
+    Quantity per price for `investable` dollars: investable / price scaled by the price's tier, rounded
+    to 5 places. Missing or zero prices get 0.
+    """
+    prices = np.asarray(prices, dtype=float)
+    valid = np.isfinite(prices) & (prices != 0)
+    safe = np.where(valid, prices, 1.0)
+    return np.round(np.where(valid, investable / safe * tier_multipliers(safe), 0.0), 5)
+
+
+def investable_amount(snapshot, max_crypto_equity):
+    # calculate_quantity's budget: cash, capped by what max_crypto_equity leaves after the current investment
+    total_investment = snapshot.pnl_total - snapshot.cash
+    if total_investment >= max_crypto_equity:
+        return 0.0
+    return min(snapshot.cash, max_crypto_equity - total_investment)
+
+
+def trim(values, groups, headroom, method='proportional', rank=None):
+    """
+    Fraction (0..1) of each value that fits, when the values of each group may sum to at most
+    headroom[group]. By rank, lower `rank` values are filled first.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    fraction = np.ones(len(values))
+    for group in np.unique(groups):
+        members = np.flatnonzero(groups == group)
+        room = max(float(headroom[group]), 0.0)
+        total = values[members].sum()
+        if total <= room:
+            continue
+        if method == 'proportional':
+            fraction[members] = room / total
+        elif method == 'rank':
+            ordered = members[np.argsort(rank[members], kind='stable')] if rank is not None else members
+            before = np.cumsum(values[ordered]) - values[ordered]
+            filled = np.clip(room - before, 0.0, values[ordered])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction[ordered] = np.where(values[ordered] > 0, filled / values[ordered], 0.0)
+        else:
+            raise ValueError(f"Unknown trim method: {method}")
+    return fraction
+
+
+def plan_buys(symbols, prices, asset_classes, held, reserved_qty, max_position_size, class_room, cash_room,
+              trades_left, quantities=None, investable=0.0, scores=None, method='proportional',
+              min_value=MIN_VALUE):
+    """
+    Size and jointly limit buy candidates. Arrays are aligned with `symbols`; `class_room` maps an asset
+    class to the value it can still take, `cash_room` is the cash left. Without `quantities` the orders
+    are sized with tier_quantities(prices, investable). Higher `scores` rank first (candidate order
+    otherwise). Returns the PlannedOrders that survive, best-ranked first.
+    """
+    prices = np.asarray(prices, dtype=float)
+    n = len(prices)
+    requested = tier_quantities(prices, investable) if quantities is None else np.asarray(quantities, dtype=float)
+    rank = -np.asarray(scores, dtype=float) if scores is not None else np.arange(n, dtype=float)
+    valid = np.isfinite(prices) & (prices > 0)
+
+    # 1. position size, counting what is held and what other orders have reserved
+    position_room = np.maximum(max_position_size - np.asarray(held, dtype=float) - np.asarray(reserved_qty, dtype=float), 0.0)
+    qty = np.where(valid, np.minimum(requested, position_room), 0.0)
+
+    # 2. class caps, 3. cash
+    asset_classes = np.asarray(asset_classes)
+    qty *= trim(qty * prices, asset_classes, class_room, method, rank)
+    qty *= trim(qty * prices, np.zeros(n, dtype=int), {0: cash_room}, method, rank)
+    qty = np.floor(qty * 1e5) / 1e5  # round down so the trimmed orders stay inside the limits
+    value = qty * prices
+
+    # 4. the trades left today go to the best-ranked orders; dust is dropped
+    keep = np.flatnonzero(valid & (qty > 0) & (value >= min_value))
+    keep = keep[np.argsort(rank[keep], kind='stable')][:max(trades_left, 0)]
+    return [PlannedOrder(symbols[i], float(qty[i]), float(prices[i]), float(value[i]), str(asset_classes[i]),
+                         float(requested[i])) for i in keep]
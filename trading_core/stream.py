@@ -0,0 +1,169 @@
+"""
+Streaming market data: a websocket subscription feeding an in-memory last-price book.
+
+MarketStream subscribes to Alpaca's bar and quote streams (stocks and crypto) for the symbols it is
+asked to watch and writes every update into a PriceBook. Price lookups then read the book instead of
+making an HTTP call. The book has a single writer (the stream's event-loop thread) and many readers. An
+update replaces one immutable BookEntry in a dict, which is atomic under the GIL, so readers take no lock.
+
+Entries older than `stale_after` seconds are ignored by the readers, which then fall back to REST. A dropped
+connection therefore degrades to the old polling behaviour instead of serving old prices.
+
+Enabled with configure(streaming=True) or TRADING_STREAM=1. configure(data_stream_url=...) points the client
+at another host, e.g. stream_sim.LocalMarketStream in benchmarks.
+"""
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+from alpaca_trade_api.stream import CryptoDataStream, DataStream
+from credentials import ALPACA_API_KEY, ALPACA_SECRET_KEY
+
+from .assets import get_asset_index, normalize_symbol, pair_symbol
+from .config import get_config
+from .logs import get_logger
+
+log = get_logger('stream')
+
+BookEntry = namedtuple('BookEntry', ['price', 'bar', 'updated_at'])
+
+
+class PriceBook:
+    """
+    Last price and last bar per symbol, keyed like assets.normalize_symbol (BTC/USD and BTCUSD are one entry).
+    """
+
+    def __init__(self, stale_after=None):
+        self.stale_after = stale_after if stale_after is not None else get_config().stream_stale_after
+        self.updates = 0
+        self._entries = {}
+
+    def update_bar(self, symbol, bar):
+        key = normalize_symbol(symbol)
+        self._entries[key] = BookEntry(float(bar.close), bar, time.monotonic())
+        self.updates += 1
+
+    def update_quote(self, symbol, bid, ask):
+        if not bid or not ask or bid <= 0 or ask <= 0:
+            return
+        key = normalize_symbol(symbol)
+        previous = self._entries.get(key)
+        self._entries[key] = BookEntry((bid + ask) / 2.0, previous.bar if previous else None, time.monotonic())
+        self.updates += 1
+
+    def entry(self, symbol, max_age=None):
+        """
+        The symbol's entry, or None when there is none younger than max_age (default: stale_after).
+        """
+        entry = self._entries.get(normalize_symbol(symbol))
+        max_age = self.stale_after if max_age is None else max_age
+        if entry is None or time.monotonic() - entry.updated_at > max_age:
+            return None
+        return entry
+
+    def price(self, symbol, max_age=None):
+        entry = self.entry(symbol, max_age)
+        return entry.price if entry is not None else None
+
+    def last_bar(self, symbol, max_age=None):
+        entry = self.entry(symbol, max_age)
+        return entry.bar if entry is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MarketStream:
+    """
+    Runs the stock and crypto data websockets on a background thread and keeps `book` current.
+    """
+
+    def __init__(self, api, book=None, config=None, feed='iex'):
+        self.config = config or get_config()
+        self.assets = get_asset_index(api)
+        self.book = book or PriceBook(self.config.stream_stale_after)
+        url = self.config.data_stream_url or 'https://stream.data.alpaca.markets'
+        self._stocks = DataStream(ALPACA_API_KEY, ALPACA_SECRET_KEY, url, raw_data=False, feed=feed)
+        self._crypto = CryptoDataStream(ALPACA_API_KEY, ALPACA_SECRET_KEY, url, raw_data=False)
+        self._watched = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='market-stream', daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        async def run_both():
+            self._loop = asyncio.get_running_loop()
+            await asyncio.gather(self._stocks._run_forever(), self._crypto._run_forever())
+
+        try:
+            asyncio.run(run_both())
+        except Exception as e:
+            log.error("Market data stream stopped: %s", e)
+
+    def stop(self):
+        if self._loop is None or not self._loop.is_running():
+            return
+        for ws in (self._stocks, self._crypto):
+            asyncio.run_coroutine_threadsafe(ws.stop_ws(), self._loop)
+
+    def watch(self, symbols):
+        """
+        Subscribe to bars and quotes for symbols not watched yet. Returns the newly added symbols.
+        """
+        with self._lock:
+            new = [s for s in dict.fromkeys(symbols) if normalize_symbol(s) not in self._watched]
+            self._watched.update(normalize_symbol(s) for s in new)
+        if not new:
+            return new
+        crypto = [pair_symbol(s, self.config.crypto_quote_suffix) for s in new if self.assets.is_crypto(s)]
+        stocks = [s for s in new if not self.assets.is_crypto(s)]
+        if stocks:
+            self._stocks.subscribe_bars(self._on_bar, *stocks)
+            self._stocks.subscribe_quotes(self._on_quote, *stocks)
+        if crypto:
+            self._crypto.subscribe_bars(self._on_bar, *crypto)
+            self._crypto.subscribe_quotes(self._on_quote, *crypto)
+        log.info("Streaming %d stock and %d crypto symbols", len(stocks), len(crypto))
+        return new
+
+    def wait_for(self, symbols, timeout):
+        """
+        Wait up to `timeout` seconds until every symbol has a fresh entry in the book.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if all(self.book.entry(s) is not None for s in symbols):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    async def _on_bar(self, bar):
+        self.book.update_bar(bar.symbol, bar)
+
+    async def _on_quote(self, quote):
+        self.book.update_quote(quote.symbol, float(quote.bid_price), float(quote.ask_price))
+
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+def get_market_stream(api):
+    """
+    The process-wide MarketStream, started on first use.
+    """
+    global _stream
+    if _stream is None:
+        with _stream_lock:
+            if _stream is None:
+                _stream = MarketStream(api).start()
+    return _stream
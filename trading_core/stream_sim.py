@@ -0,0 +1,153 @@
+"""
+Local websocket stand-in for Alpaca's market data stream.
+
+Speaks the same msgpack protocol as stream.data.alpaca.markets (connected / auth / subscribe, then 'b' bar
+and 'q' quote messages), so the real alpaca_trade_api stream client used by stream.MarketStream connects to
+it unchanged:
+
+    server = LocalMarketStream(source=broker.peek_latest_bar).start()
+    configure(streaming=True, data_stream_url=server.url)
+    ...
+    server.publish_bar('BTC/USD', {'o': 1, 'h': 1, 'l': 1, 'c': 1, 'v': 10, 't': '2024-01-02T00:00:00Z'})
+
+When `source` is given, every newly subscribed symbol immediately gets its current bar (and a quote around
+its close), which is how a broker_sim.SimulatedBroker run streams the simulator's prices.
+"""
+import asyncio
+import threading
+from collections import Counter
+
+import msgpack
+import pandas as pd
+import websockets
+
+
+def _timestamp(value):
+    return msgpack.Timestamp.from_unix(pd.Timestamp(value).timestamp())
+
+
+class LocalMarketStream:
+    def __init__(self, source=None, host='127.0.0.1', port=0, quote_spread=0.0005):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.quote_spread = quote_spread
+        self.counts = Counter()
+        self._clients = {}  # websocket -> {'bars': set(), 'quotes': set()}
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='local-market-stream', daemon=True)
+        self._thread.start()
+        if not self._ready.wait(10):
+            raise RuntimeError("local market stream did not start")
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(websockets.serve(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # ----- publishing -----
+
+    def publish_bar(self, symbol, bar):
+        """
+        Send a bar ({'o', 'h', 'l', 'c', 'v', 't'}) to every client subscribed to symbol's bars.
+        """
+        self._publish('bars', symbol, self._bar_message(symbol, bar))
+
+    def publish_quote(self, symbol, bid, ask, timestamp=None):
+        self._publish('quotes', symbol, self._quote_message(symbol, bid, ask, timestamp))
+
+    def _publish(self, channel, symbol, message):
+        asyncio.run_coroutine_threadsafe(self._broadcast(channel, symbol, message), self._loop).result(10)
+
+    def _bar_message(self, symbol, bar):
+        return {'T': 'b', 'S': symbol, 'o': bar['o'], 'h': bar['h'], 'l': bar['l'], 'c': bar['c'], 'v': bar['v'],
+                't': _timestamp(bar['t'])}
+
+    def _quote_message(self, symbol, bid, ask, timestamp=None):
+        return {'T': 'q', 'S': symbol, 'bp': bid, 'bs': 1, 'ap': ask, 'as': 1,
+                't': _timestamp(timestamp if timestamp is not None else pd.Timestamp.now(tz='UTC'))}
+
+    async def _broadcast(self, channel, symbol, message):
+        for ws, subscriptions in list(self._clients.items()):
+            if symbol in subscriptions[channel] or '*' in subscriptions[channel]:
+                await self._send(ws, [message])
+
+    async def _send(self, ws, messages):
+        self.counts['messages'] += len(messages)
+        await ws.send(msgpack.packb(messages))
+
+    # ----- protocol -----
+
+    async def _handle(self, ws, path=None):
+        self.counts['connections'] += 1
+        await ws.send(msgpack.packb([{'T': 'success', 'msg': 'connected'}]))
+        auth = msgpack.unpackb(await ws.recv())
+        if auth.get('action') != 'auth':
+            await ws.send(msgpack.packb([{'T': 'error', 'code': 401, 'msg': 'not authenticated'}]))
+            return
+        await ws.send(msgpack.packb([{'T': 'success', 'msg': 'authenticated'}]))
+
+        subscriptions = {'bars': set(), 'quotes': set()}
+        self._clients[ws] = subscriptions
+        try:
+            async for raw in ws:
+                request = msgpack.unpackb(raw)
+                action = request.get('action')
+                if action not in ('subscribe', 'unsubscribe'):
+                    continue
+                added = []
+                for channel in subscriptions:
+                    symbols = set(request.get(channel) or [])
+                    if action == 'subscribe':
+                        added += [(channel, s) for s in symbols - subscriptions[channel]]
+                        subscriptions[channel] |= symbols
+                    else:
+                        subscriptions[channel] -= symbols
+                self.counts[action] += 1
+                await self._send(ws, [{'T': 'subscription', 'trades': [],
+                                       **{channel: sorted(symbols) for channel, symbols in subscriptions.items()}}])
+                await self._send_current(ws, added)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    async def _send_current(self, ws, added):
+        if self.source is None:
+            return
+        messages = []
+        for channel, symbol in added:
+            bar = self.source(symbol)
+            if bar is None:
+                continue
+            if channel == 'bars':
+                messages.append(self._bar_message(symbol, bar))
+            else:
+                half = bar['c'] * self.quote_spread / 2
+                messages.append(self._quote_message(symbol, bar['c'] - half, bar['c'] + half, bar['t']))
+        if messages:
+            await self._send(ws, messages)
@@ -0,0 +1,360 @@
+"""
+Span tracing for the trade decision path (signal -> data fetch -> indicators -> sizing -> validation ->
+order submission -> trade record).
+
+Each per-symbol decision is one trace: @traced(..., root=True) on the decision function starts it with a
+fresh trace id, and span()/@traced inside it record child spans with their timings. Finished traces are
+appended to a JSON-lines file in the OTLP/JSON trace format (one ExportTraceServiceRequest per line), and
+per-stage percentiles are printed at exit. Stages that exceed a configured latency budget
+(configure(trace_budgets={'submit_order': 0.5})) are flagged on the span and counted in the summary.
+
+A decision that finishes later, on another thread or after a batch step, stays in its symbol's trace:
+hold() keeps the trace open past its root span and returns a handle, span(..., parent=handle) continues
+it, and release(handle) lets it be exported. A span shared by several traces (a batch step) can point at
+them with links=[handle, ...] instead of belonging to any one of them:
+
+    handle = tracing.hold()                                     # in the per-symbol decision
+    with tracing.span('batch', root=True, links=handles): ...   # once, for every held trace
+    with tracing.span('submit', parent=handle): ...             # later, in the symbol's trace
+    tracing.release(handle)
+
+Tracing is off unless enabled with TRADING_TRACE_FILE=<path> or enable(path); spans are no-ops then.
+Summarise an existing trace file with:
+
+    python -m trading_core.tracing traces.jsonl
+"""
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from .config import get_config
+
+SCOPE = 'trading_core.tracing'
+STATUS_OK = 1
+STATUS_ERROR = 2
+MAX_SAMPLES_PER_STAGE = 100000
+
+_current = contextvars.ContextVar('trading_span', default=None)
+_enabled = False
+_exporter = None
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'status', 'message',
+                 'links')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None, links=None):
+        self.trace = trace
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_OK
+        self.message = None
+        self.links = [link for link in (links or []) if link is not None]
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.links:
+            span['links'] = [{'traceId': link.trace.trace_id, 'spanId': link.span_id} for link in self.links]
+        if self.message:
+            span['status']['message'] = self.message
+        return span
+
+
+class Trace:
+    __slots__ = ('trace_id', 'spans', 'open_spans', 'lock')
+
+    def __init__(self):
+        self.trace_id = '%032x' % random.getrandbits(128)
+        self.spans = []
+        self.open_spans = 0
+        self.lock = threading.Lock()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        wrapped = {'boolValue': value}
+    elif isinstance(value, int):
+        wrapped = {'intValue': str(value)}
+    elif isinstance(value, float):
+        wrapped = {'doubleValue': value}
+    else:
+        wrapped = {'stringValue': str(value)}
+    return {'key': key, 'value': wrapped}
+
+
+class TraceExporter:
+    """
+    Appends finished traces to a JSON-lines file and keeps per-stage durations for the summary.
+    """
+
+    def __init__(self, path, service_name=None):
+        self.path = path
+        self.service_name = service_name or os.path.basename(sys.argv[0] or 'python') or 'python'
+        self.durations = {}
+        self.over_budget = {}
+        self.traces = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'a', buffering=1)
+
+    def export(self, trace):
+        budgets = get_config().trace_budgets
+        with self._lock:
+            self.traces += 1
+            for span in trace.spans:
+                samples = self.durations.setdefault(span.name, [])
+                if len(samples) < MAX_SAMPLES_PER_STAGE:
+                    samples.append(span.duration)
+                budget = budgets.get(span.name)
+                if budget is not None and span.duration > budget:
+                    self.over_budget[span.name] = self.over_budget.get(span.name, 0) + 1
+            if self._file is not None:
+                self._file.write(json.dumps(_otlp_request(self.service_name, trace.spans)) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _otlp_request(service_name, spans):
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_otlp_attribute('service.name', service_name)]},
+        'scopeSpans': [{'scope': {'name': SCOPE}, 'spans': [span.to_otlp() for span in spans]}],
+    }]}
+
+
+def _finish(span, token):
+    span.end_ns = time.time_ns()
+    budget = get_config().trace_budgets.get(span.name)
+    if budget is not None and span.duration > budget:
+        span.attributes['budget.exceeded'] = True
+        span.attributes['budget.seconds'] = budget
+    _current.reset(token)
+    with span.trace.lock:
+        span.trace.spans.append(span)
+    _close(span.trace)
+
+
+def _close(trace):
+    with trace.lock:
+        trace.open_spans -= 1
+        done = trace.open_spans == 0
+    if done and _exporter is not None:
+        _exporter.export(trace)
+
+
+@contextmanager
+def span(name, root=False, parent=None, links=None, **attributes):
+    """
+    Record a span named `name` under the current one, or under `parent` (a hold() handle). Outside a trace
+    nothing is recorded unless root=True, which starts a new trace. `links` are spans of other traces this
+    one relates to.
+    """
+    parent = parent or _current.get()
+    if not _enabled or (parent is None and not root):
+        yield None
+        return
+
+    if parent is None:
+        trace, parent_id = Trace(), None
+    else:
+        trace, parent_id = parent.trace, parent.span_id
+    current = Span(trace, name, parent_id, attributes, links)
+    with trace.lock:
+        trace.open_spans += 1
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = STATUS_ERROR
+        current.message = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _finish(current, token)
+
+
+def traced(name=None, root=False):
+    """
+    Decorator form of span(); the span is named after the function unless `name` is given.
+    """
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(span_name, root=root):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def set_attribute(key, value):
+    """
+    Attach an attribute (e.g. the symbol or the decision taken) to the current span, if any.
+    """
+    current = _current.get()
+    if current is not None:
+        current.attributes[key] = value
+
+
+def hold():
+    """
+    Keep the current trace open after its spans end, so it can be continued with span(..., parent=handle).
+    Returns the handle (the current span), or None outside a trace. Every handle must be release()d.
+    """
+    current = _current.get()
+    if current is not None:
+        with current.trace.lock:
+            current.trace.open_spans += 1
+    return current
+
+
+def release(handle):
+    """
+    Give up a hold(); the trace is exported once its last span has ended.
+    """
+    if handle is not None:
+        _close(handle.trace)
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace.trace_id if current is not None else None
+
+
+# ----- summaries -----
+
+def percentiles(durations_by_stage, over_budget=None):
+    over_budget = over_budget or {}
+    summary = {}
+    for stage, samples in durations_by_stage.items():
+        values = np.asarray(samples, dtype=float)
+        if not len(values):
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        summary[stage] = {'count': int(len(values)), 'p50_s': float(p50), 'p90_s': float(p90),
+                          'p99_s': float(p99), 'max_s': float(values.max()), 'total_s': float(values.sum()),
+                          'over_budget': over_budget.get(stage, 0)}
+    return summary
+
+
+def format_summary(summary, traces=None):
+    lines = [f"Trace stage latencies{f' over {traces} traces' if traces is not None else ''}:",
+             f"  {'stage':32} {'count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'over budget':>12}"]
+    for stage, s in sorted(summary.items(), key=lambda item: -item[1]['total_s']):
+        lines.append(f"  {stage:32} {s['count']:7} {s['p50_s']:9.4f} {s['p90_s']:9.4f} {s['p99_s']:9.4f} "
+                     f"{s['max_s']:9.4f} {s['over_budget']:12}")
+    return '\n'.join(lines)
+
+
+def summary():
+    if _exporter is None:
+        return {}
+    with _exporter._lock:
+        durations = {k: list(v) for k, v in _exporter.durations.items()}
+        over_budget = dict(_exporter.over_budget)
+    return percentiles(durations, over_budget)
+
+
+def summarize_file(path):
+    """
+    Per-stage percentiles from an OTLP JSON-lines trace file.
+    """
+    durations = {}
+    over_budget = {}
+    traces = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            traces += 1
+            for resource in json.loads(line).get('resourceSpans', []):
+                for scope in resource.get('scopeSpans', []):
+                    for s in scope.get('spans', []):
+                        seconds = (int(s['endTimeUnixNano']) - int(s['startTimeUnixNano'])) / 1e9
+                        durations.setdefault(s['name'], []).append(seconds)
+                        if any(a['key'] == 'budget.exceeded' for a in s.get('attributes', [])):
+                            over_budget[s['name']] = over_budget.get(s['name'], 0) + 1
+    return percentiles(durations, over_budget), traces
+
+
+# ----- setup -----
+
+def _at_exit():
+    exporter = _exporter
+    if exporter is None:
+        return
+    exporter.close()
+    if exporter.traces:
+        print(format_summary(summary(), exporter.traces), file=sys.stderr)
+
+
+def enable(path=None, service_name=None):
+    """
+    Start recording traces, appending them to `path` (no file when None) and printing a summary at exit.
+    """
+    global _enabled, _exporter
+    if _exporter is None:
+        atexit.register(_at_exit)
+    else:
+        _exporter.close()
+    _exporter = TraceExporter(path, service_name)
+    _enabled = True
+    return _exporter
+
+
+def disable():
+    global _enabled, _exporter
+    _enabled = False
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = None
+
+
+def enable_from_env():
+    path = os.environ.get('TRADING_TRACE_FILE')
+    if path:
+        enable(path)
+
+
+if __name__ == '__main__':
+    for trace_file in sys.argv[1:]:
+        stage_summary, trace_count = summarize_file(trace_file)
+        print(format_summary(stage_summary, trace_count))